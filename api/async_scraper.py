@@ -0,0 +1,892 @@
+"""Scraper asynchrone (asyncio + aiohttp).
+
+``AsyncLetterboxdScraper`` offre la même méthode ``get_films`` que
+``LetterboxdScraper`` et s'appuie sur le même ``LetterboxdCore`` (analyse,
+caches, stockage des listes), mais toutes les attentes réseau sont des
+coroutines : les pages de liste, la page du film et la recherche TMDB sont
+récupérées de façon concurrente, et les accès SQLite passent par un pool de
+threads pour ne pas bloquer la boucle.
+
+Le scraper partagé vit sur une boucle d'événements dédiée, propre au
+processus, afin que sa session aiohttp (et ses connexions) servent à toutes les
+requêtes Flask ; ``get_random_film`` y exécute un tirage depuis n'importe
+quelle autre boucle, et ``stream_random_film`` depuis n'importe quel thread en
+en restituant la progression. Sous un serveur WSGI, une route Flask
+asynchrone occupe toujours un thread du serveur pendant tout le tirage : le
+gain porte sur la concurrence à l'intérieur d'un tirage et entre tirages
+simultanés sur la boucle partagée, pas sur le nombre de threads du serveur.
+``warm_up`` prépare tout cela en arrière-plan dès le chargement de
+l'application ; aiohttp n'est importé qu'à ce moment-là (ou à la première
+requête), pas avec ce module.
+"""
+import asyncio
+import codecs
+import contextvars
+import functools
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+from .cache import MISSING
+from .deck import Deck
+from .film_index import FilmIndex, combine
+from .letterboxd_scraper import LetterboxdCore, ListCrawl, ListUnreachableError
+from .list_store import ListStore
+from .observability import timed
+from .parsers import ListStream
+from .refresh import RefreshScheduler, charge_request
+from .sampling import Reservoir
+from .single_flight import AsyncSingleFlight
+from .throttle import HostPausedError, parse_retry_after
+from .transport import MAX_RETRIES, RETRY_BACKOFF, RETRY_STATUSES, create_async_session
+
+logger = logging.getLogger(__name__)
+
+# Fonction recevant les événements de progression du tirage en cours
+_progress = contextvars.ContextVar('letterboxd_spin_progress', default=None)
+
+
+def _report(event, **data):
+    """Signale une étape du tirage en cours à son observateur, s'il y en a un."""
+    callback = _progress.get()
+    if callback is not None:
+        callback(dict(data, event=event))
+
+
+class IndexingInProgressError(Exception):
+    """Tirage filtré sans correspondance parmi les films indexés, d'autres restant à indexer."""
+
+    def __init__(self, unindexed, retry_after=5):
+        super().__init__(
+            f"Indexation de la liste en cours ({unindexed} films restants) : aucun film "
+            f"indexé ne correspond encore aux filtres, réessayez dans quelques secondes."
+        )
+        self.unindexed = unindexed
+        self.retry_after = retry_after
+
+
+class NoMatchingFilmError(Exception):
+    """Aucun film ne remplit les conditions du tirage (films communs d'un groupe)."""
+
+
+class AsyncLetterboxdScraper:
+    """Scraper asynchrone ; ``get_films`` est une coroutine.
+
+    Réglages, analyse des pages, caches et stockage sont ceux d'un
+    ``LetterboxdCore`` (``core``), construit avec les mêmes arguments que
+    ``LetterboxdScraper`` ; seules les requêtes HTTP sont propres à cette
+    classe. Les lectures et écritures SQLite (listes, index, paquets, caches
+    persistants) passent par un petit pool de threads (``_offload``) : la
+    boucle d'événements n'attend que le réseau. ``http_session`` est une
+    ``aiohttp.ClientSession`` ; par défaut elle est créée à la première
+    requête, sur la boucle d'événements courante, à laquelle le scraper reste
+    ensuite attaché.
+    """
+
+    def __init__(self, *args, http_session=None, refresh_scheduler=None, **kwargs):
+        self.core = LetterboxdCore(*args, **kwargs)
+        self.http_session = http_session
+        self.refresh_scheduler = refresh_scheduler  # suivi des listes populaires (optionnel)
+        self._tasks = set()  # rafraîchissements en arrière-plan en cours
+        self._indexing = set()  # films en cours d'indexation
+        # Regroupement des appels simultanés entre coroutines plutôt qu'entre threads
+        self._list_flights = AsyncSingleFlight()
+        self._details_flights = AsyncSingleFlight()
+        # Appels bloquants au stockage, aux caches persistants et analyses HTML
+        self._storage = ThreadPoolExecutor(max_workers=4, thread_name_prefix='letterboxd-storage')
+
+    async def _offload(self, function, *args):
+        """Exécute un appel bloquant (SQLite, cache sur disque, analyse HTML) hors de la boucle d'événements."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._storage, functools.partial(function, *args)
+        )
+
+    async def open_session(self):
+        """Crée la session aiohttp, attachée à la boucle courante, si ce n'est déjà fait."""
+        if self.http_session is None:
+            self.http_session = create_async_session()
+        return self.http_session
+
+    async def close(self):
+        if self.http_session is not None:
+            await self.http_session.close()
+            self.http_session = None
+
+    async def _get(self, url, params=None):
+        """Voir ``LetterboxdScraper._get`` ; l'appelant doit libérer la réponse (``release``)."""
+        import aiohttp
+
+        await self.open_session()
+        limiter = self.core.rate_limiters.for_url(url)
+        for attempt in range(MAX_RETRIES + 1):
+            await limiter.acquire_async()
+            charge_request()
+            try:
+                response = await self.http_session.get(url, params=params)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                logger.debug("Erreur réseau pour %s (%s), nouvel essai", url, e)
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+                continue
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            limiter.on_response(response.status, retry_after)
+            if response.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+            response.release()
+            logger.debug("Réponse %s pour %s, nouvel essai", response.status, url)
+            if retry_after is None:
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    async def _get_text(self, url):
+        """Retourne le corps d'une page et son URL finale (après redirections)."""
+        response = await self._get(url)
+        try:
+            response.raise_for_status()
+            return await response.text(), str(response.url)
+        finally:
+            response.release()
+
+    async def _fetch_list_page(self, page_url):
+        """Télécharge et analyse une page de liste."""
+        core = self.core
+        if not core.stream_pages:
+            with timed('list_page_fetch'):
+                html_content, final_url = await self._get_text(page_url)
+            core._check_url_accessibility(final_url)
+            core._check_content_accessibility(html_content)
+            with timed('list_page_parse'):
+                return await self._offload(core._parse_list_page, html_content)
+
+        with timed('list_page_fetch'):
+            response = await self._get(page_url)
+        try:
+            response.raise_for_status()
+            core._check_url_accessibility(str(response.url))
+            # Lecture en flux : la lecture s'arrête dès que la grille et la
+            # pagination ont été vues
+            decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+            stream = ListStream(check_prefix=core._check_content_accessibility)
+            with timed('list_page_parse'):
+                async for chunk in response.content.iter_chunked(core.STREAM_CHUNK_SIZE):
+                    if stream.feed(decoder.decode(chunk)):
+                        break
+                else:
+                    stream.feed(decoder.decode(b'', final=True))
+                page = stream.finish()
+        finally:
+            response.release()
+        return core._films_from_page(page)
+
+    async def _get_films_from_api(self, username, list_type, list_slug=None, by_added=False):
+        """Voir ``LetterboxdScraper._get_films_from_api`` (parcours simultanés regroupés)."""
+        base_url = self.core._list_base_url(username, list_type, list_slug, by_added)
+        if not base_url:
+            return None
+        return await self._list_flights.do(
+            base_url.lower(), self._crawl_films_from_api, username, list_type, list_slug, by_added
+        )
+
+    async def _crawl_films_from_api(self, username, list_type, list_slug=None, by_added=False):
+        """Parcourt toutes les pages d'une liste (pages 2 et suivantes en concurrence)."""
+        try:
+            base_url = self.core._list_base_url(username, list_type, list_slug, by_added)
+            if not base_url:
+                return None
+            crawl = ListCrawl(base_url)
+            try:
+                first_page = await self._fetch_list_page(base_url)
+            except HostPausedError:
+                raise
+            except Exception as e:
+                logger.warning("Erreur lors de la récupération de la page 1: %s", e)
+                return None
+            if not crawl.add(1, first_page):
+                return None
+            _report('page', page=1, pages=crawl.last_page, films=len(crawl.films))
+
+            pages = crawl.remaining_pages
+            if pages:
+                # Au plus max_workers pages en vol ; l'ordre des résultats est
+                # conservé et le parcours s'arrête à la première page en échec
+                semaphore = asyncio.Semaphore(self.core.max_workers)
+
+                async def fetch(number):
+                    async with semaphore:
+                        return await self._fetch_list_page(crawl.page_url(number))
+
+                tasks = [asyncio.ensure_future(fetch(number)) for number in pages]
+                try:
+                    for number, task in zip(pages, tasks):
+                        try:
+                            result = await task
+                        except Exception as e:
+                            crawl.fail(number, e)
+                            break
+                        if not crawl.add(number, result):
+                            break
+                        _report('page', page=number, pages=crawl.last_page, films=len(crawl.films))
+                finally:
+                    for task in tasks:
+                        task.cancel()
+
+            # Continuer séquentiellement si la pagination était incomplète
+            while crawl.has_next:
+                number = crawl.page + 1
+                try:
+                    result = await self._fetch_list_page(crawl.page_url(number))
+                except Exception as e:
+                    crawl.fail(number, e)
+                    break
+                if crawl.add(number, result):
+                    _report('page', page=number, pages=number + crawl.has_next, films=len(crawl.films))
+
+            return crawl.result()
+
+        except HostPausedError:
+            raise
+        except Exception as e:
+            logger.warning("Erreur lors de l'appel à l'API: %s", e)
+            return None
+
+    async def _get_new_films(self, username, list_type, list_slug, known_paths):
+        """Voir ``LetterboxdScraper._get_new_films``."""
+        base_url = self.core._list_base_url(username, list_type, list_slug, by_added=True)
+        new_films = FilmIndex()
+        for page in range(1, self.core.max_delta_pages + 1):
+            page_url = f"{base_url}page/{page}/" if page > 1 else base_url
+            films, has_next, _ = await self._fetch_list_page(page_url)
+            if self.core._scan_delta(new_films, films, known_paths):
+                return new_films, True
+            if not has_next:
+                return new_films, False
+        return None
+
+    async def _get_list_films(self, username, list_type, list_slug=None, lead=0):
+        """Voir ``LetterboxdScraper._get_list_films`` ; les décisions sont celles du ``core``."""
+        core, store = self.core, self.core.list_store
+        if store is None:
+            api_data = await self._get_films_from_api(username, list_type, list_slug)
+            return api_data['films'] if api_data else None
+
+        list_key = store.list_key(list_type, list_slug)
+        plan, stored = await self._offload(core._sync_plan, username, list_key, lead)
+        if plan == 'stored':
+            return stored
+        if plan == 'delta':
+            try:
+                delta = await self._get_new_films(username, list_type, list_slug, stored)
+            except Exception as e:
+                return await self._offload(core._delta_failed, username, list_key, e)
+            if delta is not None:
+                return await self._offload(core._apply_delta, username, list_key, delta)
+
+        api_data = await self._get_films_from_api(username, list_type, list_slug, by_added=True)
+        return await self._offload(core._store_full_sync, username, list_key, api_data)
+
+    async def _get_tmdb_poster(self, title, year=None):
+        """Voir ``LetterboxdScraper._get_tmdb_poster``."""
+        key = self.core._tmdb_cache_key(title, year)
+        poster_url = await self._offload(self.core._cached_poster, key)
+        if poster_url is not MISSING:
+            return poster_url
+        try:
+            with timed('tmdb_lookup'):
+                response = await self._get(
+                    f"{self.core.tmdb_base_url}/3/search/movie",
+                    params=self.core._tmdb_search_params(title, year)
+                )
+                try:
+                    response.raise_for_status()
+                    data = await response.json(content_type=None)
+                finally:
+                    response.release()
+            poster_url = self.core._poster_from_search(data)
+        except Exception as e:
+            logger.warning("Erreur lors de la récupération du poster TMDB: %s", e)
+            return None
+        await self._offload(self.core._store_poster, key, poster_url)
+        return poster_url
+
+    async def prefetch_tmdb_posters(self, films, concurrency=None):
+        """Résout les posters TMDB d'un lot de films, au plus ``concurrency`` à la fois.
+
+        ``films`` est un itérable de couples ``(titre, année)``. Seuls les films
+        absents du cache sont recherchés (une fois par clé), au plus
+        ``max_workers`` recherches à la fois par défaut ; retourne le nombre de
+        recherches effectuées.
+        """
+        core = self.core
+
+        def missing_films():
+            missing = {}
+            for title, year in films:
+                key = core._tmdb_cache_key(title, year)
+                if key not in missing and core.poster_cache.get(key) is MISSING:
+                    missing[key] = (title, year)
+            return list(missing.values())
+
+        missing = await self._offload(missing_films)
+        semaphore = asyncio.Semaphore(concurrency or core.max_workers)
+
+        async def lookup(title, year):
+            async with semaphore:
+                await self._get_tmdb_poster(title, year)
+
+        await asyncio.gather(*(lookup(title, year) for title, year in missing))
+        return len(missing)
+
+    async def _fetch_film_details(self, film_url, poster_lookup=None):
+        """Voir ``LetterboxdScraper._fetch_film_details`` ; la recherche anticipée est une tâche."""
+        try:
+            with timed('film_details_fetch'):
+                html_content, _ = await self._get_text(film_url)
+            details = await self._offload(self.core._film_details_from_page, html_content)
+            if self.core._poster_lookup_matches(poster_lookup, details):
+                poster_url = await poster_lookup[2]
+            else:
+                if poster_lookup:
+                    poster_lookup[2].cancel()
+                poster_url = await self._get_tmdb_poster(details['title'], details['year'])
+            details['poster'] = poster_url or self.core.PLACEHOLDER_POSTER
+            return details
+        except Exception as e:
+            logger.warning("Erreur lors de la récupération des détails du film: %s", e)
+            return None
+
+    async def _refresh_film_details(self, film_url, key):
+        try:
+            details = await self._fetch_film_details(film_url)
+            if details:
+                await self._offload(self.core._store_film_details, key, details)
+        finally:
+            self.core._refresh_done(key)
+
+    def _record_access(self, username, list_type, list_slug=None):
+        if self.refresh_scheduler is not None:
+            self.refresh_scheduler.record(username, list_type, list_slug)
+
+    def _spawn(self, coroutine):
+        # Conserver une référence : la boucle ne garde que des références faibles
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _get_film_details(self, film_url, title=None, year=None):
+        """Voir ``LetterboxdScraper._get_film_details`` (page du film et TMDB en concurrence)."""
+        key = urlparse(film_url).path
+        entry, refresh = await self._offload(self.core._cached_film_details, key)
+        if refresh:
+            self._spawn(self._refresh_film_details(film_url, key))
+        if entry is not MISSING:
+            return entry['details']
+        return await self._details_flights.do(
+            key, self._load_film_details, film_url, key, title, year
+        )
+
+    async def _load_film_details(self, film_url, key, title=None, year=None):
+        poster_lookup = None
+        if title and year:
+            poster_lookup = (title, year, asyncio.ensure_future(self._get_tmdb_poster(title, year)))
+        details = await self._fetch_film_details(film_url, poster_lookup)
+        if details:
+            await self._offload(self.core._store_film_details, key, details)
+        return details
+
+    async def _build_film_result(self, chosen_film):
+        film_url = urljoin(self.core.base_url, chosen_film.get('path', ''))
+        # Le film tiré peut être affiché avant que ses détails ne soient connus
+        _report(
+            'candidate', title=chosen_film.get('name', 'Sans titre'), year=chosen_film.get('year', ''),
+            url=film_url, poster=chosen_film.get('image', '')
+        )
+        film_details = await self._get_film_details(
+            film_url, chosen_film.get('name'), chosen_film.get('year')
+        )
+        return self.core._film_result(chosen_film, film_url, film_details)
+
+    async def iter_films(self, url, predicate=None):
+        """Générateur asynchrone équivalent à ``LetterboxdScraper.iter_films``."""
+        base_url = self.core._stream_base_url(url)
+        seen = set()
+        page = await self._fetch_list_page(base_url)
+        for film in self.core._unseen_films(page.films, seen, predicate):
+            yield film
+        if not page.films or not page.has_next:
+            return
+
+        last_page = page.last_page or 0
+        next_page = 2
+        pending = deque()
+        try:
+            while True:
+                while len(pending) < self.core.max_workers and (next_page <= last_page or not pending):
+                    pending.append(asyncio.ensure_future(
+                        self._fetch_list_page(f"{base_url}page/{next_page}/")
+                    ))
+                    next_page += 1
+                page = await pending.popleft()
+                for film in self.core._unseen_films(page.films, seen, predicate):
+                    yield film
+                if not page.films or not page.has_next:
+                    return
+                last_page = max(last_page, page.last_page or 0)
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def sample(self, url, k=1, predicate=None, rng=random):
+        """Voir ``LetterboxdScraper.sample``."""
+        reservoir = Reservoir(k, rng)
+        async for film in self.iter_films(url, predicate):
+            reservoir.offer(film)
+        return reservoir.items
+
+    async def _pick_film_fast(self, username, list_type, list_slug=None):
+        """Voir ``LetterboxdScraper._pick_film_fast``."""
+        base_url = self.core._list_base_url(username, list_type, list_slug)
+        if not base_url:
+            return None
+
+        first_page = await self._fetch_list_page(base_url)
+        if not first_page.films:
+            return None
+        if not first_page.has_next:
+            return FilmIndex(first_page.films).choice()
+        if not first_page.last_page:
+            return None
+
+        page_size = len(first_page.films)
+        pages = {1: first_page.films}
+        for _ in range(self.core.max_fast_attempts):
+            page, offset = divmod(random.randrange(page_size * first_page.last_page), page_size)
+            page += 1
+            if page not in pages:
+                pages[page] = (await self._fetch_list_page(f"{base_url}page/{page}/")).films
+            if offset < len(pages[page]):
+                return pages[page][offset]
+        return None
+
+    # Tirages filtrés : films indexés sur-le-champ, par lots, tant qu'aucun film
+    # indexé ne correspond (dans la limite d'un budget de pages et de temps),
+    # puis à chaque tirage en arrière-plan
+    FILTER_BATCH_SIZE = 16
+    FILTER_MAX_PAGES = 128
+    FILTER_TIME_BUDGET = 5.0
+    INDEX_BATCH_SIZE = 32
+
+    async def _index_film(self, path):
+        """Indexe les métadonnées d'un film à partir de sa seule page (sans TMDB)."""
+        try:
+            html_content, _ = await self._get_text(urljoin(self.core.base_url, path))
+            details = await self._offload(self.core._film_details_from_page, html_content)
+            await self._offload(self.core.metadata_index.put, path, details)
+        except Exception as e:
+            logger.debug("Indexation impossible pour %s: %s", path, e)
+        finally:
+            self._indexing.discard(path)
+
+    async def _index_films(self, paths):
+        paths = [path for path in paths if path not in self._indexing]
+        self._indexing.update(paths)
+        await asyncio.gather(*(self._index_film(path) for path in paths))
+
+    async def _pick_filtered(self, films, filters):
+        """Tire un film correspondant aux filtres, d'après l'index des métadonnées.
+
+        Le tirage est uniforme parmi les films déjà indexés qui correspondent ;
+        les films non encore indexés le sont par lots en arrière-plan, de sorte
+        que les tirages suivants portent sur une part croissante de la liste.
+        Tant qu'aucun film indexé ne correspond, les films restants sont indexés
+        immédiatement, lot par lot (pages récupérées en concurrence), dans la
+        limite de ``FILTER_MAX_PAGES`` pages et ``FILTER_TIME_BUDGET`` secondes.
+        Retourne None si aucun film de la liste ne correspond ; lève
+        ``IndexingInProgressError`` si le budget est épuisé avant de conclure.
+        """
+        if filters.needs_index and self.core.metadata_index is None:
+            raise Exception("Les filtres sur la note, la durée ou le réalisateur exigent l'index des métadonnées.")
+        metadata = {}
+        if filters.needs_index:
+            metadata = await self._offload(self.core.metadata_index.get_many, [film['path'] for film in films])
+        matches, unknown = [], []
+        for film in films:
+            verdict = filters.matches(film, metadata.get(film['path']))
+            if verdict:
+                matches.append(film)
+            elif verdict is None:
+                unknown.append(film['path'])
+        random.shuffle(unknown)
+
+        # Films dont l'indexation a échoué (ou est en cours ailleurs) : à reprendre plus tard
+        pending = []
+        deadline = time.monotonic() + self.FILTER_TIME_BUDGET
+        indexed = 0
+        while not matches and unknown and indexed < self.FILTER_MAX_PAGES and time.monotonic() < deadline:
+            size = min(self.FILTER_BATCH_SIZE, self.FILTER_MAX_PAGES - indexed)
+            batch, unknown = unknown[:size], unknown[size:]
+            await self._index_films(batch)
+            indexed += len(batch)
+            metadata = await self._offload(self.core.metadata_index.get_many, batch)
+            for path in batch:
+                film = films[films.position(path)]
+                verdict = filters.matches(film, metadata.get(path))
+                if verdict:
+                    matches.append(film)
+                elif verdict is None:
+                    pending.append(path)
+        unknown += pending
+        if unknown:
+            self._spawn(self._index_films(unknown[:self.INDEX_BATCH_SIZE]))
+        _report('matches', count=len(matches), unindexed=len(unknown))
+        if matches:
+            return random.choice(matches)
+        if unknown:
+            raise IndexingInProgressError(len(unknown))
+        return None
+
+    def _draw_from_stored_deck(self, session, context):
+        """Tire la carte suivante du paquet de la session sans relire la liste.
+
+        Possible seulement si la copie stockée de la liste n'a pas à être
+        rafraîchie et n'a pas changé (même version) depuis la dernière
+        réconciliation du paquet : le tirage coûte alors quatre lectures par
+        clé. Retourne ``(film, paquet)``, ou None s'il faut passer par
+        ``_deal_from_deck``.
+        Bloquant : à exécuter via ``_offload``.
+        """
+        if self.core.list_store is None:
+            return None
+        list_key = ListStore.list_key(context.list_type, context.list_slug)
+        state = self.core.list_store.get_state(context.username, list_key)
+        now = time.time()
+        if (not state or now - state['full_synced_at'] >= self.core.full_sync_interval
+                or now - state['synced_at'] >= self.core.refresh_interval):
+            return None
+        deck_store = self.core.deck_store
+        with deck_store.locked(session, context.username, list_key):
+            deck = deck_store.load(session, context.username, list_key)
+            if deck is None or deck.version != self.core.list_store.get_version(context.username, list_key):
+                return None
+            card = deck.draw()
+            if card is None:
+                return None
+            film = self.core.list_store.get_film(context.username, list_key, deck_store.path_for(card))
+            if film is None:
+                return None
+            deck_store.save_cursor(session, context.username, list_key, deck)
+        return film, deck
+
+    def _deal_from_deck(self, session, context, films):
+        """Tire la carte suivante du paquet de la session, aligné sur ``films``.
+
+        Le paquet est créé au premier tirage et remélangé une fois épuisé. Il
+        n'est réconcilié avec la liste (voir ``Deck.reconcile``), ce qui exige
+        l'identifiant de chacun de ses films, que si la version stockée de la
+        liste a changé depuis ; sinon le tirage ne lit que le chemin de la carte.
+        Un paquet dont la carte tirée n'est pas dans ``films`` (liste lue par
+        la page HTML, par exemple) est remplacé par un nouveau paquet.
+        Bloquant : à exécuter via ``_offload``.
+        """
+        list_key = ListStore.list_key(context.list_type, context.list_slug)
+        store = self.core.list_store
+        version = store.get_version(context.username, list_key) if store else None
+        deck_store = self.core.deck_store
+        with deck_store.locked(session, context.username, list_key):
+            deck = deck_store.load(session, context.username, list_key)
+            paths = None
+            if deck is None or version is None or deck.version != version:
+                ids = deck_store.ids_for(film['path'] for film in films)
+                paths = {film_id: path for path, film_id in ids.items()}
+                if deck is None:
+                    deck = Deck.shuffled(paths)
+                else:
+                    deck.reconcile(list(ids.values()))
+                deck.version = version
+            rewrite = paths is not None
+            card = deck.draw()
+            if card is None:
+                deck.reshuffle()
+                card = deck.draw()
+                rewrite = True
+            path = paths[card] if paths is not None else deck_store.path_for(card)
+            position = films.position(path)
+            if position is None:
+                ids = deck_store.ids_for(film['path'] for film in films)
+                paths = {film_id: path for path, film_id in ids.items()}
+                deck = Deck.shuffled(paths, version=version)
+                position = films.position(paths[deck.draw()])
+                rewrite = True
+            if rewrite:
+                deck_store.save(session, context.username, list_key, deck)
+            else:
+                deck_store.save_cursor(session, context.username, list_key, deck)
+        return films[position], deck
+
+    async def get_films(self, url, fast=False, progress=None, filters=None, session=None):
+        """Coroutine équivalente à ``LetterboxdScraper.get_films``.
+
+        Le contexte de la requête n'est pas stocké sur le scraper : plusieurs
+        tirages s'exécutent en concurrence sur le même thread. ``progress``
+        reçoit, au fil du tirage, des événements ``{'event': ...}`` : ``page``
+        (pages et films lus), ``films`` (taille de la liste), ``matches``
+        (tirage filtré : films correspondants et films non encore indexés)
+        puis ``candidate`` (film tiré, avant ses détails). Un parcours partagé
+        avec un autre tirage simultané ne signale ses pages qu'à celui qui l'a
+        lancé. ``filters`` (``FilmFilter``) restreint le tirage aux films qui y
+        correspondent (voir ``_pick_filtered``). Sans filtre, ``session``
+        (identifiant de la session du client) fait tirer les films dans un
+        paquet mélangé propre à la session et à la liste : pas de répétition
+        avant d'avoir vu toute la liste, et un événement ``deck`` (cartes
+        restantes) précède ``candidate``.
+        """
+        import aiohttp
+
+        token = _progress.set(progress)
+        try:
+            logger.info("Récupération des films depuis: %s", url)
+            context, url = self.core._request_context(url)
+            self._record_access(context.username, context.list_type, context.list_slug)
+
+            if fast and not filters and not await self._offload(
+                self.core._is_list_stored, context.username, context.list_type, context.list_slug
+            ):
+                chosen_film = await self._pick_film_fast(
+                    context.username, context.list_type, context.list_slug
+                )
+                if chosen_film:
+                    return await self._build_film_result(chosen_film)
+
+            use_deck = session is not None and not filters and self.core.deck_store is not None
+            dealt = await self._offload(self._draw_from_stored_deck, session, context) if use_deck else None
+            if dealt:
+                chosen_film, deck = dealt
+                _report('deck', remaining=deck.remaining, size=len(deck))
+                return await self._build_film_result(chosen_film)
+
+            films = await self._get_list_films(context.username, context.list_type, context.list_slug)
+            if films is not None and not films:
+                raise Exception("Aucun film trouvé dans cette liste.")
+            if films is None:
+                # Si l'API ne fonctionne pas, essayer la méthode HTML classique
+                html_content, final_url = await self._get_text(url)
+                self.core._check_url_accessibility(final_url)
+                self.core._check_content_accessibility(html_content)
+                films = await self._offload(self.core._extract_films_from_html, html_content)
+                if not films:
+                    raise Exception("Impossible d'extraire les films de cette liste. Vérifiez qu'elle contient des films et qu'elle est publique.")
+            _report('films', count=len(films))
+
+            if filters:
+                chosen_film = await self._pick_filtered(films, filters)
+                if chosen_film is None:
+                    raise Exception("Aucun film de cette liste ne correspond aux filtres.")
+            elif use_deck:
+                chosen_film, deck = await self._offload(self._deal_from_deck, session, context, films)
+                _report('deck', remaining=deck.remaining, size=len(deck))
+            else:
+                chosen_film = films.choice()
+            logger.info("Film choisi: %s", chosen_film.get('name', 'Sans titre'))
+            return await self._build_film_result(chosen_film)
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error("Erreur de requête: %s", e)
+            raise ListUnreachableError(f"Erreur de connexion: {str(e)}")
+        except (IndexingInProgressError, ListUnreachableError):
+            raise
+        except Exception as e:
+            logger.error("Erreur générale: %s", e)
+            raise Exception(str(e))
+        finally:
+            _progress.reset(token)
+
+
+    # Modes de tirage de groupe : nombre minimal de membres ayant le film
+    GROUP_MODES = ('intersection', 'union', 'at_least')
+
+    async def get_group_film(self, usernames, mode='intersection', min_members=None,
+                             list_type='watchlist'):
+        """Tire un film parmi les listes de plusieurs membres.
+
+        ``mode`` vaut ``intersection`` (film présent chez tous), ``union`` (chez
+        au moins un) ou ``at_least`` (chez au moins ``min_members``). Les listes
+        sont récupérées en concurrence, via le stockage et les caches partagés :
+        la durée est celle de la liste la plus lente. La réponse indique, pour
+        le film tiré, quels membres l'ont, ainsi que la répartition des
+        candidats selon leur nombre de membres. Lève ``ListUnreachableError``
+        si la liste d'un membre est inaccessible et ``NoMatchingFilmError`` si
+        aucun film n'est partagé par assez de membres.
+        """
+        group_size = len(usernames)
+        if mode == 'intersection':
+            min_members = group_size
+        elif mode == 'union':
+            min_members = 1
+        elif mode != 'at_least' or not min_members or not 1 <= min_members <= group_size:
+            raise ValueError("Mode de tirage de groupe invalide")
+
+        for username in usernames:
+            self._record_access(username, list_type)
+        results = await asyncio.gather(
+            *(self._get_list_films(username, list_type) for username in usernames),
+            return_exceptions=True
+        )
+        for username, films in zip(usernames, results):
+            if isinstance(films, HostPausedError):
+                raise films
+            if isinstance(films, Exception) or films is None:
+                logger.warning("Liste de %s inaccessible: %s", username, films)
+                raise ListUnreachableError(f"Impossible d'accéder à la liste de {username}.")
+
+        candidates, members = combine(results, min_members)
+        if not candidates:
+            raise NoMatchingFilmError("Aucun film ne correspond aux listes du groupe.")
+        chosen_film = candidates.choice()
+        logger.info("Film choisi pour le groupe: %s", chosen_film['name'])
+
+        result = await self._build_film_result(chosen_film)
+        coverage = {}
+        for count in members:
+            coverage[count] = coverage.get(count, 0) + 1
+        result.update({
+            'members': [
+                username for username, films in zip(usernames, results)
+                if chosen_film['path'] in films
+            ],
+            'group_size': group_size,
+            'candidates': len(candidates),
+            'coverage': {str(count): coverage[count] for count in sorted(coverage, reverse=True)},
+        })
+        return result
+
+
+class _LoopThread:
+    """Boucle d'événements tournant dans un thread démon."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, name='letterboxd-async', daemon=True
+        )
+        self.thread.start()
+
+
+_shared_loop = None
+_shared_scraper = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_loop():
+    """Retourne la boucle d'événements du processus (démarrée à la première utilisation)."""
+    global _shared_loop
+    with _shared_lock:
+        if _shared_loop is None:
+            _shared_loop = _LoopThread()
+        return _shared_loop.loop
+
+
+def get_shared_async_scraper():
+    """Retourne le scraper asynchrone partagé (à n'utiliser que sur ``get_shared_loop()``).
+
+    Sauf si ``LETTERBOXD_REFRESH_TOP`` vaut 0, il est accompagné d'un
+    ``RefreshScheduler`` qui garde à jour les ``LETTERBOXD_REFRESH_TOP`` (20)
+    listes les plus demandées, dans la limite de ``LETTERBOXD_REFRESH_BUDGET``
+    (60) requêtes par minute.
+    """
+    global _shared_scraper
+    loop = get_shared_loop()
+    with _shared_lock:
+        if _shared_scraper is None:
+            _shared_scraper = AsyncLetterboxdScraper()
+            top = int(os.environ.get('LETTERBOXD_REFRESH_TOP', 20))
+            if top > 0 and _shared_scraper.core.list_store is not None:
+                scheduler = RefreshScheduler(
+                    _shared_scraper, top=top,
+                    budget=float(os.environ.get('LETTERBOXD_REFRESH_BUDGET', 60))
+                )
+                _shared_scraper.refresh_scheduler = scheduler
+                scheduler.start(loop)
+        return _shared_scraper
+
+
+def warm_up(timeout=10):
+    """Prépare le tirage dans un thread démon : boucle, scraper et session partagés.
+
+    Appelée au chargement de l'application, elle retire du premier tirage
+    d'une instance qui démarre à froid l'import d'aiohttp et de lxml,
+    l'ouverture des bases SQLite et la création de la session. Retourne le
+    thread, qu'il est inutile d'attendre.
+    """
+    def prepare():
+        try:
+            with timed('warm_up'):
+                scraper = get_shared_async_scraper()
+                asyncio.run_coroutine_threadsafe(scraper.open_session(), get_shared_loop()).result(timeout)
+        except Exception as e:
+            logger.warning("Préparation du scraper impossible: %s", e)
+
+    thread = threading.Thread(target=prepare, name='letterboxd-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+async def _run_shared(coroutine):
+    future = asyncio.run_coroutine_threadsafe(coroutine, get_shared_loop())
+    return await asyncio.wrap_future(future)
+
+
+async def get_random_film(url, fast=False, filters=None, session=None):
+    """Tire un film avec le scraper partagé, depuis n'importe quelle boucle d'événements."""
+    return await _run_shared(
+        get_shared_async_scraper().get_films(url, fast=fast, filters=filters, session=session)
+    )
+
+
+def stream_random_film(url, fast=False, filters=None, session=None):
+    """Générateur des événements d'un tirage avec le scraper partagé.
+
+    Utilisable depuis n'importe quel thread (réponse Flask en flux) : le tirage
+    s'exécute sur la boucle partagée et ses événements de progression (voir
+    ``AsyncLetterboxdScraper.get_films``) sont restitués dès qu'ils se
+    produisent. Le dernier événement est ``film`` (le résultat complet) ou
+    ``error``. Fermer le générateur annule le tirage.
+    """
+    events = queue.Queue()
+    future = asyncio.run_coroutine_threadsafe(
+        get_shared_async_scraper().get_films(
+            url, fast=fast, progress=events.put, filters=filters, session=session
+        ),
+        get_shared_loop()
+    )
+    future.add_done_callback(lambda _: events.put(None))
+    try:
+        for event in iter(events.get, None):
+            yield event
+        try:
+            film = future.result()
+        except (IndexingInProgressError, HostPausedError) as e:
+            yield {'event': 'error', 'error': str(e), 'retry_after': e.retry_after}
+            return
+        except Exception as e:
+            yield {'event': 'error', 'error': str(e)}
+            return
+        if not film:
+            yield {'event': 'error', 'error': 'Aucun film trouvé dans cette liste.'}
+            return
+        yield dict(film, event='film')
+    finally:
+        future.cancel()
+
+
+async def get_random_group_film(usernames, mode='intersection', min_members=None,
+                                list_type='watchlist'):
+    """Tirage de groupe (voir ``AsyncLetterboxdScraper.get_group_film``) avec le scraper partagé."""
+    return await _run_shared(
+        get_shared_async_scraper().get_group_film(usernames, mode, min_members, list_type)
+    )
@@ -0,0 +1,147 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .list_store import default_store_path
+
+# Valeur retournée par ``get`` pour une clé absente ou expirée (None est une
+# valeur valide : elle sert à mémoriser les résultats négatifs)
+MISSING = object()
+
+
+class LRUCache:
+    """Cache mémoire borné en nombre d'entrées, avec expiration par entrée."""
+
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class PersistentCache:
+    """Cache clé/valeur persistant (SQLite), les valeurs étant sérialisées en JSON.
+
+    Plusieurs caches peuvent partager la même base grâce à leur ``namespace``.
+    Les entrées expirées sont purgées à l'ouverture puis toutes les
+    ``PURGE_INTERVAL`` écritures ; au-delà de ``max_entries`` entrées, les
+    plus anciennement écrites sont supprimées à cette occasion.
+    """
+
+    PURGE_INTERVAL = 256
+
+    def __init__(self, namespace, path=None, max_entries=100_000):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or default_store_path(), check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+            """)
+        self.purge()
+
+    def get_entry(self, key):
+        """Retourne ``(valeur, date d'expiration)`` ou MISSING si la clé est absente ou expirée."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, key)
+            ).fetchone()
+        if not row or row[1] <= time.time():
+            return MISSING
+        return json.loads(row[0]), row[1]
+
+    def get(self, key):
+        entry = self.get_entry(key)
+        return entry if entry is MISSING else entry[0]
+
+    def set(self, key, value, ttl):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), time.time() + ttl)
+            )
+            self._writes += 1
+            purge = self._writes % self.PURGE_INTERVAL == 0
+        if purge:
+            self.purge()
+
+    def purge_expired(self):
+        """Supprime les entrées expirées de ce namespace."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?",
+                (self.namespace, time.time())
+            )
+
+    def trim(self):
+        """Ramène ce namespace à ``max_entries`` entrées, en supprimant les plus anciennement écrites."""
+        if self.max_entries is None:
+            return
+        with self._lock, self._conn:
+            # Une réécriture (INSERT OR REPLACE) attribue un nouveau rowid
+            self._conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND rowid IN ("
+                "SELECT rowid FROM cache WHERE namespace = ? ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.max_entries)
+            )
+
+    def purge(self):
+        self.purge_expired()
+        self.trim()
+
+
+class TieredCache:
+    """Cache LRU en mémoire placé devant un cache persistant."""
+
+    def __init__(self, namespace, max_size=1024, path=None, persistent=True, max_entries=100_000):
+        self.memory = LRUCache(max_size)
+        self.persistent = PersistentCache(namespace, path, max_entries) if persistent else None
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not MISSING or self.persistent is None:
+            return value
+        entry = self.persistent.get_entry(key)
+        if entry is MISSING:
+            return MISSING
+        value, expires_at = entry
+        # Remonter l'entrée en mémoire jusqu'à son expiration persistante
+        self.memory.set(key, value, expires_at - time.time())
+        return value
+
+    def set(self, key, value, ttl):
+        self.memory.set(key, value, ttl)
+        if self.persistent is not None:
+            self.persistent.set(key, value, ttl)
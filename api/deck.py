@@ -0,0 +1,200 @@
+import random
+import sqlite3
+import threading
+import time
+import weakref
+from array import array
+
+from .list_store import default_store_path
+
+
+class Deck:
+    """Paquet mélangé des films d'une liste, tiré carte après carte.
+
+    Les cartes sont les identifiants entiers des films (voir
+    ``DeckStore.ids_for``), rangées dans un tableau compact avec un curseur :
+    les cartes avant le curseur ont déjà été tirées. Tirer une carte est en
+    O(1) et aucun film ne revient avant que le paquet ne soit épuisé.
+    ``version`` retient la version de la liste (voir ``ListStore``) avec
+    laquelle le paquet a été réconcilié pour la dernière fois.
+    """
+
+    __slots__ = ('cards', 'cursor', 'version')
+
+    def __init__(self, cards=(), cursor=0, version=None):
+        self.cards = array('I', cards)
+        self.cursor = cursor
+        self.version = version
+
+    @classmethod
+    def shuffled(cls, ids, rng=random, version=None):
+        cards = list(ids)
+        rng.shuffle(cards)
+        return cls(cards, version=version)
+
+    @property
+    def remaining(self):
+        return len(self.cards) - self.cursor
+
+    @property
+    def last(self):
+        """Dernière carte tirée, ou None."""
+        return self.cards[self.cursor - 1] if self.cursor else None
+
+    def draw(self):
+        """Tire la carte suivante, ou retourne None si le paquet est épuisé."""
+        if self.cursor >= len(self.cards):
+            return None
+        card = self.cards[self.cursor]
+        self.cursor += 1
+        return card
+
+    def reshuffle(self, rng=random):
+        """Remélange toutes les cartes ; la dernière tirée ne peut pas sortir en premier."""
+        last = self.last
+        cards = list(self.cards)
+        rng.shuffle(cards)
+        if len(cards) > 1 and cards[0] == last:
+            swap = rng.randrange(1, len(cards))
+            cards[0], cards[swap] = cards[swap], cards[0]
+        self.cards = array('I', cards)
+        self.cursor = 0
+
+    def reconcile(self, ids, rng=random):
+        """Aligne le paquet sur le contenu actuel de la liste.
+
+        Les films retirés de la liste disparaissent du paquet ; les films
+        ajoutés rejoignent les cartes restantes, qui sont remélangées. Les
+        cartes déjà tirées le restent. Retourne ``(ajoutés, retirés)``.
+        """
+        current = set(ids)
+        known = set(self.cards)
+        if current == known:
+            return 0, 0
+        added = [card for card in ids if card not in known]
+        removed = known - current
+        drawn = [card for card in self.cards[:self.cursor] if card not in removed]
+        remaining = [card for card in self.cards[self.cursor:] if card not in removed]
+        if added:
+            remaining += added
+            rng.shuffle(remaining)
+        self.cards = array('I', drawn + remaining)
+        self.cursor = len(drawn)
+        return len(added), len(removed)
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __repr__(self):
+        return f"<Deck: {self.remaining}/{len(self.cards)} cartes>"
+
+
+class DeckStore:
+    """Stockage persistant des paquets, par session de client et par liste.
+
+    Les chemins de films reçoivent un identifiant entier stable (table
+    ``film_ids``), si bien qu'un paquet tient dans un BLOB de 4 octets par
+    film. Tirer une carte d'un paquet inchangé ne réécrit que son curseur.
+    Les paquets inutilisés depuis ``max_age`` secondes sont supprimés.
+    ``locked`` sérialise les tirages d'un même paquet entre threads.
+    """
+
+    def __init__(self, path=None, max_age=7 * 24 * 3600):
+        self.path = path or default_store_path()
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # Un verrou par paquet en cours de tirage, libéré avec sa dernière référence
+        self._deck_locks = weakref.WeakValueDictionary()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS film_ids (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL UNIQUE
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS decks (
+                    session TEXT NOT NULL,
+                    username TEXT NOT NULL,
+                    list_key TEXT NOT NULL,
+                    cards BLOB NOT NULL,
+                    cursor INTEGER NOT NULL,
+                    version INTEGER,
+                    used_at REAL NOT NULL,
+                    PRIMARY KEY (session, username, list_key)
+                )
+            """)
+            # Bases créées quand les paquets retenaient la date de synchronisation
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(decks)")}
+            if 'version' not in columns:
+                self._conn.execute("ALTER TABLE decks ADD COLUMN version INTEGER")
+
+    def ids_for(self, paths, chunk_size=500):
+        """Retourne ``{chemin: identifiant}``, en attribuant un identifiant aux nouveaux chemins."""
+        paths = list(paths)
+        ids = {}
+        with self._lock, self._conn:
+            for start in range(0, len(paths), chunk_size):
+                chunk = paths[start:start + chunk_size]
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO film_ids (path) VALUES (?)", [(path,) for path in chunk]
+                )
+                rows = self._conn.execute(
+                    f"SELECT path, id FROM film_ids WHERE path IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                ids.update(rows)
+        return ids
+
+    def path_for(self, film_id):
+        with self._lock:
+            row = self._conn.execute("SELECT path FROM film_ids WHERE id = ?", (film_id,)).fetchone()
+        return row[0] if row else None
+
+    def locked(self, session, username, list_key):
+        """Verrou d'un paquet : le tenir de ``load`` à ``save`` rend le tirage atomique."""
+        key = (session, username, list_key)
+        with self._lock:
+            lock = self._deck_locks.get(key)
+            if lock is None:
+                lock = self._deck_locks[key] = threading.Lock()
+        return lock
+
+    def load(self, session, username, list_key):
+        """Retourne le paquet d'une session pour une liste, ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cards, cursor, version FROM decks "
+                "WHERE session = ? AND username = ? AND list_key = ?",
+                (session, username, list_key)
+            ).fetchone()
+        if not row:
+            return None
+        deck = Deck(cursor=row[1], version=row[2])
+        deck.cards.frombytes(row[0])
+        return deck
+
+    def save(self, session, username, list_key, deck):
+        """Enregistre un paquet entier (nouveau, remélangé ou réconcilié)."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO decks (session, username, list_key, cards, cursor, version, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session, username, list_key, deck.cards.tobytes(), deck.cursor, deck.version, now)
+            )
+            self._conn.execute("DELETE FROM decks WHERE used_at < ?", (now - self.max_age,))
+
+    def save_cursor(self, session, username, list_key, deck):
+        """Enregistre seulement la position du curseur d'un paquet inchangé."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE decks SET cursor = ?, used_at = ? "
+                "WHERE session = ? AND username = ? AND list_key = ?",
+                (deck.cursor, time.time(), session, username, list_key)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,108 @@
+import random
+import sys
+
+
+class FilmIndex:
+    """Ensemble ordonné et compact des films d'une liste.
+
+    Les films sont rangés par colonnes (chemin, titre, image, année) plutôt
+    qu'en dictionnaires : un film coûte quatre références et une entrée dans
+    l'index des chemins. Les titres et années, très répétés, sont internés.
+    L'index des chemins rend le dédoublonnage en O(1) ; l'accès par position
+    (et donc le tirage au sort) est aussi en O(1). Les films sont restitués
+    sous forme de dictionnaires ``{'name', 'path', 'image', 'year'}`` créés à
+    la demande.
+    """
+
+    __slots__ = ('_paths', '_names', '_images', '_years', '_positions')
+
+    def __init__(self, films=()):
+        self._paths = []
+        self._names = []
+        self._images = []
+        self._years = []
+        self._positions = {}
+        self.extend(films)
+
+    def add(self, name, path, image, year=''):
+        """Ajoute un film s'il n'est pas déjà présent ; retourne True s'il a été ajouté."""
+        if path in self._positions:
+            return False
+        self._positions[path] = len(self._paths)
+        self._paths.append(path)
+        self._names.append(sys.intern(name))
+        self._images.append(image)
+        self._years.append(sys.intern(year or ''))
+        return True
+
+    def add_film(self, film):
+        """Ajoute un film donné sous forme de dictionnaire."""
+        return self.add(film['name'], film['path'], film['image'], film.get('year', ''))
+
+    def extend(self, films):
+        """Ajoute plusieurs films ; retourne le nombre de films effectivement ajoutés."""
+        return sum(self.add_film(film) for film in films)
+
+    def position(self, path):
+        """Position d'un film dans l'index, ou None s'il en est absent."""
+        return self._positions.get(path)
+
+    def choice(self, rng=random):
+        """Tire un film uniformément au hasard."""
+        if not self._paths:
+            raise IndexError("Impossible de tirer un film dans une liste vide")
+        return self[rng.randrange(len(self._paths))]
+
+    def __getitem__(self, position):
+        return {
+            'name': self._names[position],
+            'path': self._paths[position],
+            'image': self._images[position],
+            'year': self._years[position],
+        }
+
+    def __len__(self):
+        return len(self._paths)
+
+    def __contains__(self, path):
+        return path in self._positions
+
+    def __iter__(self):
+        for position in range(len(self._paths)):
+            yield self[position]
+
+    def __eq__(self, other):
+        if isinstance(other, FilmIndex):
+            return (
+                self._paths == other._paths and self._names == other._names
+                and self._images == other._images and self._years == other._years
+            )
+        if isinstance(other, list):
+            return list(self) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"<FilmIndex: {len(self)} films>"
+
+
+def combine(indexes, min_members):
+    """Combine les listes de plusieurs membres d'un groupe.
+
+    Retourne ``(candidats, nombres)`` : les films présents dans au moins
+    ``min_members`` des index (``len(indexes)`` pour l'intersection, 1 pour
+    l'union), dans l'ordre de première apparition, et pour chacun le nombre de
+    membres qui l'ont.
+    """
+    counts = {}
+    for index in indexes:
+        for path in index._paths:
+            counts[path] = counts.get(path, 0) + 1
+    candidates = FilmIndex()
+    members = []
+    for index in indexes:
+        for position, path in enumerate(index._paths):
+            if counts[path] >= min_members and candidates.add(
+                index._names[position], path, index._images[position], index._years[position]
+            ):
+                members.append(counts[path])
+    return candidates, members
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+def default_image_cache_dir():
+    """Répertoire par défaut du cache d'images (surchargeable via IMAGE_CACHE_DIR)."""
+    return os.environ.get(
+        'IMAGE_CACHE_DIR',
+        os.path.join(tempfile.gettempdir(), 'roulette_letterboxd_images')
+    )
+
+
+class DiskImageCache:
+    """Cache disque des posters, borné en taille avec éviction LRU.
+
+    Chaque image est stockée sous le hachage SHA-256 de son URL, accompagnée
+    d'un petit fichier JSON conservant son type MIME. La date de modification
+    des fichiers sert d'horodatage d'accès pour l'éviction.
+    """
+
+    def __init__(self, directory=None, max_bytes=200 * 1024 * 1024):
+        self.directory = directory or default_image_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def key(url):
+        """Identifiant stable d'une image, utilisé aussi comme ETag."""
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.directory, key)
+        return base + '.img', base + '.json'
+
+    def lookup(self, url):
+        """Retourne ``(chemin, type MIME)`` si l'image est en cache, sinon None."""
+        image_path, meta_path = self._paths(self.key(url))
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                content_type = json.load(f)['content_type']
+            os.utime(image_path)
+        except (OSError, ValueError, KeyError):
+            return None
+        return image_path, content_type
+
+    def writer(self, url, content_type):
+        """Retourne un écrivain qui n'ajoute l'image au cache qu'une fois complète."""
+        return _CacheWriter(self, self.key(url), content_type)
+
+    def _commit(self, key, tmp_path, content_type):
+        image_path, meta_path = self._paths(key)
+        with self._lock:
+            os.replace(tmp_path, image_path)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'content_type': content_type}, f)
+            self._evict()
+
+    def _evict(self):
+        """Supprime les images les moins récemment servies au-delà de ``max_bytes``."""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.img'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for stale in (path, path[:-len('.img')] + '.json'):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            total -= size
+
+
+class _CacheWriter:
+    def __init__(self, cache, key, content_type):
+        self.cache = cache
+        self.key = key
+        self.content_type = content_type
+        self.size = 0
+        fd, self.tmp_path = tempfile.mkstemp(dir=cache.directory, suffix='.part')
+        self._file = os.fdopen(fd, 'wb')
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self._file is not None:
+            if self.size > self.cache.max_bytes:
+                # Image plus grande que le cache entier : elle ne sera pas conservée
+                self.abort()
+            else:
+                self._file.write(chunk)
+
+    def commit(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        self.cache._commit(self.key, self.tmp_path, self.content_type)
+
+    def abort(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
@@ -1,69 +1,27 @@
-from flask import Flask, render_template, request, jsonify
-from .letterboxd_scraper import LetterboxdScraper
+from flask import Flask
+from .async_scraper import warm_up
+from .observability import configure_logging
+from .routes import routes
 from flask_wtf import CSRFProtect
 import os
-import requests
 
-app = Flask(__name__, 
+configure_logging()
+
+app = Flask(__name__,
     static_folder=os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static')),
     template_folder=os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates'))
 )
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', os.urandom(24))
 csrf = CSRFProtect(app)
 
-@app.route('/')
-def index():
-    return render_template('index.html')
+# Routes partagées avec app.py (voir api/routes.py)
+app.register_blueprint(routes)
 
-@app.route('/api/random-movie', methods=['POST'])
-def get_random_movie():
-    try:
-        # Récupération des données depuis le JSON
-        data = request.get_json()
-        list_type = data.get('type')
-        username = data.get('username')
-        
-        # Fallback pour form-data
-        if not list_type and request.form:
-            list_type = request.form.get('type')
-            username = request.form.get('username')
-            
-        if not list_type or not username:
-            return jsonify({'error': 'Type de liste et pseudo requis'}), 400
-            
-        # Construction de l'URL selon le type
-        try:
-            if list_type == 'watchlist':
-                url = f'https://letterboxd.com/{username}/watchlist/'
-            elif list_type == 'list':
-                # Pour les listes personnalisées, on utilise l'URL complète
-                if not username.startswith('http'):
-                    return jsonify({'error': 'Pour les listes personnalisées, veuillez entrer l\'URL complète de la liste (ex: https://letterboxd.com/username/list/nom-de-la-liste/)'}), 400
-                # Utiliser directement l'URL fournie
-                url = username.rstrip('/')
-            elif list_type == 'films':
-                url = f'https://letterboxd.com/{username}/films/'
-            else:
-                return jsonify({'error': 'Type de liste invalide'}), 400
-        except Exception as e:
-            return jsonify({'error': f'Erreur lors de la construction de l\'URL: {str(e)}'}), 400
-        
-        try:
-            scraper = LetterboxdScraper()
-            film = scraper.get_films(url)
-            
-            if not film:
-                return jsonify({'error': 'Aucun film trouvé dans cette liste.'}), 404
-            
-            return jsonify(film)
-        except requests.exceptions.RequestException as e:
-            return jsonify({'error': 'Impossible d\'accéder à la liste. Vérifiez que le pseudo ou le nom de la liste est correct.'}), 404
-        except Exception as e:
-            return jsonify({'error': f'Erreur lors de la récupération des films: {str(e)}'}), 500
-    
-    except Exception as e:
-        return jsonify({'error': f'Une erreur est survenue: {str(e)}'}), 500
+# Scraper, boucle et session préparés en arrière-plan pendant que l'instance
+# sert ses premières requêtes (LETTERBOXD_WARM_UP=0 pour s'en passer)
+if os.environ.get('LETTERBOXD_WARM_UP', '1') != '0':
+    warm_up()
 
 # Pour le développement local
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    app.run(debug=True)
\ No newline at end of file
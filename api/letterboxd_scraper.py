@@ -1,118 +1,270 @@
-import requests
-from bs4 import BeautifulSoup
 import random
 from urllib.parse import urljoin, urlparse, quote
 import time
 import json
 import re
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import logging
 import os
+import threading
+import unicodedata
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from .cache import MISSING, TieredCache
+from .deck import DeckStore
+from .film_index import FilmIndex
+from .list_store import get_default_store
+from .metadata import MetadataIndex
+from .observability import CACHE_REQUESTS, timed
+from .parsers import get_engine, parse_list_stream
+from .sampling import Reservoir
+from .single_flight import SingleFlight
+from .snapshot import get_default_snapshot
+from .throttle import HostPausedError, HostRateLimiters, get_shared_limiters, parse_retry_after
+from .transport import (
+    DEFAULT_HEADERS, MAX_RETRIES, RETRY_BACKOFF, RETRY_STATUSES, ListUnreachableError, get_shared_session
+)
 
-class LetterboxdScraper:
-    def __init__(self):
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-            'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Accept-Encoding': 'gzip, deflate',  # Simplified encoding acceptance
-            'Cache-Control': 'no-cache',
-            'Pragma': 'no-cache',
-            'Connection': 'keep-alive'
-        }
-        self.base_url = "https://letterboxd.com"
+logger = logging.getLogger(__name__)
+
+# Résultat de l'analyse d'une page de liste
+ListPage = namedtuple('ListPage', ['films', 'has_next', 'last_page'])
+
+_USE_DEFAULT_STORE = object()
+
+
+class RequestContext:
+    """État d'une requête de tirage : la liste visée."""
+
+    __slots__ = ('username', 'list_type', 'list_slug')
+
+    def __init__(self, username=None, list_type=None, list_slug=None):
+        self.username = username
+        self.list_type = list_type
+        self.list_slug = list_slug
+
+
+class ListCrawl:
+    """Parcours complet d'une liste : pages lues, films dédoublonnés par chemin.
+
+    Les scrapers ne font que récupérer les pages et les confient, dans l'ordre,
+    à ``add`` ; une page en échec est signalée par ``fail``, qui arrête le
+    parcours. ``complete`` n'est vrai que si la fin de la liste a été atteinte
+    sans échec : seul un parcours complet peut remplacer la copie stockée.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.films = FilmIndex()
+        self.page = 0
+        self.last_page = 1
+        self.has_next = True
+        self.failed = False
+
+    def page_url(self, number):
+        return f"{self.base_url}page/{number}/" if number > 1 else self.base_url
+
+    def add(self, number, page):
+        """Enregistre la page ``number`` ; retourne False si elle est vide (fin de liste)."""
+        if not page.films:
+            logger.debug("Aucun film trouvé sur la page %s", number)
+            self.has_next = False
+            return False
+        logger.debug("Films trouvés sur la page %s: %s", number, len(page.films))
+        self.films.extend(page.films)
+        if number == 1:
+            self.last_page = page.last_page or 1
+        self.page, self.has_next = number, page.has_next
+        return True
+
+    def fail(self, number, error):
+        logger.warning("Erreur lors de la récupération de la page %s: %s", number, error)
+        self.failed = True
+        self.has_next = False
+
+    @property
+    def remaining_pages(self):
+        """Pages annoncées par la pagination de la page 1, à récupérer en concurrence."""
+        if self.page != 1 or not self.has_next:
+            return range(0)
+        return range(2, self.last_page + 1)
+
+    @property
+    def complete(self):
+        return not self.failed and not self.has_next
+
+    def result(self):
+        """``{'films': FilmIndex, 'complete': bool}``, ou None si aucun film n'a été lu."""
+        if not self.films:
+            return None
+        if self.complete:
+            logger.info("Nombre total de films uniques trouvés: %s", len(self.films))
+        else:
+            logger.warning("Parcours interrompu après %s films (page %s)", len(self.films), self.page)
+        return {'films': self.films, 'complete': self.complete}
+
+
+def _context_attribute(name):
+    """Expose un champ du contexte de la requête courante comme attribut du scraper."""
+    def getter(self):
+        return getattr(self._context, name)
+
+    def setter(self, value):
+        setattr(self._context, name, value)
+
+    return property(getter, setter)
+
+
+class LetterboxdCore:
+    """Configuration et code partagés par les scrapers synchrone et asynchrone.
+
+    Analyse des pages, URL des listes, caches des posters et des détails,
+    stockage des listes, index des métadonnées et paquets : rien ici n'émet
+    de requête HTTP. ``LetterboxdScraper`` en hérite et ajoute les requêtes
+    bloquantes ; ``AsyncLetterboxdScraper`` en compose une instance.
+    """
+
+    # Suffixes d'URL triant une liste par date d'ajout (plus récent en premier)
+    ADDED_SORT_PATHS = {
+        'watchlist': 'by/added/',
+        'films': 'by/date/',
+        'list': 'by/added/',
+    }
+    
+    # Taille des morceaux lus lors de l'analyse en flux des pages de liste
+    STREAM_CHUNK_SIZE = 16 * 1024
+    
+    # Durées de conservation des posters TMDB (trouvés / introuvables)
+    POSTER_TTL = 30 * 24 * 3600
+    POSTER_NEGATIVE_TTL = 24 * 3600
+    
+    # Image affichée lorsqu'aucun poster n'a été trouvé sur TMDB
+    PLACEHOLDER_POSTER = 'https://via.placeholder.com/300x450?text=Pas+d%27image'
+    
+    # Adresses des services distants, surchargeables (serveur de substitution local)
+    BASE_URL = "https://letterboxd.com"
+    TMDB_BASE_URL = "https://api.themoviedb.org"
+    TMDB_IMAGE_BASE_URL = "https://image.tmdb.org"
+
+    def __init__(self, list_store=_USE_DEFAULT_STORE, refresh_interval=30,
+                 full_sync_interval=24 * 3600, max_delta_pages=3,
+                 max_workers=4, max_requests_per_second=None, parser=None,
+                 stream_pages=True, poster_cache=None,
+                 details_cache=None, details_ttl=6 * 3600, details_max_stale=7 * 24 * 3600,
+                 base_url=None, tmdb_base_url=None, tmdb_image_base_url=None,
+                 metadata_index=_USE_DEFAULT_STORE, deck_store=_USE_DEFAULT_STORE,
+                 snapshot=_USE_DEFAULT_STORE):
+        self.headers = DEFAULT_HEADERS
+        self.base_url = (base_url or os.environ.get('LETTERBOXD_BASE_URL', self.BASE_URL)).rstrip('/')
+        self.tmdb_base_url = (
+            tmdb_base_url or os.environ.get('TMDB_BASE_URL', self.TMDB_BASE_URL)
+        ).rstrip('/')
+        self.tmdb_image_base_url = (
+            tmdb_image_base_url or os.environ.get('TMDB_IMAGE_BASE_URL', self.TMDB_IMAGE_BASE_URL)
+        ).rstrip('/')
         self.tmdb_api_key = os.environ.get('TMDB_API_KEY', '8c247ea0b4b56ed2ff7d41c9a833aa77')  # Clé API publique TMDB
-        self.session = requests.Session()
-        
-        # Configure retry strategy
-        retry_strategy = Retry(
-            total=3,  # number of retries
-            backoff_factor=1,  # wait 1, 2, 4 seconds between retries
-            status_forcelist=[429, 500, 502, 503, 504],  # HTTP status codes to retry on
-            allowed_methods=["GET"]
+        
+        # Moteur d'analyse HTML (lxml avec html5lib en secours par défaut)
+        self.parser = get_engine(parser)
+        self.debug_html = os.environ.get('LETTERBOXD_DEBUG_HTML') == '1'
+        self.stream_pages = stream_pages  # analyse en flux des pages de liste
+        
+        # Stockage persistant des listes (None pour désactiver)
+        self.list_store = get_default_store() if list_store is _USE_DEFAULT_STORE else list_store
+        self.refresh_interval = refresh_interval  # secondes sans aucune requête
+        self.full_sync_interval = full_sync_interval  # secondes avant une resynchronisation complète
+        self.max_delta_pages = max_delta_pages
+        
+        # Index des métadonnées des films (tirages filtrés), dans la base du
+        # stockage des listes ; en mémoire si celui-ci est désactivé
+        if metadata_index is _USE_DEFAULT_STORE:
+            metadata_index = MetadataIndex(self.list_store.path if self.list_store is not None else ':memory:')
+        self.metadata_index = metadata_index
+        # Paquets mélangés par session de client (tirages sans répétition),
+        # dans la même base
+        if deck_store is _USE_DEFAULT_STORE:
+            deck_store = DeckStore(self.list_store.path if self.list_store is not None else ':memory:')
+        self.deck_store = deck_store
+        # Instantané des listes connues (démarrage à froid), copié dans le
+        # stockage liste par liste à la première demande
+        if snapshot is _USE_DEFAULT_STORE:
+            snapshot = get_default_snapshot() if self.list_store is not None else None
+        self.snapshot = snapshot
+        self.max_fast_attempts = 10  # tirages rejetés avant de revenir au parcours complet
+        
+        # Récupération parallèle des pages, à débit adapté hôte par hôte ;
+        # les limiteurs sont partagés par le processus sauf débit maximal explicite
+        self.max_workers = max_workers
+        self.rate_limiters = (
+            get_shared_limiters() if max_requests_per_second is None
+            else HostRateLimiters(max_requests_per_second)
         )
-        adapter = HTTPAdapter(max_retries=retry_strategy)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
         
-        self.session.headers.update(self.headers)
-
-    def _is_valid_letterboxd_list_url(self, url):
-        """Vérifie si l'URL est une liste Letterboxd valide."""
-        try:
-            parsed = urlparse(url)
-            if parsed.netloc != "letterboxd.com":
-                return False
-            
-            path_parts = parsed.path.strip('/').split('/')
-            
-            # Cas des listes personnalisées
-            if path_parts[0] == 'list' and len(path_parts) >= 2:
-                self.list_type = 'list'
-                self.list_slug = path_parts[1]
-                return True
-            
-            # Cas des watchlists et films
-            if len(path_parts) >= 2:
-                self.username = path_parts[0]
-                self.list_type = path_parts[1]
-                
-                # Vérifier si c'est un profil privé connu
-                if self.list_type == 'profile-private':
-                    raise Exception("Ce profil est privé. Les listes ne sont pas accessibles.")
-                
-                # Vérifier le type de liste
-                if self.list_type in ['watchlist', 'films']:
-                    return True
-            
-            return False
-            
-        except Exception as e:
-            if str(e).startswith("Ce profil"):
-                raise
-            return False
+        # Cache des posters TMDB (LRU en mémoire devant un cache persistant)
+        self.poster_cache = poster_cache or TieredCache('tmdb_posters')
+        
+        # Cache des détails de films, servis périmés pendant leur rafraîchissement
+        self.details_cache = details_cache or TieredCache('film_details')
+        self.details_ttl = details_ttl
+        self.details_max_stale = details_max_stale
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
 
     def _analyze_html_structure(self, soup):
         """Analyse la structure HTML pour le débogage."""
-        print("\nAnalyse de la structure HTML:")
+        logger.debug("Analyse de la structure HTML:")
         
         # Vérifier la présence du conteneur principal
         main_content = soup.find('div', {'id': 'content'})
-        print(f"Conteneur principal trouvé: {bool(main_content)}")
+        logger.debug("Conteneur principal trouvé: %s", bool(main_content))
         
         # Vérifier les classes principales
-        print("\nClasses principales trouvées:")
+        logger.debug("Classes principales trouvées:")
         all_classes = set()
         for tag in soup.find_all(class_=True):
             all_classes.update(tag.get('class', []))
-        print(f"Nombre total de classes uniques: {len(all_classes)}")
-        print("Classes pertinentes trouvées:")
+        logger.debug("Nombre total de classes uniques: %s", len(all_classes))
+        logger.debug("Classes pertinentes trouvées:")
         relevant_classes = ['poster-container', 'film-poster', 'poster', 'film-detail']
         for class_name in relevant_classes:
             elements = soup.find_all(class_=class_name)
-            print(f"- {class_name}: {len(elements)} éléments")
+            logger.debug("- %s: %s éléments", class_name, len(elements))
         
         # Vérifier les balises img
         images = soup.find_all('img')
-        print(f"\nNombre total d'images: {len(images)}")
-        print("Attributs des images:")
+        logger.debug("Nombre total d'images: %s", len(images))
+        logger.debug("Attributs des images:")
         for img in images[:5]:  # Afficher les 5 premières images
-            print(f"- alt: {img.get('alt', 'None')}")
-            print(f"  src: {img.get('src', 'None')}")
-            print(f"  data-src: {img.get('data-src', 'None')}")
-            print("---")
+            logger.debug("- alt: %s", img.get('alt', 'None'))
+            logger.debug("  src: %s", img.get('src', 'None'))
+            logger.debug("  data-src: %s", img.get('data-src', 'None'))
+            logger.debug("---")
         
         return all_classes
 
+    def _html_film_record(self, film_path, title):
+        """Construit un film extrait par la méthode HTML classique."""
+        # Nettoyer le titre
+        title = title.replace('-', ' ').title()
+        
+        # Extraire l'ID du film et construire l'URL du poster
+        film_id = film_path.strip('/').split('/')[-1]
+        poster_url = f"https://a.ltrbxd.com/resized/film-poster/{film_id}/0/500/0-750-0-70-crop.jpg"
+        
+        return {
+            'name': title or 'Sans titre',
+            'path': film_path,
+            'image': poster_url
+        }
+
     def _extract_films_from_html(self, html_content):
         """Extrait les films depuis le contenu HTML avec plusieurs méthodes."""
-        films = []
-        soup = BeautifulSoup(html_content, 'html5lib')
+        films = FilmIndex()
+        page = self.parser.parse_list_page(html_content)
         
-        print("\nDébut de l'analyse de la page...")
+        logger.debug("Début de l'analyse de la page...")
         
         # Vérifier si nous sommes sur une version limitée de la page
-        if soup.select('.sign-in-message') or soup.select('.sign-in-overlay'):
+        if page.sign_in_required:
             raise Exception("Cette liste nécessite une connexion pour voir les films.")
             
         # Détecter les messages d'erreur spécifiques
@@ -126,20 +278,49 @@ class LetterboxdScraper:
             if message.lower() in html_content.lower():
                 raise Exception("Cette liste nécessite une connexion pour voir les films.")
         
-        # Analyser la structure HTML
-        all_classes = self._analyze_html_structure(soup)
+        # Analyser la structure HTML (débogage uniquement : nécessite un arbre complet)
+        if self.debug_html:
+            from bs4 import BeautifulSoup
+            self._analyze_html_structure(BeautifulSoup(html_content, 'html5lib'))
         
         # Vérifier si nous avons accès au contenu complet
-        film_grid = soup.select_one('.films-grid')
-        if not film_grid:
-            film_grid = soup.select_one('.poster-list')
-        
-        if not film_grid:
+        if not page.has_grid:
             raise Exception("Impossible d'accéder au contenu de la liste. Une connexion est probablement requise.")
         
-        # Rechercher les films avec différents sélecteurs
+        # Sélecteur principal (li.poster-container), extrait par le moteur d'analyse
+        for poster in page.posters:
+            try:
+                # Extraire l'URL du film
+                if poster['poster']:
+                    film_path = poster['poster']['target_link'] or poster['poster']['href'] or ''
+                elif poster['link_href'] is not None:
+                    film_path = poster['link_href']
+                else:
+                    continue
+                if not film_path:
+                    continue
+                
+                # Extraire le titre
+                title = poster['film_name'] or poster['film_slug'] or ''
+                if not title and poster['img']:
+                    title = poster['img']['alt'] or ''
+                
+                film_data = self._html_film_record(film_path, title)
+                if films.add_film(film_data):
+                    logger.debug("Film trouvé: %s", film_data['name'])
+                
+            except Exception as e:
+                logger.warning("Erreur lors de l'extraction d'un film: %s", e)
+                continue
+        
+        if films:
+            logger.debug("Nombre total de films trouvés: %s", len(films))
+            return films
+        
+        # Sélecteurs de secours, pour les structures de page inhabituelles
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(html_content, 'html5lib')
         selectors = [
-            'li.poster-container',
             'div.film-poster',
             '.poster-list li',
             '.poster-container'
@@ -148,8 +329,8 @@ class LetterboxdScraper:
         for selector in selectors:
             elements = soup.select(selector)
             if elements:
-                print(f"\nUtilisation du sélecteur: {selector}")
-                print(f"Éléments trouvés: {len(elements)}")
+                logger.debug("Utilisation du sélecteur: %s", selector)
+                logger.debug("Éléments trouvés: %s", len(elements))
                 
                 for element in elements:
                     try:
@@ -170,31 +351,18 @@ class LetterboxdScraper:
                             if img:
                                 title = img.get('alt', '')
                         
-                        # Nettoyer le titre
-                        title = title.replace('-', ' ').title()
-                        
-                        # Extraire l'ID du film et construire l'URL du poster
-                        film_id = film_path.strip('/').split('/')[-1]
-                        poster_url = f"https://a.ltrbxd.com/resized/film-poster/{film_id}/0/500/0-750-0-70-crop.jpg"
-                        
-                        film_data = {
-                            'name': title or 'Sans titre',
-                            'path': film_path,
-                            'image': poster_url
-                        }
-                        
-                        if film_data not in films:
-                            films.append(film_data)
-                            print(f"Film trouvé: {film_data['name']}")
+                        film_data = self._html_film_record(film_path, title)
+                        if films.add_film(film_data):
+                            logger.debug("Film trouvé: %s", film_data['name'])
                         
                     except Exception as e:
-                        print(f"Erreur lors de l'extraction d'un film: {str(e)}")
+                        logger.warning("Erreur lors de l'extraction d'un film: %s", e)
                         continue
                 
                 if films:
                     break
         
-        print(f"\nNombre total de films trouvés: {len(films)}")
+        logger.debug("Nombre total de films trouvés: %s", len(films))
         return films
 
     def _improve_image_quality(self, poster_url):
@@ -221,14 +389,22 @@ class LetterboxdScraper:
         
         return poster_url
 
-    def _check_page_accessibility(self, response):
-        """Vérifie si la page est accessible et fournit des informations détaillées sur les problèmes."""
-        # Vérifier la redirection vers la page de connexion
-        if 'sign-in' in response.url or 'login' in response.url:
+    def _check_url_accessibility(self, url):
+        """Vérifie que la requête n'a pas été redirigée vers la page de connexion."""
+        with timed('accessibility_check'):
+            self._check_redirect(url)
+
+    def _check_redirect(self, url):
+        if 'sign-in' in url or 'login' in url:
             raise Exception("Cette liste nécessite une connexion. Assurez-vous que la liste est publique.")
-        
-        # Vérifier le contenu pour des messages spécifiques
-        content_lower = response.text.lower()
+
+    def _check_content_accessibility(self, html_content):
+        """Recherche dans le contenu les messages signalant une page inaccessible."""
+        with timed('accessibility_check'):
+            self._check_content_messages(html_content)
+
+    def _check_content_messages(self, html_content):
+        content_lower = html_content.lower()
         
         if "this profile is private" in content_lower or "ce profil est privé" in content_lower:
             raise Exception("Ce profil est privé. Les listes ne sont pas accessibles.")
@@ -242,279 +418,833 @@ class LetterboxdScraper:
         if "page not found" in content_lower or "page non trouvée" in content_lower:
             raise Exception("Cette liste n'existe pas. Vérifiez l'URL.")
 
-    def _get_films_from_api(self, username, list_type):
-        """Tente de récupérer les films via l'API AJAX de Letterboxd."""
-        try:
-            # Construire l'URL de base
-            base_url = f"https://letterboxd.com/{username}/"
-            if list_type == 'watchlist':
-                base_url += "watchlist/"
-            elif list_type == 'films':
-                base_url += "films/"
-            else:
-                return None
+    def _list_base_url(self, username, list_type, list_slug=None, by_added=False):
+        """Construit l'URL de base d'une liste, éventuellement triée par date d'ajout."""
+        if list_type in ('watchlist', 'films'):
+            base_url = f"{self.base_url}/{username}/{list_type}/"
+        elif list_type == 'list' and list_slug:
+            base_url = f"{self.base_url}/{username}/list/{list_slug}/"
+        else:
+            return None
+        if by_added:
+            base_url += self.ADDED_SORT_PATHS[list_type]
+        return base_url
 
-            all_films = []
-            page = 1
-            has_more_pages = True
-            seen_films = set()  # Pour éviter les doublons
+    def _parse_list_page(self, html_content):
+        """Extrait les films d'une page de liste et indique s'il existe une page suivante."""
+        return self._films_from_page(self.parser.parse_list_page(html_content))
 
-            while has_more_pages:
-                # Construire l'URL de la page
-                page_url = f"{base_url}page/{page}/" if page > 1 else base_url
-                print(f"\nRécupération de la page {page}: {page_url}")
+    def _films_from_page(self, page):
+        """Construit les films à partir des enregistrements bruts d'une page de liste."""
+        films = []
+        
+        # Extraire les informations de chaque film
+        for poster in page.posters:
+            try:
+                if not poster['poster']:
+                    continue
                 
-                try:
-                    # Faire la requête
-                    response = self.session.get(page_url, timeout=10)
-                    response.raise_for_status()
-                    
-                    # Vérifier l'accessibilité de la page
-                    self._check_page_accessibility(response)
-                    
-                    # Parser le HTML
-                    soup = BeautifulSoup(response.text, 'html5lib')
-                    
-                    # Trouver tous les films sur la page
-                    film_elements = soup.select('li.poster-container')
-                    
-                    if not film_elements:
-                        print("Aucun film trouvé sur cette page")
-                        has_more_pages = False
-                        continue
-                    
-                    print(f"Films trouvés sur la page {page}: {len(film_elements)}")
-                    
-                    # Extraire les informations de chaque film
-                    for container in film_elements:
-                        try:
-                            film_link = container.select_one('div.film-poster')
-                            if not film_link:
-                                continue
-                            
-                            # Extraire l'URL du film
-                            film_path = film_link.get('data-target-link', '')
-                            if not film_path:
-                                link_element = container.select_one('a')
-                                if link_element:
-                                    film_path = link_element.get('href', '')
-                            
-                            if not film_path:
-                                continue
-                            
-                            # Vérifier si nous avons déjà vu ce film
-                            if film_path in seen_films:
-                                continue
-                            
-                            seen_films.add(film_path)
-                            
-                            # Extraire le titre
-                            title = container.get('data-film-name', '')
-                            if not title:
-                                img = container.select_one('img')
-                                if img:
-                                    title = img.get('alt', '')
-                            
-                            # Extraire l'URL du poster
-                            img = container.select_one('img')
-                            if img:
-                                # Essayer d'abord les attributs standards
-                                poster_url = img.get('src', '') or img.get('data-src', '')
-                                
-                                # Nettoyer l'URL si elle commence par @
-                                if poster_url and poster_url.startswith('@'):
-                                    poster_url = poster_url[1:]
-                                
-                                # Si pas d'URL ou poster vide, construire l'URL avec l'ID du film
-                                if not poster_url or 'empty-poster' in poster_url:
-                                    film_id = film_path.strip('/').split('/')[-1]
-                                    # Utiliser l'API AJAX de Letterboxd
-                                    poster_url = f"https://letterboxd.com/ajax/poster/film/{film_id}/std/300x450/"
-                            else:
-                                # Si pas d'image trouvée, utiliser une image par défaut
-                                poster_url = 'https://via.placeholder.com/300x450?text=Pas+d%27image'
-                            
-                            film_data = {
-                                'name': title or 'Sans titre',
-                                'path': film_path,
-                                'image': poster_url
-                            }
-                            
-                            all_films.append(film_data)
-                            print(f"Film trouvé: {film_data['name']}")
-                            
-                        except Exception as e:
-                            print(f"Erreur lors de l'extraction d'un film: {str(e)}")
-                            continue
+                # Extraire l'URL du film
+                film_path = poster['poster']['target_link'] or poster['link_href'] or ''
+                if not film_path:
+                    continue
+                
+                # Extraire le titre
+                img = poster['img']
+                title = poster['film_name'] or ''
+                if not title and img:
+                    title = img['alt'] or ''
+                
+                # Extraire l'URL du poster
+                if img:
+                    # Essayer d'abord les attributs standards
+                    poster_url = img['src'] or img['data_src'] or ''
                     
-                    # Vérifier s'il y a une page suivante
-                    next_page = soup.select_one('a.next')
-                    if not next_page:
-                        has_more_pages = False
-                    else:
-                        page += 1
-                        # Ajouter un petit délai pour éviter de surcharger le serveur
-                        time.sleep(0.5)
+                    # Nettoyer l'URL si elle commence par @
+                    if poster_url and poster_url.startswith('@'):
+                        poster_url = poster_url[1:]
                     
-                except Exception as e:
-                    print(f"Erreur lors de la récupération de la page {page}: {str(e)}")
-                    has_more_pages = False
+                    # Si pas d'URL ou poster vide, construire l'URL avec l'ID du film
+                    if not poster_url or 'empty-poster' in poster_url:
+                        film_id = film_path.strip('/').split('/')[-1]
+                        # Utiliser l'API AJAX de Letterboxd
+                        poster_url = f"{self.base_url}/ajax/poster/film/{film_id}/std/300x450/"
+                else:
+                    # Si pas d'image trouvée, utiliser une image par défaut
+                    poster_url = 'https://via.placeholder.com/300x450?text=Pas+d%27image'
+                
+                films.append({
+                    'name': title or 'Sans titre',
+                    'path': film_path,
+                    'image': poster_url,
+                    'year': poster['poster']['release_year'] or ''
+                })
+                
+            except Exception as e:
+                logger.warning("Erreur lors de l'extraction d'un film: %s", e)
+                continue
+        
+        # Vérifier s'il y a une page suivante
+        has_next = bool(page.posters) and page.has_next
+        
+        return ListPage(films, has_next, page.last_page)
+
+    def _list_state(self, username, list_key):
+        """Dates de synchronisation d'une liste stockée, reprise de l'instantané au besoin.
+
+        Une liste absente du stockage mais présente dans l'instantané y est
+        copiée avec ses métadonnées. Elle compte comme entièrement
+        synchronisée à l'instant présent : la synchronisation incrémentale ne
+        récupère que les films ajoutés depuis l'export, et les films retirés
+        depuis ne disparaissent qu'à la synchronisation complète suivante.
+        """
+        state = self.list_store.get_state(username, list_key)
+        if state is not None or self.snapshot is None:
+            return state
+        exported = self.snapshot.get_state(username, list_key)
+        if exported is None:
+            return None
+        with timed('snapshot_load'):
+            films, metadata = self.snapshot.read_list(username, list_key)
+            self.list_store.replace(
+                username, list_key, films, synced_at=exported['synced_at'], full_synced_at=time.time()
+            )
+            if metadata and self.metadata_index is not None:
+                self.metadata_index.merge(metadata)
+        logger.info("Liste %s/%s reprise de l'instantané (%s films)", username, list_key, len(films))
+        return self.list_store.get_state(username, list_key)
+
+    def _is_list_stored(self, username, list_type, list_slug=None):
+        """Indique si le stockage (ou l'instantané) contient une copie exploitable de la liste."""
+        if self.list_store is None:
+            return False
+        state = self._list_state(username, self.list_store.list_key(list_type, list_slug))
+        return bool(state) and time.time() - state['full_synced_at'] < self.full_sync_interval
+
+    def _apply_delta(self, username, list_key, delta):
+        """Enregistre le résultat d'une synchronisation incrémentale et retourne la liste."""
+        new_films, reached_known = delta
+        if not reached_known:
+            if not new_films:
+                return None
+            self.list_store.replace(username, list_key, new_films)
+        elif new_films:
+            logger.info("%s nouveau(x) film(s) depuis la dernière synchronisation", len(new_films))
+            self.list_store.prepend(username, list_key, new_films)
+        else:
+            self.list_store.touch(username, list_key)
+        return self.list_store.get_films(username, list_key)
+
+    def _sync_plan(self, username, list_key, lead=0):
+        """Synchronisation nécessaire pour une liste stockée. Bloquant.
+
+        Retourne ``('stored', films)`` si la copie stockée est à jour,
+        ``('delta', chemins connus)`` si une synchronisation incrémentale
+        suffit, ``('full', None)`` s'il faut parcourir toute la liste.
+        """
+        state = self._list_state(username, list_key)
+        now = time.time() + lead
+        if state and now - state['full_synced_at'] < self.full_sync_interval:
+            if now - state['synced_at'] < self.refresh_interval:
+                return 'stored', self.list_store.get_films(username, list_key)
+            return 'delta', self.list_store.known_paths(username, list_key)
+        return 'full', None
+
+    @staticmethod
+    def _scan_delta(new_films, films, known_paths):
+        """Ajoute à ``new_films`` les films d'une page précédant le premier film connu.
+
+        Retourne True si un film connu a été atteint.
+        """
+        for film_data in films:
+            if film_data['path'] in known_paths:
+                return True
+            new_films.add_film(film_data)
+        return False
+
+    def _delta_failed(self, username, list_key, error):
+        """Synchronisation incrémentale en échec : la copie stockée est servie. Bloquant."""
+        logger.warning("Synchronisation incrémentale impossible, utilisation du stockage: %s", error)
+        return self.list_store.get_films(username, list_key)
+
+    def _store_full_sync(self, username, list_key, api_data):
+        """Enregistre un parcours complet et retourne les films à servir. Bloquant.
+
+        Un parcours interrompu par une page en échec n'est pas enregistré : la
+        date de synchronisation complète reste inchangée et le tirage suivant
+        reprend le parcours. La copie stockée, même expirée, est alors servie si
+        elle existe, sinon les films lus.
+        """
+        if not api_data:
+            return None
+        if api_data['complete']:
+            self.list_store.replace(username, list_key, api_data['films'])
+            return api_data['films']
+        if self.list_store.get_state(username, list_key) is not None:
+            return self.list_store.get_films(username, list_key)
+        return api_data['films']
+
+    @staticmethod
+    def _tmdb_cache_key(title, year=None):
+        """Clé de cache normalisée pour une recherche TMDB."""
+        normalized = ' '.join(unicodedata.normalize('NFKC', title).casefold().split())
+        return f"{normalized}|{year or ''}"
+
+    def _tmdb_search_params(self, title, year=None):
+        params = {
+            'api_key': self.tmdb_api_key,
+            'query': title,
+            'language': 'fr-FR'
+        }
+        if year:
+            params['year'] = year
+        return params
+
+    def _poster_from_search(self, data):
+        """Extrait l'URL du poster du premier résultat d'une recherche TMDB."""
+        if data['results']:
+            # Prendre le premier résultat
+            movie = data['results'][0]
+            if movie.get('poster_path'):
+                # Construire l'URL du poster
+                return f"{self.tmdb_image_base_url}/t/p/w500{movie['poster_path']}"
+        
+        return None
+
+    def _cached_poster(self, key):
+        poster_url = self.poster_cache.get(key)
+        CACHE_REQUESTS.inc(cache='tmdb_poster', result='miss' if poster_url is MISSING else 'hit')
+        return poster_url
+
+    def _store_poster(self, key, poster_url):
+        ttl = self.POSTER_TTL if poster_url else self.POSTER_NEGATIVE_TTL
+        self.poster_cache.set(key, poster_url, ttl)
+
+    def _film_details_from_page(self, html_content):
+        """Extrait les informations de base d'une page de film (sans le poster)."""
+        with timed('film_details_parse'):
+            fields = self.parser.parse_film_page(html_content)
+        return {
+            'title': fields['title'] or "Sans titre",
+            'year': fields['year'] or "",
+            'director': fields['director'] or "Non disponible",
+            'rating': fields['rating'] or "Non noté",
+            'runtime': fields.get('runtime') or "",
+        }
+
+    def _poster_lookup_matches(self, poster_lookup, details):
+        """Indique si la recherche TMDB anticipée porte bien sur le film de la page."""
+        return bool(poster_lookup) and (
+            self._tmdb_cache_key(*poster_lookup[:2])
+            == self._tmdb_cache_key(details['title'], details['year'])
+        )
+
+    def _store_film_details(self, key, details):
+        # L'entrée reste servable (périmée) pendant details_max_stale après son TTL
+        self.details_cache.set(
+            key,
+            {'details': details, 'fetched_at': time.time()},
+            self.details_ttl + self.details_max_stale
+        )
+        if self.metadata_index is not None:
+            self.metadata_index.put(key, details)
+
+    def _cached_film_details(self, key):
+        """Consulte le cache des détails.
+
+        Retourne ``(entrée ou MISSING, rafraîchir)`` ; ``rafraîchir`` vaut True
+        pour une entrée périmée dont aucun rafraîchissement n'est déjà en cours.
+        """
+        entry = self.details_cache.get(key)
+        if entry is MISSING:
+            CACHE_REQUESTS.inc(cache='film_details', result='miss')
+            return entry, False
+        stale = time.time() - entry['fetched_at'] >= self.details_ttl
+        CACHE_REQUESTS.inc(cache='film_details', result='stale' if stale else 'hit')
+        if not stale:
+            return entry, False
+        with self._refresh_lock:
+            refresh = key not in self._refreshing
+            self._refreshing.add(key)
+        return entry, refresh
+
+    def _refresh_done(self, key):
+        """Signale la fin du rafraîchissement d'une entrée du cache des détails."""
+        with self._refresh_lock:
+            self._refreshing.discard(key)
+
+    @staticmethod
+    def _film_result(chosen_film, film_url, film_details):
+        """Réponse renvoyée au client pour le film tiré."""
+        if film_details:
+            return {
+                'title': film_details['title'],
+                'poster': film_details['poster'] or chosen_film.get('image', ''),
+                'url': film_url,
+                'director': film_details['director'],
+                'rating': film_details['rating'],
+                'year': film_details['year']
+            }
+        else:
+            return {
+                'title': chosen_film.get('name', 'Sans titre'),
+                'poster': chosen_film.get('image', ''),
+                'url': film_url,
+                'director': "Non disponible",
+                'rating': "Non noté",
+                'year': ""
+            }
+
+    def _stream_base_url(self, url):
+        """URL de base d'une liste à parcourir en flux (ValueError si l'URL n'en désigne pas une)."""
+        try:
+            context, _ = self._request_context(url)
+        except IndexError:
+            raise ValueError(f"URL de liste invalide: {url}")
+        base_url = self._list_base_url(context.username, context.list_type, context.list_slug)
+        if not base_url:
+            raise ValueError(f"URL de liste invalide: {url}")
+        return base_url
+
+    @staticmethod
+    def _unseen_films(films, seen, predicate):
+        """Films d'une page pas encore produits (par chemin) et retenus par ``predicate``."""
+        for film in films:
+            if film['path'] in seen:
+                continue
+            seen.add(film['path'])
+            if predicate is None or predicate(film):
+                yield film
+
+    @staticmethod
+    def _request_context(url):
+        """Extrait le type de liste et le username/slug d'une URL de liste.
+
+        Retourne ``(contexte, url)``, l'URL des listes personnalisées étant
+        reconstruite proprement.
+        """
+        parsed = urlparse(url)
+        path_parts = parsed.path.strip('/').split('/')
+        
+        # Cas des listes personnalisées
+        if len(path_parts) >= 3 and path_parts[1] == 'list':
+            url = f"{parsed.scheme}://{parsed.netloc}/{path_parts[0]}/list/{path_parts[2]}"
+            return RequestContext(path_parts[0], 'list', path_parts[2]), url
+        return RequestContext(path_parts[0], path_parts[1]), url
+
+
+class LetterboxdScraper(LetterboxdCore):
+    """Scraper synchrone (requests) : les requêtes HTTP bloquent le thread appelant."""
+
+    def __init__(self, *args, session=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        # Session HTTP partagée par le processus (pools de connexions par hôte)
+        self._session = session  # créée à la première requête synchrone
+        
+        # État propre à chaque requête (liste visée), isolé par thread
+        self._local = threading.local()
+        
+        # Parcours de listes et récupérations de détails en cours, partagés
+        # entre les requêtes simultanées
+        self._list_flights = SingleFlight()
+        self._details_flights = SingleFlight()
+        
+        # Recherches TMDB lancées en parallèle du téléchargement des pages de films
+        self._lookups = ThreadPoolExecutor(max_workers=8, thread_name_prefix='letterboxd-lookup')
+        
+        # Tâches de fond (préchargement des posters, rafraîchissement des détails)
+        self._background = ThreadPoolExecutor(max_workers=4, thread_name_prefix='letterboxd-background')
+
+    @property
+    def session(self):
+        """Session requests, partagée par le processus sauf session explicite.
+
+        Obtenue à la première requête : le scraper asynchrone, qui n'en a pas
+        besoin, n'importe jamais requests.
+        """
+        if self._session is None:
+            self._session = get_shared_session()
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    # La liste visée dépend de la requête en cours : une même instance peut ainsi
+    # servir plusieurs requêtes Flask en parallèle
+    username = _context_attribute('username')
+    list_type = _context_attribute('list_type')
+    list_slug = _context_attribute('list_slug')
+
+    @property
+    def _context(self):
+        context = getattr(self._local, 'context', None)
+        if context is None:
+            context = self._local.context = RequestContext()
+        return context
+
+    def _is_valid_letterboxd_list_url(self, url):
+        """Vérifie si l'URL est une liste Letterboxd valide."""
+        try:
+            parsed = urlparse(url)
+            if parsed.netloc != "letterboxd.com":
+                return False
             
-            if all_films:
-                print(f"\nNombre total de films uniques trouvés: {len(all_films)}")
-                return {'films': all_films}
+            path_parts = parsed.path.strip('/').split('/')
             
-            return None
+            # Cas des listes personnalisées
+            if path_parts[0] == 'list' and len(path_parts) >= 2:
+                self.list_type = 'list'
+                self.list_slug = path_parts[1]
+                return True
+            
+            # Cas des watchlists et films
+            if len(path_parts) >= 2:
+                self.username = path_parts[0]
+                self.list_type = path_parts[1]
+                
+                # Vérifier si c'est un profil privé connu
+                if self.list_type == 'profile-private':
+                    raise Exception("Ce profil est privé. Les listes ne sont pas accessibles.")
+                
+                # Vérifier le type de liste
+                if self.list_type in ['watchlist', 'films']:
+                    return True
+            
+            return False
             
         except Exception as e:
-            print(f"Erreur lors de l'appel à l'API: {str(e)}")
+            if str(e).startswith("Ce profil"):
+                raise
+            return False
+
+    def _check_page_accessibility(self, response):
+        """Vérifie si la page est accessible et fournit des informations détaillées sur les problèmes."""
+        self._check_url_accessibility(response.url)
+        self._check_content_accessibility(response.text)
+
+    def _get(self, url, **kwargs):
+        """GET au débit autorisé par l'hôte, avec relance des réponses 429/5xx.
+
+        Chaque réponse ajuste le débit de l'hôte ; un ``Retry-After`` suspend
+        toutes les requêtes vers celui-ci (threads et coroutines confondus)
+        pendant la durée indiquée, sinon la relance attend 1, 2 puis 4 s. Les
+        erreurs de connexion et les délais dépassés sont relancés de même.
+        """
+        import requests
+
+        kwargs.setdefault('timeout', 10)
+        limiter = self.rate_limiters.for_url(url)
+        for attempt in range(MAX_RETRIES + 1):
+            limiter.acquire()
+            try:
+                response = self.session.get(url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                logger.debug("Erreur réseau pour %s (%s), nouvel essai", url, e)
+                time.sleep(RETRY_BACKOFF * 2 ** attempt)
+                continue
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            limiter.on_response(response.status_code, retry_after)
+            if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                return response
+            response.close()
+            logger.debug("Réponse %s pour %s, nouvel essai", response.status_code, url)
+            if retry_after is None:
+                time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    def _fetch_list_page(self, page_url):
+        """Télécharge et analyse une page de liste."""
+        if not self.stream_pages:
+            # Faire la requête
+            with timed('list_page_fetch'):
+                response = self._get(page_url)
+                response.raise_for_status()
+            
+            # Vérifier l'accessibilité de la page
+            self._check_page_accessibility(response)
+            
+            with timed('list_page_parse'):
+                return self._parse_list_page(response.text)
+        
+        # Lecture en flux : les posters sont extraits au fil des morceaux reçus et
+        # la lecture s'arrête dès que la grille et la pagination ont été vues
+        with timed('list_page_fetch'):
+            response = self._get(page_url, stream=True)
+        try:
+            response.raise_for_status()
+            self._check_url_accessibility(response.url)
+            if 'charset' not in response.headers.get('Content-Type', ''):
+                response.encoding = 'utf-8'
+            # Le corps est lu au fil de l'analyse : cette étape inclut son téléchargement
+            with timed('list_page_parse'):
+                page = parse_list_stream(
+                    response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE, decode_unicode=True),
+                    check_prefix=self._check_content_accessibility
+                )
+        finally:
+            response.close()
+        return self._films_from_page(page)
+
+    def _get_films_from_api(self, username, list_type, list_slug=None, by_added=False):
+        """Tente de récupérer les films via l'API AJAX de Letterboxd.
+
+        Les parcours simultanés d'une même liste (même URL, à la casse près)
+        sont regroupés : un seul a lieu et tous les appelants en reçoivent le
+        résultat.
+        """
+        base_url = self._list_base_url(username, list_type, list_slug, by_added)
+        if not base_url:
             return None
+        return self._list_flights.do(
+            base_url.lower(), self._crawl_films_from_api, username, list_type, list_slug, by_added
+        )
 
-    def _get_tmdb_poster(self, title, year=None):
-        """Récupère le poster d'un film depuis TMDB."""
+    def _crawl_films_from_api(self, username, list_type, list_slug=None, by_added=False):
+        """Parcourt toutes les pages d'une liste (voir ``_get_films_from_api`` et ``ListCrawl``)."""
         try:
-            # Rechercher le film sur TMDB
-            search_url = f"https://api.themoviedb.org/3/search/movie"
-            params = {
-                'api_key': self.tmdb_api_key,
-                'query': title,
-                'language': 'fr-FR'
-            }
-            if year:
-                params['year'] = year
+            # Construire l'URL de base
+            base_url = self._list_base_url(username, list_type, list_slug, by_added)
+            if not base_url:
+                return None
+            crawl = ListCrawl(base_url)
 
-            response = self.session.get(search_url, params=params)
+            # La première page donne le nombre total de pages
+            logger.debug("Récupération de la page 1: %s", base_url)
+            try:
+                first_page = self._fetch_list_page(base_url)
+            except HostPausedError:
+                raise
+            except Exception as e:
+                logger.warning("Erreur lors de la récupération de la page 1: %s", e)
+                return None
+            if not crawl.add(1, first_page):
+                return None
+
+            pages = crawl.remaining_pages
+            if pages:
+                # Récupérer les pages restantes en parallèle ; l'ordre des résultats
+                # est conservé et la récupération s'arrête à la première page en échec
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    futures = [executor.submit(self._fetch_list_page, crawl.page_url(number)) for number in pages]
+                    for number, future in zip(pages, futures):
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            crawl.fail(number, e)
+                        if crawl.failed or not crawl.add(number, result):
+                            for pending in futures:
+                                pending.cancel()
+                            break
+
+            # Continuer séquentiellement si la pagination était incomplète
+            while crawl.has_next:
+                number = crawl.page + 1
+                logger.debug("Récupération de la page %s: %s", number, crawl.page_url(number))
+                try:
+                    result = self._fetch_list_page(crawl.page_url(number))
+                except Exception as e:
+                    crawl.fail(number, e)
+                    break
+                crawl.add(number, result)
+
+            return crawl.result()
+
+        except HostPausedError:
+            raise
+        except Exception as e:
+            logger.warning("Erreur lors de l'appel à l'API: %s", e)
+            return None
+
+    def _get_new_films(self, username, list_type, list_slug, known_paths):
+        """Récupère les films ajoutés depuis la dernière synchronisation.
+
+        Parcourt la liste triée par date d'ajout et s'arrête au premier film déjà
+        connu. Retourne None si aucune intersection n'est trouvée dans les
+        ``max_delta_pages`` premières pages : une synchronisation complète est alors
+        nécessaire. Le second élément du tuple retourné indique si un film connu a
+        été atteint (sinon la liste a été lue en entier).
+        """
+        base_url = self._list_base_url(username, list_type, list_slug, by_added=True)
+        new_films = FilmIndex()
+        for page in range(1, self.max_delta_pages + 1):
+            page_url = f"{base_url}page/{page}/" if page > 1 else base_url
+            logger.info("Synchronisation incrémentale, page %s: %s", page, page_url)
+            films, has_next, _ = self._fetch_list_page(page_url)
+            if self._scan_delta(new_films, films, known_paths):
+                return new_films, True
+            if not has_next:
+                # Fin de liste atteinte sans film connu : la liste a été entièrement lue
+                return new_films, False
+        return None
+
+    def _get_list_films(self, username, list_type, list_slug=None, lead=0):
+        """Retourne les films d'une liste en s'appuyant sur le stockage persistant.
+
+        Une liste déjà connue n'est rafraîchie que par ses premières pages (triées
+        par date d'ajout) ; une synchronisation complète n'a lieu que pour une liste
+        inconnue ou lorsque la dernière synchronisation complète est trop ancienne
+        (les retraits de films ne sont détectés qu'à cette occasion). ``lead``
+        avance l'expiration de la copie stockée (en secondes), pour la rafraîchir
+        avant qu'un tirage ne la trouve périmée. Les décisions sont celles de
+        ``LetterboxdCore`` (``_sync_plan``, ``_store_full_sync``...).
+        """
+        if self.list_store is None:
+            api_data = self._get_films_from_api(username, list_type, list_slug)
+            return api_data['films'] if api_data else None
+
+        list_key = self.list_store.list_key(list_type, list_slug)
+        plan, stored = self._sync_plan(username, list_key, lead)
+        if plan == 'stored':
+            return stored
+        if plan == 'delta':
+            try:
+                delta = self._get_new_films(username, list_type, list_slug, stored)
+            except Exception as e:
+                return self._delta_failed(username, list_key, e)
+            if delta is not None:
+                return self._apply_delta(username, list_key, delta)
+
+        api_data = self._get_films_from_api(username, list_type, list_slug, by_added=True)
+        return self._store_full_sync(username, list_key, api_data)
+
+    def _search_tmdb_poster(self, title, year=None):
+        """Recherche le poster d'un film sur TMDB (lève une exception en cas d'erreur réseau)."""
+        # Rechercher le film sur TMDB
+        search_url = f"{self.tmdb_base_url}/3/search/movie"
+        with timed('tmdb_lookup'):
+            response = self._get(search_url, params=self._tmdb_search_params(title, year))
             response.raise_for_status()
             data = response.json()
+        return self._poster_from_search(data)
 
-            if data['results']:
-                # Prendre le premier résultat
-                movie = data['results'][0]
-                if movie.get('poster_path'):
-                    # Construire l'URL du poster
-                    return f"https://image.tmdb.org/t/p/w500{movie['poster_path']}"
-            
-            return None
+    def _get_tmdb_poster(self, title, year=None):
+        """Récupère le poster d'un film depuis TMDB, en passant par le cache.
+
+        Les absences de résultat sont aussi mises en cache, pour une durée plus
+        courte ; les erreurs réseau ne le sont pas.
+        """
+        key = self._tmdb_cache_key(title, year)
+        poster_url = self._cached_poster(key)
+        if poster_url is not MISSING:
+            return poster_url
+        
+        try:
+            poster_url = self._search_tmdb_poster(title, year)
         except Exception as e:
-            print(f"Erreur lors de la récupération du poster TMDB: {str(e)}")
+            logger.warning("Erreur lors de la récupération du poster TMDB: %s", e)
             return None
+        
+        self._store_poster(key, poster_url)
+        return poster_url
+
+    def prefetch_tmdb_posters(self, films):
+        """Résout en arrière-plan les posters TMDB d'un lot de films.
 
-    def _get_film_details(self, film_url):
-        """Récupère les détails d'un film depuis sa page."""
+        ``films`` est un itérable de couples ``(titre, année)``. Seuls les films
+        absents du cache sont recherchés ; retourne la liste des futures lancées.
+        """
+        futures = []
+        for title, year in films:
+            if self.poster_cache.get(self._tmdb_cache_key(title, year)) is MISSING:
+                futures.append(self._background.submit(self._get_tmdb_poster, title, year))
+        return futures
+
+    def _fetch_film_details(self, film_url, poster_lookup=None):
+        """Récupère les détails d'un film depuis sa page.
+
+        ``poster_lookup`` est un triplet ``(titre, année, future)`` pour une
+        recherche TMDB lancée en parallèle à partir des données de la liste ; son
+        résultat n'est retenu que si la page du film confirme le titre et l'année.
+        """
         try:
-            print(f"\nRécupération des détails du film: {film_url}")
-            response = self.session.get(film_url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html5lib')
-            
-            # Extraire les informations de base
-            title = soup.select_one('h1.headline-1')
-            title = title.text.strip() if title else "Sans titre"
+            logger.debug("Récupération des détails du film: %s", film_url)
+            with timed('film_details_fetch'):
+                response = self._get(film_url)
+                response.raise_for_status()
             
-            # Extraire l'année
-            year = ""
-            year_element = soup.select_one('a[href*="/films/year/"]')
-            if year_element:
-                year = year_element.text.strip()
+            details = self._film_details_from_page(response.text)
             
-            # Extraire le réalisateur
-            director = "Non disponible"
-            director_element = soup.select_one('a[href*="/director/"]')
-            if director_element:
-                director = director_element.text.strip()
-            
-            # Extraire la note
-            rating = "Non noté"
-            rating_element = soup.select_one('meta[name="twitter:data2"]')
-            if rating_element:
-                rating = rating_element.get('content', 'Non noté')
-            
-            # Récupérer le poster depuis TMDB
-            poster_url = self._get_tmdb_poster(title, year)
-            if not poster_url:
-                # Si pas de poster TMDB, utiliser une image par défaut
-                poster_url = 'https://via.placeholder.com/300x450?text=Pas+d%27image'
-            
-            return {
-                'title': title,
-                'year': year,
-                'director': director,
-                'rating': rating,
-                'poster': poster_url
-            }
+            # Récupérer le poster depuis TMDB (recherche déjà lancée si la liste
+            # donnait le bon titre et la bonne année)
+            if self._poster_lookup_matches(poster_lookup, details):
+                poster_url = poster_lookup[2].result()
+            else:
+                poster_url = self._get_tmdb_poster(details['title'], details['year'])
+            details['poster'] = poster_url or self.PLACEHOLDER_POSTER
+            return details
             
         except Exception as e:
-            print(f"Erreur lors de la récupération des détails du film: {str(e)}")
+            logger.warning("Erreur lors de la récupération des détails du film: %s", e)
+            return None
+
+    def _refresh_film_details(self, film_url, key):
+        try:
+            details = self._fetch_film_details(film_url)
+            if details:
+                self._store_film_details(key, details)
+        finally:
+            self._refresh_done(key)
+
+    def _get_film_details(self, film_url, title=None, year=None):
+        """Récupère les détails d'un film, en passant par le cache.
+
+        Une entrée plus ancienne que ``details_ttl`` est servie immédiatement
+        tandis qu'un rafraîchissement est lancé en arrière-plan
+        (stale-while-revalidate). Lorsque la liste fournit déjà le titre et
+        l'année, la recherche TMDB est lancée en même temps que le
+        téléchargement de la page du film. Les demandes simultanées d'un même
+        film absent du cache partagent une seule récupération.
+        """
+        key = urlparse(film_url).path
+        entry, refresh = self._cached_film_details(key)
+        if refresh:
+            self._background.submit(self._refresh_film_details, film_url, key)
+        if entry is not MISSING:
+            return entry['details']
+        return self._details_flights.do(key, self._load_film_details, film_url, key, title, year)
+
+    def _load_film_details(self, film_url, key, title=None, year=None):
+        """Récupère puis met en cache les détails d'un film absent du cache."""
+        poster_lookup = None
+        if title and year:
+            poster_lookup = (title, year, self._lookups.submit(self._get_tmdb_poster, title, year))
+        details = self._fetch_film_details(film_url, poster_lookup)
+        if details:
+            self._store_film_details(key, details)
+        return details
+
+    def _build_film_result(self, chosen_film):
+        """Construit la réponse finale à partir du film tiré au sort."""
+        # Récupérer les détails du film
+        film_url = urljoin(self.base_url, chosen_film.get('path', ''))
+        film_details = self._get_film_details(film_url, chosen_film.get('name'), chosen_film.get('year'))
+        return self._film_result(chosen_film, film_url, film_details)
+
+    def iter_films(self, url, predicate=None):
+        """Produit les films d'une liste au fil de son parcours, page par page.
+
+        Seule une fenêtre de ``max_workers`` pages (récupérées en avance) est en
+        mémoire : des films déjà produits, seul le chemin est conservé, pour le
+        dédoublonnage. ``predicate`` filtre les films dans le flux. Le parcours
+        s'arrête dès que l'appelant cesse de consommer ; les erreurs réseau lui
+        sont transmises. Le stockage persistant n'est ni lu ni mis à jour.
+        """
+        base_url = self._stream_base_url(url)
+        seen = set()
+        page = self._fetch_list_page(base_url)
+        yield from self._unseen_films(page.films, seen, predicate)
+        if not page.films or not page.has_next:
+            return
+
+        last_page = page.last_page or 0
+        next_page = 2
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while True:
+                    # Pages suivantes demandées en avance, jusqu'à la dernière page connue
+                    while len(pending) < self.max_workers and (next_page <= last_page or not pending):
+                        pending.append(executor.submit(self._fetch_list_page, f"{base_url}page/{next_page}/"))
+                        next_page += 1
+                    page = pending.popleft().result()
+                    yield from self._unseen_films(page.films, seen, predicate)
+                    if not page.films or not page.has_next:
+                        return
+                    last_page = max(last_page, page.last_page or 0)
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def sample(self, url, k=1, predicate=None, rng=random):
+        """Tire uniformément ``k`` films d'une liste (tous s'il y en a moins), en un seul parcours.
+
+        Les films sont filtrés par ``predicate`` au fil du parcours
+        (``iter_films``) ; la mémoire utilisée ne dépend que de ``k``.
+        """
+        reservoir = Reservoir(k, rng)
+        for film in self.iter_films(url, predicate):
+            reservoir.offer(film)
+        return reservoir.items
+
+    def _pick_film_fast(self, username, list_type, list_slug=None):
+        """Tire un film uniformément sans parcourir toute la liste.
+
+        La page 1 donne le nombre de pages et la taille d'une page. On tire un
+        indice global dans ``[0, taille_page * nb_pages)`` et on ne récupère que la
+        page qui le contient. Si l'indice tombe au-delà de la dernière page (plus
+        courte que les autres), le tirage est rejeté et recommencé avec les pages
+        déjà téléchargées : chaque film garde exactement la même probabilité.
+        Retourne None si la pagination ne permet pas ce mode.
+        """
+        base_url = self._list_base_url(username, list_type, list_slug)
+        if not base_url:
+            return None
+        
+        first_page = self._fetch_list_page(base_url)
+        if not first_page.films:
+            return None
+        if not first_page.has_next:
+            return random.choice(first_page.films)
+        if not first_page.last_page:
             return None
+        
+        page_size = len(first_page.films)
+        pages = {1: first_page.films}
+        for _ in range(self.max_fast_attempts):
+            page, offset = divmod(random.randrange(page_size * first_page.last_page), page_size)
+            page += 1
+            if page not in pages:
+                logger.info("Tirage rapide: récupération de la page %s", page)
+                pages[page] = self._fetch_list_page(f"{base_url}page/{page}/").films
+            if offset < len(pages[page]):
+                return pages[page][offset]
+        return None
+
+    def get_films(self, url, fast=False):
+        """Récupère un film aléatoire depuis une liste Letterboxd.
+
+        Avec ``fast=True``, une liste absente du stockage persistant n'est pas
+        parcourue en entier : seule la page contenant le film tiré est récupérée.
+        """
+        import requests
 
-    def get_films(self, url):
-        """Récupère un film aléatoire depuis une liste Letterboxd."""
         try:
-            print(f"\nRécupération des films depuis: {url}")
+            logger.info("Récupération des films depuis: %s", url)
             
-            # Extraire le type de liste et le username/slug de l'URL
-            parsed = urlparse(url)
-            path_parts = parsed.path.strip('/').split('/')
+            context, url = self._request_context(url)
+            self._local.context = context
             
-            # Cas des listes personnalisées
-            if len(path_parts) >= 3 and path_parts[1] == 'list':
-                self.list_type = 'list'
-                self.username = path_parts[0]
-                self.list_slug = path_parts[2]
-                # Reconstruire l'URL proprement
-                url = f"{parsed.scheme}://{parsed.netloc}/{path_parts[0]}/list/{path_parts[2]}"
-            else:
-                self.username = path_parts[0]
-                self.list_type = path_parts[1]
+            # Tirage rapide si la liste n'est pas déjà connue du stockage
+            if fast and not self._is_list_stored(context.username, context.list_type, context.list_slug):
+                chosen_film = self._pick_film_fast(context.username, context.list_type, context.list_slug)
+                if chosen_film:
+                    logger.info("Film choisi (tirage rapide): %s", chosen_film.get('name', 'Sans titre'))
+                    return self._build_film_result(chosen_film)
             
-            # Essayer d'abord l'API pour les watchlists et les films
-            if hasattr(self, 'username') and hasattr(self, 'list_type'):
-                api_data = self._get_films_from_api(self.username, self.list_type)
-                if api_data and 'films' in api_data:
-                    films = api_data['films']
-                    if not films:
-                        raise Exception("Aucun film trouvé dans cette liste.")
-                    
-                    # Mélanger la liste des films pour une meilleure distribution aléatoire
-                    random.shuffle(films)
-                    
-                    # Sélectionner un film aléatoire
-                    chosen_film = random.choice(films)
-                    print(f"\nFilm choisi: {chosen_film.get('name', 'Sans titre')}")
-                    print(f"Nombre total de films dans la liste: {len(films)}")
-                    
-                    # Récupérer les détails du film
-                    film_url = urljoin(self.base_url, chosen_film.get('path', ''))
-                    film_details = self._get_film_details(film_url)
-                    
-                    if film_details:
-                        return {
-                            'title': film_details['title'],
-                            'poster': film_details['poster'] or chosen_film.get('image', ''),
-                            'url': film_url,
-                            'director': film_details['director'],
-                            'rating': film_details['rating'],
-                            'year': film_details['year']
-                        }
-                    else:
-                        return {
-                            'title': chosen_film.get('name', 'Sans titre'),
-                            'poster': chosen_film.get('image', ''),
-                            'url': film_url,
-                            'director': "Non disponible",
-                            'rating': "Non noté",
-                            'year': ""
-                        }
+            # Essayer d'abord l'API (avec le stockage persistant) pour toutes les listes
+            films = self._get_list_films(context.username, context.list_type, context.list_slug)
+            if films is not None:
+                if not films:
+                    raise Exception("Aucun film trouvé dans cette liste.")
+                
+                # Sélectionner un film aléatoire (accès direct par position)
+                chosen_film = films.choice()
+                logger.info("Film choisi: %s", chosen_film.get('name', 'Sans titre'))
+                logger.debug("Nombre total de films dans la liste: %s", len(films))
+                
+                return self._build_film_result(chosen_film)
             
             # Si l'API ne fonctionne pas, essayer la méthode HTML classique
-            response = self.session.get(url, timeout=10)
+            response = self._get(url)
             response.raise_for_status()
             
-            print(f"Statut de la réponse: {response.status_code}")
-            print(f"Type de contenu: {response.headers.get('Content-Type', 'Non spécifié')}")
-            print(f"Encodage: {response.encoding}")
-            print(f"En-têtes de réponse: {dict(response.headers)}")
+            logger.debug("Statut de la réponse: %s", response.status_code)
+            logger.debug("Type de contenu: %s", response.headers.get('Content-Type', 'Non spécifié'))
+            logger.debug("Encodage: %s", response.encoding)
+            logger.debug("En-têtes de réponse: %s", response.headers)
             
             # Vérifier l'accessibilité de la page
             self._check_page_accessibility(response)
@@ -529,35 +1259,16 @@ class LetterboxdScraper:
                 raise Exception("Impossible d'extraire les films de cette liste. Vérifiez qu'elle contient des films et qu'elle est publique.")
 
             # Sélectionner un film aléatoire
-            chosen_film = random.choice(films)
-            print(f"\nFilm choisi: {chosen_film.get('name', 'Sans titre')}")
+            chosen_film = films.choice()
+            logger.info("Film choisi: %s", chosen_film.get('name', 'Sans titre'))
             
-            # Récupérer les détails du film
-            film_url = urljoin(self.base_url, chosen_film.get('path', ''))
-            film_details = self._get_film_details(film_url)
-            
-            if film_details:
-                return {
-                    'title': film_details['title'],
-                    'poster': film_details['poster'] or chosen_film.get('image', ''),
-                    'url': film_url,
-                    'director': film_details['director'],
-                    'rating': film_details['rating'],
-                    'year': film_details['year']
-                }
-            else:
-                return {
-                    'title': chosen_film.get('name', 'Sans titre'),
-                    'poster': chosen_film.get('image', ''),
-                    'url': film_url,
-                    'director': "Non disponible",
-                    'rating': "Non noté",
-                    'year': ""
-                }
+            return self._build_film_result(chosen_film)
 
         except requests.RequestException as e:
-            print(f"\nErreur de requête: {str(e)}")
-            raise Exception(f"Erreur de connexion: {str(e)}")
+            logger.error("Erreur de requête: %s", e)
+            raise ListUnreachableError(f"Erreur de connexion: {str(e)}")
+        except ListUnreachableError:
+            raise
         except Exception as e:
-            print(f"\nErreur générale: {str(e)}")
-            raise Exception(str(e)) 
\ No newline at end of file
+            logger.error("Erreur générale: %s", e)
+            raise Exception(str(e))
@@ -0,0 +1,225 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from .film_index import FilmIndex
+
+
+def default_store_path():
+    """Chemin par défaut de la base SQLite (surchargeable via LETTERBOXD_STORE_PATH)."""
+    return os.environ.get(
+        'LETTERBOXD_STORE_PATH',
+        os.path.join(tempfile.gettempdir(), 'roulette_letterboxd.sqlite3')
+    )
+
+
+class ListStore:
+    """Stockage persistant des listes Letterboxd déjà parcourues.
+
+    Chaque liste est identifiée par ``(username, list_key)`` où ``list_key`` vaut
+    ``watchlist``, ``films`` ou ``list/<slug>``. Les films sont conservés du plus
+    récemment ajouté au plus ancien, ce qui permet une synchronisation
+    incrémentale : on ne récupère que les premières pages triées par date d'ajout
+    jusqu'à retomber sur un film déjà connu. ``version`` n'augmente que lorsque
+    le contenu d'une liste change, pas à chaque synchronisation.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_store_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS lists (
+                    username TEXT NOT NULL,
+                    list_key TEXT NOT NULL,
+                    synced_at REAL NOT NULL,
+                    full_synced_at REAL NOT NULL,
+                    version INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (username, list_key)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS list_films (
+                    username TEXT NOT NULL,
+                    list_key TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    path TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    image TEXT NOT NULL,
+                    year TEXT NOT NULL DEFAULT '',
+                    PRIMARY KEY (username, list_key, path)
+                )
+            """)
+            # Bases créées avant l'ajout de la version des listes
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(lists)")}
+            if 'version' not in columns:
+                self._conn.execute("ALTER TABLE lists ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            # Bases créées avant l'ajout de l'année de sortie
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(list_films)")}
+            if 'year' not in columns:
+                self._conn.execute("ALTER TABLE list_films ADD COLUMN year TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS list_films_seq
+                ON list_films (username, list_key, seq)
+            """)
+
+    @staticmethod
+    def list_key(list_type, list_slug=None):
+        """Construit la clé de stockage d'une liste."""
+        if list_type == 'list':
+            return f"list/{list_slug}"
+        return list_type
+
+    def get_state(self, username, list_key):
+        """Retourne les dates de synchronisation d'une liste, ou None si inconnue."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT synced_at, full_synced_at FROM lists WHERE username = ? AND list_key = ?",
+                (username, list_key)
+            ).fetchone()
+        if not row:
+            return None
+        return {'synced_at': row[0], 'full_synced_at': row[1]}
+
+    def get_version(self, username, list_key):
+        """Retourne la version du contenu d'une liste, ou None si inconnue."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM lists WHERE username = ? AND list_key = ?",
+                (username, list_key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_films(self, username, list_key):
+        """Retourne les films stockés (FilmIndex), du plus récent au plus ancien."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, name, image, year FROM list_films "
+                "WHERE username = ? AND list_key = ? ORDER BY seq DESC",
+                (username, list_key)
+            ).fetchall()
+        films = FilmIndex()
+        for path, name, image, year in rows:
+            films.add(name, path, image, year)
+        return films
+
+    def get_film(self, username, list_key, path):
+        """Retourne un film stocké d'une liste (dictionnaire), ou None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, image, year FROM list_films WHERE username = ? AND list_key = ? AND path = ?",
+                (username, list_key, path)
+            ).fetchone()
+        if not row:
+            return None
+        return {'name': row[0], 'path': path, 'image': row[1], 'year': row[2]}
+
+    def known_paths(self, username, list_key):
+        """Retourne l'ensemble des chemins de films déjà stockés pour une liste."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path FROM list_films WHERE username = ? AND list_key = ?",
+                (username, list_key)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def lists(self):
+        """Listes stockées : ``[{'username', 'list_key', 'synced_at', 'full_synced_at'}, ...]``."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT username, list_key, synced_at, full_synced_at FROM lists ORDER BY username, list_key"
+            ).fetchall()
+        return [
+            {'username': row[0], 'list_key': row[1], 'synced_at': row[2], 'full_synced_at': row[3]}
+            for row in rows
+        ]
+
+    def replace(self, username, list_key, films, synced_at=None, full_synced_at=None):
+        """Remplace entièrement le contenu d'une liste (synchronisation complète).
+
+        Les dates de synchronisation valent l'instant présent sauf si elles
+        sont fournies (liste reprise d'un instantané).
+        """
+        now = time.time()
+        synced_at = now if synced_at is None else synced_at
+        full_synced_at = now if full_synced_at is None else full_synced_at
+        count = len(films)
+        with self._lock, self._conn:
+            previous = self._conn.execute(
+                "SELECT path FROM list_films WHERE username = ? AND list_key = ? ORDER BY seq DESC",
+                (username, list_key)
+            ).fetchall()
+            changed = [row[0] for row in previous] != list(dict.fromkeys(film['path'] for film in films))
+            self._conn.execute(
+                "DELETE FROM list_films WHERE username = ? AND list_key = ?",
+                (username, list_key)
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO list_films (username, list_key, seq, path, name, image, year) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (username, list_key, count - index, film['path'], film['name'], film['image'],
+                     film.get('year', ''))
+                    for index, film in enumerate(films)
+                ]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lists (username, list_key, synced_at, full_synced_at, version) "
+                "VALUES (?, ?, ?, ?, COALESCE((SELECT version FROM lists WHERE username = ? AND list_key = ?), 0) + ?)",
+                (username, list_key, synced_at, full_synced_at, username, list_key, int(changed))
+            )
+
+    def prepend(self, username, list_key, films):
+        """Ajoute en tête de liste des films récemment ajoutés (synchronisation incrémentale).
+
+        ``films`` est attendu du plus récent au plus ancien.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM list_films WHERE username = ? AND list_key = ?",
+                (username, list_key)
+            ).fetchone()
+            top = row[0]
+            count = len(films)
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO list_films (username, list_key, seq, path, name, image, year) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (username, list_key, top + count - index, film['path'], film['name'], film['image'],
+                     film.get('year', ''))
+                    for index, film in enumerate(films)
+                ]
+            ).rowcount
+            self._conn.execute(
+                "UPDATE lists SET synced_at = ?, version = version + ? WHERE username = ? AND list_key = ?",
+                (now, int(inserted > 0), username, list_key)
+            )
+
+    def touch(self, username, list_key):
+        """Marque une liste comme synchronisée sans en modifier le contenu."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE lists SET synced_at = ? WHERE username = ? AND list_key = ?",
+                (time.time(), username, list_key)
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_store():
+    """Retourne le stockage partagé par le processus (créé à la première utilisation)."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ListStore()
+        return _default_store
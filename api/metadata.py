@@ -0,0 +1,169 @@
+import re
+import sqlite3
+import threading
+import time
+
+from .list_store import default_store_path
+
+_RATING = re.compile(r'(\d+(?:[.,]\d+)?)')
+
+
+def parse_rating(text):
+    """Note moyenne (sur 5) d'un texte comme « 4.56 out of 5 », ou None."""
+    match = _RATING.search(text or '')
+    return float(match.group(1).replace(',', '.')) if match else None
+
+
+def parse_int(text):
+    return int(text) if text and str(text).isdigit() else None
+
+
+class MetadataIndex:
+    """Index persistant des métadonnées des films (année, note, réalisateur, durée).
+
+    Il est alimenté à chaque récupération des détails d'un film et par
+    l'indexation en arrière-plan des films des listes filtrées ; seules les
+    pages des films sont lues (jamais TMDB). Les entrées sont indexées par
+    chemin de film (``/film/<slug>/``). ``path=':memory:'`` donne un index non
+    persistant.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_store_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS film_metadata (
+                    path TEXT PRIMARY KEY,
+                    year INTEGER,
+                    rating REAL,
+                    director TEXT,
+                    runtime INTEGER,
+                    indexed_at REAL NOT NULL
+                )
+            """)
+
+    def put(self, path, details):
+        """Enregistre les métadonnées d'un film à partir de ses détails (voir ``_film_details_from_page``)."""
+        director = details.get('director')
+        row = (
+            path,
+            parse_int(details.get('year')),
+            parse_rating(details.get('rating')),
+            director if director and director != "Non disponible" else None,
+            parse_int(details.get('runtime')),
+            time.time(),
+        )
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO film_metadata (path, year, rating, director, runtime, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                row
+            )
+
+    def merge(self, entries):
+        """Ajoute des métadonnées au format de ``get_many`` sans écraser celles déjà indexées."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO film_metadata (path, year, rating, director, runtime, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (path, row['year'], row['rating'], row['director'], row['runtime'], now)
+                    for path, row in entries.items()
+                ]
+            )
+
+    def get_many(self, paths, chunk_size=500):
+        """Retourne ``{chemin: {'year', 'rating', 'director', 'runtime'}}`` pour les films indexés."""
+        paths = list(paths)
+        found = {}
+        with self._lock:
+            for start in range(0, len(paths), chunk_size):
+                chunk = paths[start:start + chunk_size]
+                rows = self._conn.execute(
+                    "SELECT path, year, rating, director, runtime FROM film_metadata "
+                    f"WHERE path IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for path, year, rating, director, runtime in rows:
+                    found[path] = {'year': year, 'rating': rating, 'director': director, 'runtime': runtime}
+        return found
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FilmFilter:
+    """Critères d'un tirage filtré.
+
+    ``matches`` retourne True ou False, ou None lorsque les métadonnées
+    nécessaires ne sont pas encore indexées. L'année est prise dans les données
+    de la liste quand elles la donnent ; les autres critères exigent l'index.
+    """
+
+    # Paramètres de requête acceptés et leur conversion
+    PARAMETERS = {
+        'year_min': int, 'year_max': int,
+        'rating_min': float, 'rating_max': float,
+        'runtime_min': int, 'runtime_max': int,
+        'director': str,
+    }
+
+    def __init__(self, year_min=None, year_max=None, rating_min=None, rating_max=None,
+                 runtime_min=None, runtime_max=None, director=None):
+        self.year = (year_min, year_max)
+        self.rating = (rating_min, rating_max)
+        self.runtime = (runtime_min, runtime_max)
+        self.director = director.strip().casefold() if director and director.strip() else None
+
+    @classmethod
+    def from_request(cls, data):
+        """Construit le filtre décrit par une requête JSON, ou None sans critère.
+
+        Lève ValueError (message destiné à l'utilisateur) pour une valeur invalide.
+        """
+        options = {}
+        for name, convert in cls.PARAMETERS.items():
+            value = data.get(name)
+            if value in (None, ''):
+                continue
+            try:
+                options[name] = convert(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Valeur invalide pour le filtre {name}: {value}")
+        return cls(**options) if options else None
+
+    @property
+    def needs_index(self):
+        return any(bound is not None for bound in self.rating + self.runtime) or bool(self.director)
+
+    @staticmethod
+    def _within(value, bounds):
+        low, high = bounds
+        if low is None and high is None:
+            return True
+        if value is None:
+            return None
+        return (low is None or value >= low) and (high is None or value <= high)
+
+    def matches(self, film, metadata):
+        """Indique si le film (données de la liste + métadonnées indexées ou None) correspond."""
+        year = parse_int(film.get('year')) or (metadata or {}).get('year')
+        verdicts = [self._within(year, self.year)]
+        if metadata is not None:
+            verdicts += [
+                self._within(metadata['rating'], self.rating),
+                self._within(metadata['runtime'], self.runtime),
+            ]
+            if self.director:
+                verdicts.append(self.director in (metadata['director'] or '').casefold())
+            # Film indexé : une donnée absente de sa page ne satisfait aucun critère
+            verdicts = [verdict is True for verdict in verdicts]
+        elif self.needs_index:
+            verdicts.append(None)
+        if False in verdicts:
+            return False
+        return None if None in verdicts else True
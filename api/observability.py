@@ -0,0 +1,200 @@
+"""Journalisation et métriques du service.
+
+Les métriques sont exposées au format texte de Prometheus par la route
+``/metrics``. ``timed`` mesure la durée d'une étape du tirage (récupération
+d'une page, analyse, recherche TMDB...) et l'enregistre dans un histogramme.
+"""
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Bornes (en secondes) des histogrammes de durée
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def configure_logging(level=None):
+    """Configure la journalisation du processus (niveau via LOG_LEVEL, INFO par défaut)."""
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    logging.basicConfig(
+        level=level.upper(),
+        format='%(asctime)s %(levelname)s %(name)s %(message)s'
+    )
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        )
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Étiquettes attendues pour {self.name}: {self.labelnames}")
+        return tuple(labels[name] for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_value(key, value))
+        return lines
+
+    def _render_value(self, key, value):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, amount, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, amount)] += 1
+            self._values[key] = (counts, total + amount)
+
+    def count(self, **labels):
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def _render_value(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            labels = _format_labels(self.labelnames + ('le',), key + (le,))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {total}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    'letterboxd_stage_duration_seconds', "Durée des étapes d'un tirage", ['stage']
+)
+STAGE_ERRORS = REGISTRY.counter(
+    'letterboxd_stage_errors_total', "Étapes d'un tirage terminées en erreur", ['stage']
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'letterboxd_cache_requests_total', 'Consultations des caches', ['cache', 'result']
+)
+SPINS = REGISTRY.counter(
+    'letterboxd_spins_total', 'Tirages demandés', ['outcome']
+)
+LIST_REFRESHES = REGISTRY.counter(
+    'letterboxd_list_refreshes_total', 'Rafraîchissements de listes en arrière-plan', ['outcome']
+)
+RATE_LIMIT_RPS = REGISTRY.gauge(
+    'letterboxd_rate_limit_requests_per_second', 'Débit autorisé vers chaque hôte', ['host']
+)
+RATE_LIMIT_PAUSE = REGISTRY.gauge(
+    'letterboxd_rate_limit_paused_until_timestamp_seconds',
+    "Fin de la dernière suspension demandée par l'hôte (Retry-After)", ['host']
+)
+UPSTREAM_THROTTLED = REGISTRY.counter(
+    'letterboxd_upstream_slowdowns_total', 'Réponses 429/5xx reçues des hôtes', ['host', 'status']
+)
+
+
+@contextmanager
+def timed(stage):
+    """Mesure la durée d'une étape et la journalise au niveau DEBUG."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_DURATION.observe(duration, stage=stage)
+        logger.debug("stage=%s duration_ms=%.1f", stage, duration * 1000)
+
+
+def render_metrics():
+    return REGISTRY.render()
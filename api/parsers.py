@@ -0,0 +1,518 @@
+"""Moteurs d'analyse HTML des pages Letterboxd.
+
+Chaque moteur n'extrait que les quelques champs utiles au tirage :
+
+* ``parse_list_page`` retourne les attributs bruts de chaque ``li.poster-container``
+  ainsi que les informations de pagination ;
+* ``parse_film_page`` retourne le titre, l'année, le réalisateur, la note et la
+  durée (en minutes) d'une page de film.
+
+Les enregistrements bruts sont identiques quel que soit le moteur, ce qui permet
+de remplacer html5lib (lent) par lxml sur le chemin critique tout en gardant
+html5lib en secours. Les bibliothèques d'analyse ne sont importées qu'à la
+création du moteur (lxml) ou à sa première utilisation (bs4 et html5lib), pas
+au chargement du module.
+"""
+from collections import namedtuple
+from html.parser import HTMLParser
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# Résultat brut de l'analyse d'une page de liste
+ParsedListPage = namedtuple(
+    'ParsedListPage',
+    ['posters', 'has_next', 'last_page', 'has_grid', 'sign_in_required']
+)
+
+
+def _poster_record(film_name, film_slug, poster, link_href, img):
+    """Construit l'enregistrement brut d'un ``li.poster-container``.
+
+    ``poster`` et ``img`` valent None si l'élément correspondant est absent.
+    """
+    return {
+        'film_name': film_name,
+        'film_slug': film_slug,
+        'poster': poster,
+        'link_href': link_href,
+        'img': img,
+    }
+
+
+_RUNTIME = re.compile(r'(\d+)\s*mins?\b')
+
+
+def _runtime(text):
+    """Durée en minutes (texte) extraite du pied de fiche (« 132 mins  More at IMDb »), ou None."""
+    match = _RUNTIME.search(text.replace('\xa0', ' ')) if text else None
+    return match.group(1) if match else None
+
+
+def _last_page(texts):
+    """Retourne le plus grand numéro de page parmi les textes du bloc de pagination."""
+    numbers = [int(text.strip()) for text in texts if text.strip().isdigit()]
+    return max(numbers) if numbers else None
+
+
+class Html5libEngine:
+    """Moteur de référence basé sur BeautifulSoup et html5lib (lent mais tolérant)."""
+
+    name = 'html5lib'
+
+    def _soup(self, html_content):
+        # Importé à la première analyse : bs4 et html5lib ne servent qu'en secours
+        from bs4 import BeautifulSoup
+
+        return BeautifulSoup(html_content, 'html5lib')
+
+    def parse_list_page(self, html_content):
+        soup = self._soup(html_content)
+        posters = []
+        for container in soup.select('li.poster-container'):
+            poster = container.select_one('div.film-poster')
+            link = container.select_one('a')
+            img = container.select_one('img')
+            posters.append(_poster_record(
+                container.get('data-film-name'),
+                container.get('data-film-slug'),
+                {
+                    'target_link': poster.get('data-target-link'),
+                    'href': poster.get('href'),
+                    'release_year': poster.get('data-film-release-year'),
+                } if poster else None,
+                link.get('href') if link else None,
+                {
+                    'alt': img.get('alt'),
+                    'src': img.get('src'),
+                    'data_src': img.get('data-src'),
+                } if img else None,
+            ))
+        return ParsedListPage(
+            posters,
+            soup.select_one('a.next') is not None,
+            _last_page(
+                element.text
+                for element in soup.select('.paginate-pages a, .paginate-pages .paginate-current')
+            ),
+            bool(soup.select_one('.films-grid') or soup.select_one('.poster-list')),
+            bool(soup.select('.sign-in-message') or soup.select('.sign-in-overlay')),
+        )
+
+    def parse_film_page(self, html_content):
+        soup = self._soup(html_content)
+        title = soup.select_one('h1.headline-1')
+        year = soup.select_one('a[href*="/films/year/"]')
+        director = soup.select_one('a[href*="/director/"]')
+        rating = soup.select_one('meta[name="twitter:data2"]')
+        footer = soup.select_one('p.text-footer')
+        return {
+            'title': title.text.strip() if title else None,
+            'year': year.text.strip() if year else None,
+            'director': director.text.strip() if director else None,
+            'rating': rating.get('content') if rating else None,
+            'runtime': _runtime(footer.text) if footer else None,
+        }
+
+
+def _has_class(class_name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')"
+
+
+class LxmlEngine:
+    """Moteur rapide basé sur lxml et des requêtes XPath précompilées."""
+
+    name = 'lxml'
+
+    def __init__(self):
+        from lxml import etree, html
+
+        self._html = html
+        self._containers = etree.XPath(f"//li[{_has_class('poster-container')}]")
+        self._poster = etree.XPath(f"(.//div[{_has_class('film-poster')}])[1]")
+        self._link = etree.XPath("(.//a)[1]")
+        self._img = etree.XPath("(.//img)[1]")
+        self._next = etree.XPath(f"(//a[{_has_class('next')}])[1]")
+        self._pages = etree.XPath(
+            f"//*[{_has_class('paginate-pages')}]//a"
+            f" | //*[{_has_class('paginate-pages')}]//*[{_has_class('paginate-current')}]"
+        )
+        self._grid = etree.XPath(
+            f"(//*[{_has_class('films-grid')} or {_has_class('poster-list')}])[1]"
+        )
+        self._sign_in = etree.XPath(
+            f"(//*[{_has_class('sign-in-message')} or {_has_class('sign-in-overlay')}])[1]"
+        )
+        self._title = etree.XPath(f"(//h1[{_has_class('headline-1')}])[1]")
+        self._year = etree.XPath("(//a[contains(@href, '/films/year/')])[1]")
+        self._director = etree.XPath("(//a[contains(@href, '/director/')])[1]")
+        self._rating = etree.XPath("(//meta[@name='twitter:data2'])[1]")
+        self._footer = etree.XPath(f"(//p[{_has_class('text-footer')}])[1]")
+
+    def _document(self, html_content):
+        return self._html.document_fromstring(html_content)
+
+    @staticmethod
+    def _first(xpath, node):
+        found = xpath(node)
+        return found[0] if found else None
+
+    def parse_list_page(self, html_content):
+        document = self._document(html_content)
+        posters = []
+        for container in self._containers(document):
+            poster = self._first(self._poster, container)
+            link = self._first(self._link, container)
+            img = self._first(self._img, container)
+            posters.append(_poster_record(
+                container.get('data-film-name'),
+                container.get('data-film-slug'),
+                {
+                    'target_link': poster.get('data-target-link'),
+                    'href': poster.get('href'),
+                    'release_year': poster.get('data-film-release-year'),
+                } if poster is not None else None,
+                link.get('href') if link is not None else None,
+                {
+                    'alt': img.get('alt'),
+                    'src': img.get('src'),
+                    'data_src': img.get('data-src'),
+                } if img is not None else None,
+            ))
+        return ParsedListPage(
+            posters,
+            bool(self._next(document)),
+            _last_page(element.text_content() for element in self._pages(document)),
+            bool(self._grid(document)),
+            bool(self._sign_in(document)),
+        )
+
+    def parse_film_page(self, html_content):
+        document = self._document(html_content)
+        title = self._first(self._title, document)
+        year = self._first(self._year, document)
+        director = self._first(self._director, document)
+        rating = self._first(self._rating, document)
+        footer = self._first(self._footer, document)
+        return {
+            'title': title.text_content().strip() if title is not None else None,
+            'year': year.text_content().strip() if year is not None else None,
+            'director': director.text_content().strip() if director is not None else None,
+            'rating': rating.get('content') if rating is not None else None,
+            'runtime': _runtime(footer.text_content()) if footer is not None else None,
+        }
+
+
+def _attributes(attrs):
+    """Convertit les attributs de HTMLParser en dictionnaire (premier attribut gagnant)."""
+    result = {}
+    for name, value in attrs:
+        result.setdefault(name, '' if value is None else value)
+    return result
+
+
+def _classes(attributes):
+    return attributes.get('class', '').split()
+
+
+class _Region:
+    """Suit l'ouverture et la fermeture d'un élément, balises homonymes imbriquées comprises."""
+
+    def __init__(self, tag):
+        self.tag = tag
+        self.depth = 1
+
+    def start(self, tag):
+        if tag == self.tag:
+            self.depth += 1
+
+    def end(self, tag):
+        """Retourne True lorsque l'élément suivi vient de se fermer."""
+        if tag == self.tag:
+            self.depth -= 1
+        return self.depth == 0
+
+
+class StreamingListParser(HTMLParser):
+    """Extracteur de posters sans arbre DOM, alimenté par morceaux via ``feed``.
+
+    ``feed`` retourne les enregistrements de posters terminés depuis l'appel
+    précédent. ``complete`` passe à True dès que la grille de posters est fermée
+    et que le bloc de pagination a été lu (ou, si ``need_last_page`` vaut False,
+    dès que le lien ``a.next`` a été vu) : la suite du document peut alors être
+    ignorée.
+    """
+
+    def __init__(self, need_last_page=True):
+        super().__init__(convert_charrefs=True)
+        self.need_last_page = need_last_page
+        self.has_next = False
+        self.has_grid = False
+        self.grid_done = False
+        self.pagination_done = False
+        self.sign_in_required = False
+        self._page_texts = []
+        self._ready = []
+        self._grid = None
+        self._container = None
+        self._record = None
+        self._link_seen = False
+        self._pagination = None
+        self._page_text = None
+
+    @property
+    def complete(self):
+        if not self.grid_done:
+            return False
+        if self.pagination_done:
+            return True
+        return not self.need_last_page and self.has_next
+
+    @property
+    def last_page(self):
+        return _last_page(self._page_texts)
+
+    def feed(self, data):
+        super().feed(data)
+        ready, self._ready = self._ready, []
+        return ready
+
+    def handle_starttag(self, tag, attrs):
+        attributes = _attributes(attrs)
+        classes = _classes(attributes)
+
+        for region in (self._grid, self._container, self._pagination, self._page_text):
+            if region:
+                region.start(tag)
+
+        if 'sign-in-message' in classes or 'sign-in-overlay' in classes:
+            self.sign_in_required = True
+        if tag == 'a' and 'next' in classes:
+            self.has_next = True
+
+        if not self.has_grid and ('films-grid' in classes or 'poster-list' in classes):
+            self.has_grid = True
+            self._grid = _Region(tag)
+
+        if self._container is None and tag == 'li' and 'poster-container' in classes:
+            self._container = _Region(tag)
+            self._link_seen = False
+            self._record = _poster_record(
+                attributes.get('data-film-name'), attributes.get('data-film-slug'), None, None, None
+            )
+        elif self._container is not None:
+            record = self._record
+            if tag == 'div' and record['poster'] is None and 'film-poster' in classes:
+                record['poster'] = {
+                    'target_link': attributes.get('data-target-link'),
+                    'href': attributes.get('href'),
+                    'release_year': attributes.get('data-film-release-year'),
+                }
+            elif tag == 'a' and not self._link_seen:
+                self._link_seen = True
+                record['link_href'] = attributes.get('href')
+            elif tag == 'img' and record['img'] is None:
+                record['img'] = {
+                    'alt': attributes.get('alt'),
+                    'src': attributes.get('src'),
+                    'data_src': attributes.get('data-src'),
+                }
+
+        if self._pagination is None and not self.pagination_done and 'paginate-pages' in classes:
+            self._pagination = _Region(tag)
+        elif self._pagination is not None and self._page_text is None:
+            if tag == 'a' or 'paginate-current' in classes:
+                self._page_text = _Region(tag)
+                self._page_texts.append('')
+
+    def handle_endtag(self, tag):
+        if self._page_text and self._page_text.end(tag):
+            self._page_text = None
+        if self._pagination and self._pagination.end(tag):
+            self._pagination = None
+            self.pagination_done = True
+        if self._container and self._container.end(tag):
+            self._ready.append(self._record)
+            self._container = None
+            self._record = None
+        if self._grid and self._grid.end(tag):
+            self._grid = None
+            self.grid_done = True
+
+    def handle_data(self, data):
+        if self._page_text:
+            self._page_texts[-1] += data
+
+    def close(self):
+        super().close()
+        # Un poster resté ouvert en fin de document est tout de même conservé
+        if self._record is not None:
+            self._ready.append(self._record)
+            self._container = None
+            self._record = None
+        ready, self._ready = self._ready, []
+        return ready
+
+
+class ListStream:
+    """Analyse incrémentale d'une page de liste, alimentée morceau par morceau.
+
+    ``feed`` retourne True dès que la suite du document peut être ignorée ;
+    ``finish`` retourne alors le ``ParsedListPage``. ``check_prefix`` est appelé
+    avec le texte lu avant la grille de posters (ou avec tout le document si
+    aucune grille n'est trouvée) ; seul ce préfixe est conservé en mémoire.
+    """
+
+    def __init__(self, check_prefix=None, need_last_page=True):
+        self.check_prefix = check_prefix
+        self.parser = StreamingListParser(need_last_page=need_last_page)
+        self.posters = []
+        self._prefix = []
+
+    def feed(self, chunk):
+        parser = self.parser
+        if not parser.has_grid:
+            self._prefix.append(chunk)
+        self.posters.extend(parser.feed(chunk))
+        if parser.has_grid and self._prefix:
+            if self.check_prefix:
+                self.check_prefix(''.join(self._prefix))
+            self._prefix = []
+        return parser.complete
+
+    def finish(self):
+        parser = self.parser
+        if not parser.complete:
+            self.posters.extend(parser.close())
+        if self._prefix and self.check_prefix:
+            self.check_prefix(''.join(self._prefix))
+        return ParsedListPage(
+            self.posters, parser.has_next, parser.last_page, parser.has_grid, parser.sign_in_required
+        )
+
+
+def parse_list_stream(chunks, check_prefix=None, need_last_page=True):
+    """Analyse une page de liste reçue par morceaux, en s'arrêtant dès que possible.
+
+    Voir ``ListStream`` ; retourne un ``ParsedListPage``.
+    """
+    stream = ListStream(check_prefix, need_last_page)
+    for chunk in chunks:
+        if stream.feed(chunk):
+            break
+    return stream.finish()
+
+
+class _FilmPageParser(HTMLParser):
+    """Extracteur des champs d'une page de film sans arbre DOM."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields = {'title': None, 'year': None, 'director': None, 'rating': None, 'runtime': None}
+        self._captures = {}
+        self._rating_seen = False
+
+    def handle_starttag(self, tag, attrs):
+        attributes = _attributes(attrs)
+        for region, _ in self._captures.values():
+            region.start(tag)
+
+        href = attributes.get('href', '')
+        if tag == 'h1' and 'headline-1' in _classes(attributes):
+            self._capture('title', tag)
+        elif tag == 'a' and '/films/year/' in href:
+            self._capture('year', tag)
+        elif tag == 'a' and '/director/' in href:
+            self._capture('director', tag)
+        elif tag == 'p' and 'text-footer' in _classes(attributes):
+            self._capture('runtime', tag)
+        elif tag == 'meta' and attributes.get('name') == 'twitter:data2' and not self._rating_seen:
+            self._rating_seen = True
+            self.fields['rating'] = attributes.get('content')
+
+    def _capture(self, field, tag):
+        if self.fields[field] is None and field not in self._captures:
+            self._captures[field] = (_Region(tag), [])
+
+    def handle_endtag(self, tag):
+        for field, (region, texts) in list(self._captures.items()):
+            if region.end(tag):
+                del self._captures[field]
+                self.fields[field] = ''.join(texts).strip()
+
+    def handle_data(self, data):
+        for _, texts in self._captures.values():
+            texts.append(data)
+
+
+class StreamingEngine:
+    """Moteur basé sur le tokenizer incrémental de la bibliothèque standard."""
+
+    name = 'stream'
+
+    def parse_list_page(self, html_content):
+        parser = StreamingListParser()
+        posters = parser.feed(html_content) + parser.close()
+        return ParsedListPage(
+            posters, parser.has_next, parser.last_page, parser.has_grid, parser.sign_in_required
+        )
+
+    def parse_film_page(self, html_content):
+        parser = _FilmPageParser()
+        parser.feed(html_content)
+        parser.close()
+        # Éléments restés ouverts en fin de document
+        for field, (_, texts) in parser._captures.items():
+            parser.fields[field] = ''.join(texts).strip()
+        if parser.fields['runtime'] is not None:
+            parser.fields['runtime'] = _runtime(parser.fields['runtime'])
+        return parser.fields
+
+
+class FallbackEngine:
+    """Utilise un moteur rapide et bascule sur un moteur de secours en cas d'échec."""
+
+    def __init__(self, primary, fallback):
+        self.primary = primary
+        self.fallback = fallback
+        self.name = f"{primary.name}+{fallback.name}"
+
+    def _call(self, method, html_content):
+        try:
+            return getattr(self.primary, method)(html_content)
+        except Exception as e:
+            logger.warning("Échec du moteur %s, utilisation de %s: %s", self.primary.name, self.fallback.name, e)
+            return getattr(self.fallback, method)(html_content)
+
+    def parse_list_page(self, html_content):
+        return self._call('parse_list_page', html_content)
+
+    def parse_film_page(self, html_content):
+        return self._call('parse_film_page', html_content)
+
+
+ENGINES = {
+    'html5lib': Html5libEngine,
+    'lxml': LxmlEngine,
+    'stream': StreamingEngine,
+}
+
+
+def get_engine(name=None):
+    """Retourne le moteur demandé (LETTERBOXD_PARSER par défaut).
+
+    Sans précision, lxml est utilisé s'il est installé, avec html5lib en secours.
+    """
+    name = name or os.environ.get('LETTERBOXD_PARSER', 'lxml')
+    if name not in ENGINES:
+        raise ValueError(f"Moteur d'analyse inconnu: {name}")
+    if name == 'html5lib':
+        return Html5libEngine()
+    try:
+        engine = ENGINES[name]()
+    except ImportError:
+        logger.warning("Moteur %s indisponible, utilisation de html5lib", name)
+        return Html5libEngine()
+    return FallbackEngine(engine, Html5libEngine())
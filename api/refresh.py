@@ -0,0 +1,194 @@
+import asyncio
+import contextvars
+import logging
+import math
+import random
+import threading
+import time
+
+from .observability import LIST_REFRESHES, timed
+
+logger = logging.getLogger(__name__)
+
+# Budget auquel sont imputées les requêtes émises par la tâche courante
+_current_budget = contextvars.ContextVar('letterboxd_request_budget', default=None)
+
+
+def charge_request():
+    """Impute une requête au budget de la tâche courante, s'il y en a un."""
+    budget = _current_budget.get()
+    if budget is not None:
+        budget.spend()
+
+
+class RequestBudget:
+    """Budget global de requêtes : au plus ``limit`` requêtes par ``window`` secondes.
+
+    Le budget se reconstitue continûment (seau à jetons). Une dépense peut le
+    rendre négatif : une synchronisation commencée n'est pas interrompue, mais
+    les suivantes attendent que le découvert soit résorbé.
+    """
+
+    def __init__(self, limit, window=60.0):
+        if limit <= 0:
+            raise ValueError("Le budget doit être strictement positif")
+        self.limit = limit
+        self.rate = limit / window
+        self._lock = threading.Lock()
+        self._tokens = float(limit)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.limit, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def remaining(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def spend(self, count=1):
+        with self._lock:
+            self._refill()
+            self._tokens -= count
+
+
+class RefreshScheduler:
+    """Garde à jour, en arrière-plan, les listes les plus demandées.
+
+    Chaque tirage est enregistré par ``record`` ; la fréquence d'accès d'une
+    liste est un score à décroissance exponentielle (demi-vie ``half_life``).
+    Une liste dont le score est tombé sous ``min_score`` (par défaut : plus
+    d'accès depuis une demi-vie) n'est plus suivie. À chaque passage (toutes
+    les ``interval`` secondes, à ``jitter`` près), les ``top`` listes les mieux
+    classées qui seraient parcourues en entier au prochain tirage (liste
+    inconnue ou dernière synchronisation complète expirée avant le passage
+    suivant) le sont en arrière-plan, les plus demandées d'abord, tant que le
+    budget de requêtes le permet. Un tirage sur une liste populaire ne
+    déclenche ainsi presque jamais de parcours complet ; les synchronisations
+    incrémentales, d'une page, restent faites à la demande.
+    """
+
+    def __init__(self, scraper, top=20, budget=60, window=60.0, interval=15.0, jitter=0.25,
+                 half_life=3600.0, min_score=0.5, max_tracked=1000, page_size=28):
+        self.scraper = scraper
+        self.top = top
+        self.min_score = min_score
+        self.budget = budget if isinstance(budget, RequestBudget) else RequestBudget(budget, window)
+        self.interval = interval
+        self.jitter = jitter
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._scores = {}  # (username, list_type, list_slug) -> (score, date du dernier accès)
+        self._future = None
+
+    def record(self, username, list_type, list_slug=None):
+        """Enregistre un accès à une liste."""
+        if not username or not list_type:
+            return
+        key = (username, list_type, list_slug)
+        now = time.time()
+        with self._lock:
+            score, last = self._scores.get(key, (0.0, now))
+            self._scores[key] = (self._decay(score, now - last) + 1, now)
+            if len(self._scores) > self.max_tracked:
+                self._forget(now)
+
+    def _decay(self, score, elapsed):
+        return score * 0.5 ** (elapsed / self.half_life)
+
+    def _forget(self, now):
+        # Ne conserver que la moitié la plus demandée des listes suivies
+        ranked = sorted(
+            self._scores.items(), key=lambda item: self._decay(item[1][0], now - item[1][1]),
+            reverse=True
+        )
+        self._scores = dict(ranked[:self.max_tracked // 2])
+
+    def hot_lists(self):
+        """Les ``top`` listes les plus demandées, de la plus à la moins demandée.
+
+        Les listes dont le score est tombé sous ``min_score`` sont oubliées.
+        """
+        now = time.time()
+        with self._lock:
+            scores = {key: self._decay(score, now - last) for key, (score, last) in self._scores.items()}
+            for key, score in scores.items():
+                if score < self.min_score:
+                    del self._scores[key]
+        hot = [key for key, score in scores.items() if score >= self.min_score]
+        return sorted(hot, key=scores.get, reverse=True)[:self.top]
+
+    @property
+    def lead(self):
+        """Anticipation : une liste expirant avant le passage suivant est rafraîchie dès maintenant."""
+        return self.interval * (1 + self.jitter)
+
+    def _estimated_cost(self, username, list_type, list_slug):
+        """Nombre de requêtes du parcours complet à anticiper, ou 0 s'il est inutile.
+
+        Seule compte l'expiration de la dernière synchronisation complète : une
+        copie simplement plus ancienne que ``refresh_interval`` ne coûte au
+        tirage suivant qu'une synchronisation incrémentale.
+        """
+        core = self.scraper.core
+        store = core.list_store
+        list_key = store.list_key(list_type, list_slug)
+        state = store.get_state(username, list_key)
+        if state and time.time() + self.lead - state['full_synced_at'] < core.full_sync_interval:
+            return 0
+        known = len(store.known_paths(username, list_key)) if state else 0
+        return max(1, math.ceil(known / self.page_size))
+
+    async def refresh_once(self):
+        """Effectue un passage ; retourne le nombre de listes resynchronisées."""
+        token = _current_budget.set(self.budget)
+        loop = asyncio.get_running_loop()
+        refreshed = 0
+        try:
+            for username, list_type, list_slug in self.hot_lists():
+                # Lectures SQLite, hors de la boucle d'événements
+                cost = await loop.run_in_executor(
+                    None, self._estimated_cost, username, list_type, list_slug
+                )
+                if not cost:
+                    continue
+                if cost > self.budget.remaining():
+                    LIST_REFRESHES.inc(outcome='over_budget')
+                    continue
+                try:
+                    with timed('list_refresh'):
+                        films = await self.scraper._get_list_films(
+                            username, list_type, list_slug, lead=self.lead
+                        )
+                except Exception as e:
+                    logger.warning("Rafraîchissement de %s/%s impossible: %s", username, list_type, e)
+                    films = None
+                LIST_REFRESHES.inc(outcome='ok' if films is not None else 'error')
+                refreshed += films is not None
+        finally:
+            _current_budget.reset(token)
+        return refreshed
+
+    async def run(self):
+        """Boucle de rafraîchissement (à lancer comme tâche de fond)."""
+        while True:
+            await asyncio.sleep(self.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+            try:
+                await self.refresh_once()
+            except Exception as e:
+                logger.error("Erreur du rafraîchissement en arrière-plan: %s", e)
+
+    def start(self, loop):
+        """Lance la boucle de rafraîchissement sur ``loop`` (depuis un autre thread)."""
+        if self._future is None:
+            self._future = asyncio.run_coroutine_threadsafe(self.run(), loop)
+        return self._future
+
+    def stop(self):
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
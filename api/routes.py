@@ -0,0 +1,195 @@
+"""Routes communes aux deux points d'entrée de l'application.
+
+Le serveur de développement (``app.py``) et la fonction Vercel
+(``api/index.py``) enregistrent le même Blueprint : page d'accueil, tirages
+(simple, en flux et de groupe) et métriques. Seul ``app.py`` y ajoute le
+proxy des posters.
+"""
+from flask import Blueprint, render_template, request, jsonify, Response, session
+from .async_scraper import (
+    AsyncLetterboxdScraper, IndexingInProgressError, NoMatchingFilmError, get_random_film,
+    get_random_group_film, stream_random_film
+)
+from .letterboxd_scraper import ListUnreachableError
+from .metadata import FilmFilter
+from .observability import SPINS, render_metrics, timed
+from .throttle import HostPausedError
+import json
+import secrets
+
+routes = Blueprint('routes', __name__)
+
+@routes.route('/')
+def index():
+    return render_template('index.html')
+
+def build_list_url(list_type, username):
+    """URL de la liste demandée ; lève ValueError (message destiné à l'utilisateur) si la demande est invalide."""
+    if not list_type or not username:
+        raise ValueError('Type de liste et pseudo requis')
+    if list_type == 'watchlist':
+        return f'https://letterboxd.com/{username}/watchlist/'
+    if list_type == 'list':
+        # Pour les listes personnalisées, on utilise l'URL complète
+        if not username.startswith('http'):
+            raise ValueError('Pour les listes personnalisées, veuillez entrer l\'URL complète de la liste (ex: https://letterboxd.com/username/list/nom-de-la-liste/)')
+        # Utiliser directement l'URL fournie
+        return username.rstrip('/')
+    if list_type == 'films':
+        return f'https://letterboxd.com/{username}/films/'
+    raise ValueError('Type de liste invalide')
+
+def deck_session():
+    """Identifiant de la session du client (cookie signé), qui a son propre paquet par liste."""
+    if 'deck' not in session:
+        session['deck'] = secrets.token_urlsafe(16)
+    return session['deck']
+
+@routes.route('/api/random-movie', methods=['POST'])
+async def get_random_movie():
+    try:
+        # Récupération des données depuis le JSON
+        data = request.get_json()
+        list_type = data.get('type')
+        username = data.get('username')
+
+        # Fallback pour form-data
+        if not list_type and request.form:
+            list_type = request.form.get('type')
+            username = request.form.get('username')
+
+        # Construction de l'URL selon le type
+        try:
+            url = build_list_url(list_type, username)
+            filters = FilmFilter.from_request(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        try:
+            # Le tirage s'exécute sur la boucle d'événements partagée du processus
+            with timed('spin'):
+                film = await get_random_film(
+                    url, fast=bool(data.get('fast')), filters=filters, session=deck_session()
+                )
+
+            if not film:
+                SPINS.inc(outcome='empty')
+                return jsonify({'error': 'Aucun film trouvé dans cette liste.'}), 404
+
+            SPINS.inc(outcome='ok')
+            return jsonify(film)
+        except (IndexingInProgressError, HostPausedError) as e:
+            SPINS.inc(outcome='indexing' if isinstance(e, IndexingInProgressError) else 'paused')
+            return jsonify({'error': str(e), 'retry_after': e.retry_after}), 503, {'Retry-After': str(e.retry_after)}
+        except ListUnreachableError:
+            SPINS.inc(outcome='unreachable')
+            return jsonify({'error': 'Impossible d\'accéder à la liste. Vérifiez que le pseudo ou le nom de la liste est correct.'}), 404
+        except Exception as e:
+            SPINS.inc(outcome='error')
+            return jsonify({'error': f'Erreur lors de la récupération des films: {str(e)}'}), 500
+
+    except Exception as e:
+        return jsonify({'error': f'Une erreur est survenue: {str(e)}'}), 500
+
+@routes.route('/api/random-movie/stream', methods=['POST'])
+def stream_random_movie():
+    """Variante de /api/random-movie qui transmet la progression du tirage.
+
+    La réponse est du NDJSON (un objet JSON par ligne) : événements ``page``,
+    ``films``, ``matches`` (tirage filtré), ``deck`` (cartes restantes du
+    paquet de la session) et ``candidate`` au fil du tirage, puis ``film``
+    (résultat complet) ou ``error``. Le film tiré peut ainsi être affiché avant
+    que sa page et son poster n'aient été récupérés. Les critères de
+    ``FilmFilter`` (``year_min``, ``rating_min``...) restreignent le tirage.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        url = build_list_url(data.get('type'), data.get('username'))
+        filters = FilmFilter.from_request(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    # Lu avant de répondre : le cookie de session part avec les en-têtes
+    client_session = deck_session()
+
+    def generate():
+        outcome = 'error'
+        with timed('spin'):
+            for event in stream_random_film(
+                url, fast=bool(data.get('fast')), filters=filters, session=client_session
+            ):
+                if event['event'] == 'film':
+                    outcome = 'ok'
+                yield json.dumps(event) + '\n'
+        SPINS.inc(outcome=outcome)
+
+    # Pas de mise en tampon par un éventuel proxy : chaque ligne part aussitôt
+    return Response(generate(), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Nombre maximal de membres pour un tirage de groupe
+MAX_GROUP_SIZE = 10
+
+
+@routes.route('/api/group-random-movie', methods=['POST'])
+async def get_group_random_movie():
+    """Tire un film parmi les watchlists (ou films vus) de plusieurs membres.
+
+    Répond 400 à une demande invalide, 404 si la liste d'un membre est
+    inaccessible ou si aucun film ne convient, 503 si Letterboxd demande une
+    pause trop longue pour être attendue, 500 pour toute autre erreur.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Requête JSON invalide'}), 400
+    usernames = data.get('usernames') or []
+    if isinstance(usernames, str):
+        usernames = usernames.split(',')
+    if not isinstance(usernames, list) or not all(isinstance(name, str) for name in usernames):
+        return jsonify({'error': 'Les pseudos doivent être une liste de chaînes de caractères'}), 400
+    # Pseudos nettoyés et dédoublonnés, dans l'ordre de saisie
+    usernames = list(dict.fromkeys(name.strip() for name in usernames if name and name.strip()))
+    list_type = data.get('type', 'watchlist')
+    mode = data.get('mode', 'intersection')
+    min_members = data.get('min_members')
+
+    if len(usernames) < 2:
+        return jsonify({'error': 'Au moins deux pseudos sont requis'}), 400
+    if len(usernames) > MAX_GROUP_SIZE:
+        return jsonify({'error': f'Au plus {MAX_GROUP_SIZE} pseudos par tirage de groupe'}), 400
+    if list_type not in ('watchlist', 'films'):
+        return jsonify({'error': 'Type de liste invalide'}), 400
+    if mode not in AsyncLetterboxdScraper.GROUP_MODES:
+        return jsonify({'error': 'Mode invalide (intersection, union ou at_least)'}), 400
+    if mode == 'at_least':
+        try:
+            min_members = int(min_members)
+        except (TypeError, ValueError):
+            min_members = 0
+        if not 1 <= min_members <= len(usernames):
+            return jsonify({'error': f'min_members doit être compris entre 1 et {len(usernames)}'}), 400
+
+    try:
+        with timed('group_spin'):
+            film = await get_random_group_film(usernames, mode, min_members, list_type)
+        SPINS.inc(outcome='ok')
+        return jsonify(film)
+    except ValueError as e:
+        SPINS.inc(outcome='invalid')
+        return jsonify({'error': str(e)}), 400
+    except HostPausedError as e:
+        SPINS.inc(outcome='paused')
+        return jsonify({'error': str(e), 'retry_after': e.retry_after}), 503, {'Retry-After': str(e.retry_after)}
+    except ListUnreachableError as e:
+        SPINS.inc(outcome='unreachable')
+        return jsonify({'error': str(e)}), 404
+    except NoMatchingFilmError as e:
+        SPINS.inc(outcome='empty')
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        SPINS.inc(outcome='error')
+        return jsonify({'error': f'Erreur lors du tirage de groupe: {str(e)}'}), 500
+
+@routes.route('/metrics')
+def metrics():
+    """Métriques du service au format texte de Prometheus."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,38 @@
+import random
+
+
+class Reservoir:
+    """Échantillon uniforme de ``k`` éléments d'un flux de longueur inconnue.
+
+    Algorithme R : le n-ième élément proposé remplace un élément de
+    l'échantillon avec une probabilité ``k / n``. Un seul passage, mémoire en
+    O(k) : le flux n'a jamais besoin d'être conservé.
+    """
+
+    __slots__ = ('k', 'items', 'seen', '_rng')
+
+    def __init__(self, k, rng=random):
+        if k < 1:
+            raise ValueError("La taille de l'échantillon doit être au moins 1")
+        self.k = k
+        self.items = []
+        self.seen = 0
+        self._rng = rng
+
+    def offer(self, item):
+        """Propose un élément du flux."""
+        self.seen += 1
+        if len(self.items) < self.k:
+            self.items.append(item)
+            return
+        position = self._rng.randrange(self.seen)
+        if position < self.k:
+            self.items[position] = item
+
+
+def reservoir_sample(items, k, rng=random):
+    """Tire ``k`` éléments (ou tous s'il y en a moins) uniformément, en un seul passage."""
+    reservoir = Reservoir(k, rng)
+    for item in items:
+        reservoir.offer(item)
+    return reservoir.items
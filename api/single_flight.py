@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Regroupe les appels simultanés portant sur une même clé.
+
+    Le premier appelant exécute la fonction ; ceux qui arrivent pendant son
+    exécution attendent et reçoivent le même résultat (ou la même exception).
+    Rien n'est conservé une fois l'appel terminé : ce n'est pas un cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = func(*args)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def in_flight(self):
+        """Nombre d'appels en cours."""
+        with self._lock:
+            return len(self._calls)
+
+
+class AsyncSingleFlight:
+    """Équivalent de ``SingleFlight`` pour des coroutines d'une même boucle.
+
+    L'appel partagé s'exécute dans sa propre tâche : l'annulation d'un des
+    appelants (client déconnecté...) n'interrompt pas celui des autres.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func, *args):
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func(*args))
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def in_flight(self):
+        return len(self._calls)
@@ -0,0 +1,286 @@
+"""Instantanés compacts des listes stockées et de leurs métadonnées.
+
+Une instance qui démarre à froid (Vercel) n'a ni listes ni index : un
+instantané exporté depuis une instance chaude lui permet de servir les listes
+connues sans les parcourir. Le fichier est conçu pour être projeté en mémoire
+(``mmap``) et interrogé sans être désérialisé :
+
+- un en-tête JSON (répertoire des listes et des pages de chaînes) ;
+- une table de chaînes internées (chemins, titres, images, années,
+  réalisateurs), découpée en pages compressées indépendamment ;
+- un bloc compressé par liste, rangé par colonnes d'entiers (indices dans la
+  table des chaînes) et de métadonnées.
+
+Lire une liste ne décompresse que son bloc et les pages de chaînes qu'il
+référence. Export :
+
+    python -m api.snapshot export lists.lbxs
+"""
+import argparse
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+
+from .film_index import FilmIndex
+
+MAGIC = b'LBXS'
+VERSION = 1
+# Magie, version, longueur de l'en-tête JSON
+_PREAMBLE = struct.Struct('<4sHI')
+# Valeur des colonnes entières pour une donnée absente
+NONE = 0xFFFFFFFF
+STRINGS_PER_PAGE = 512
+
+
+def _pack(typecode, values):
+    column = array(typecode, values)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column.tobytes()
+
+
+def _unpack(typecode, data, start, count):
+    column = array(typecode)
+    column.frombytes(data[start:start + count * column.itemsize])
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column, start + count * column.itemsize
+
+
+class _Strings:
+    """Table de chaînes internées en cours de construction."""
+
+    def __init__(self):
+        self.ids = {}
+        self.values = []
+
+    def intern(self, value):
+        if value is None:
+            return NONE
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return string_id
+
+
+def _list_block(films, metadata, strings):
+    """Colonnes d'une liste : chemins, titres, images, années, puis métadonnées."""
+    rows = [metadata.get(film['path']) for film in films]
+    columns = [
+        _pack('I', [strings.intern(film[field]) for film in films])
+        for field in ('path', 'name', 'image', 'year')
+    ]
+    columns += [
+        _pack('B', [row is not None for row in rows]),
+        _pack('I', [strings.intern(row['director']) if row else NONE for row in rows]),
+        _pack('I', [row['year'] if row and row['year'] is not None else NONE for row in rows]),
+        _pack('I', [row['runtime'] if row and row['runtime'] is not None else NONE for row in rows]),
+        _pack('f', [row['rating'] if row and row['rating'] is not None else math.nan for row in rows]),
+    ]
+    return zlib.compress(b''.join(columns), 6)
+
+
+def write_snapshot(path, list_store, metadata_index=None, lists=None):
+    """Exporte des listes stockées (toutes par défaut) et leurs métadonnées indexées.
+
+    ``lists`` est un itérable de ``(username, list_key)``. L'écriture passe par
+    un fichier temporaire : un instantané en cours de lecture n'est jamais
+    modifié. Retourne le nombre de listes exportées.
+    """
+    states = {(row['username'], row['list_key']): row for row in list_store.lists()}
+    keys = list(states) if lists is None else [key for key in lists if key in states]
+    strings = _Strings()
+    blocks = []
+    directory = {}
+    offset = 0
+    for username, list_key in keys:
+        films = list_store.get_films(username, list_key)
+        metadata = metadata_index.get_many(film['path'] for film in films) if metadata_index else {}
+        block = _list_block(films, metadata, strings)
+        state = states[username, list_key]
+        directory[f"{username}\t{list_key}"] = {
+            'offset': offset, 'length': len(block), 'count': len(films),
+            'synced_at': state['synced_at'], 'full_synced_at': state['full_synced_at'],
+        }
+        blocks.append(block)
+        offset += len(block)
+
+    pages = []
+    for start in range(0, len(strings.values), STRINGS_PER_PAGE):
+        page = zlib.compress('\0'.join(strings.values[start:start + STRINGS_PER_PAGE]).encode('utf-8'), 6)
+        pages.append([offset, len(page)])
+        blocks.append(page)
+        offset += len(page)
+
+    header = json.dumps({
+        'lists': directory,
+        'strings': {'count': len(strings.values), 'per_page': STRINGS_PER_PAGE, 'pages': pages},
+    }, separators=(',', ':')).encode('utf-8')
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as output:
+        output.write(_PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        output.write(header)
+        for block in blocks:
+            output.write(block)
+    os.replace(temporary, path)
+    return len(keys)
+
+
+class Snapshot:
+    """Instantané ouvert en lecture seule et projeté en mémoire.
+
+    Les listes sont désignées comme dans ``ListStore`` (``username``,
+    ``list_key``). Les pages de chaînes décompressées sont conservées : une
+    instance ne paie chaque page qu'une fois.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Instantané vide : {path}")
+        magic, version, header_length = _PREAMBLE.unpack_from(self._data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Format d'instantané non reconnu : {path}")
+        header = json.loads(self._data[_PREAMBLE.size:_PREAMBLE.size + header_length])
+        self._base = _PREAMBLE.size + header_length
+        self._lists = header['lists']
+        self._string_pages = header['strings']['pages']
+        self._per_page = header['strings']['per_page']
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def _block(self, offset, length):
+        start = self._base + offset
+        return zlib.decompress(self._data[start:start + length])
+
+    def _string(self, string_id):
+        if string_id == NONE:
+            return None
+        number, position = divmod(string_id, self._per_page)
+        page = self._pages.get(number)
+        if page is None:
+            page = self._block(*self._string_pages[number]).decode('utf-8').split('\0')
+            with self._lock:
+                self._pages[number] = page
+        return page[position]
+
+    def __contains__(self, key):
+        username, list_key = key
+        return f"{username}\t{list_key}" in self._lists
+
+    def __len__(self):
+        return len(self._lists)
+
+    def lists(self):
+        """Listes de l'instantané : ``[(username, list_key), ...]``."""
+        return [tuple(key.split('\t', 1)) for key in self._lists]
+
+    def get_state(self, username, list_key):
+        """Dates de synchronisation de la liste au moment de l'export, ou None."""
+        entry = self._lists.get(f"{username}\t{list_key}")
+        if entry is None:
+            return None
+        return {'synced_at': entry['synced_at'], 'full_synced_at': entry['full_synced_at']}
+
+    def read_list(self, username, list_key):
+        """Retourne ``(films, métadonnées)`` d'une liste, ou None si elle est absente.
+
+        ``films`` est un ``FilmIndex`` ; les métadonnées sont au format de
+        ``MetadataIndex.get_many`` et ne couvrent que les films indexés.
+        """
+        entry = self._lists.get(f"{username}\t{list_key}")
+        if entry is None:
+            return None
+        data, count = self._block(entry['offset'], entry['length']), entry['count']
+        columns, position = [], 0
+        for typecode in ('I', 'I', 'I', 'I', 'B', 'I', 'I', 'I', 'f'):
+            column, position = _unpack(typecode, data, position, count)
+            columns.append(column)
+        paths, names, images, years, indexed, directors, meta_years, runtimes, ratings = columns
+
+        films = FilmIndex()
+        metadata = {}
+        for row in range(count):
+            path = self._string(paths[row])
+            films.add(self._string(names[row]), path, self._string(images[row]), self._string(years[row]))
+            if indexed[row]:
+                metadata[path] = {
+                    'year': None if meta_years[row] == NONE else meta_years[row],
+                    'rating': None if math.isnan(ratings[row]) else round(ratings[row], 2),
+                    'director': self._string(directors[row]),
+                    'runtime': None if runtimes[row] == NONE else runtimes[row],
+                }
+        return films, metadata
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+
+_default_snapshot = None
+_default_snapshot_lock = threading.Lock()
+_default_snapshot_loaded = False
+
+
+def default_snapshot_path():
+    """Instantané indiqué par ``LETTERBOXD_SNAPSHOT``, ou celui livré avec l'application."""
+    return os.environ.get(
+        'LETTERBOXD_SNAPSHOT',
+        os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'snapshot', 'lists.lbxs')
+    )
+
+
+def get_default_snapshot():
+    """Retourne l'instantané du processus, ou None s'il n'y en a pas (ouvert une seule fois)."""
+    global _default_snapshot, _default_snapshot_loaded
+    with _default_snapshot_lock:
+        if not _default_snapshot_loaded:
+            _default_snapshot_loaded = True
+            path = default_snapshot_path()
+            if os.path.exists(path):
+                _default_snapshot = Snapshot(path)
+        return _default_snapshot
+
+
+def main(argv=None):
+    from .list_store import ListStore
+    from .metadata import MetadataIndex
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="exporte les listes du stockage")
+    export.add_argument('output')
+    export.add_argument('--store', help="base SQLite des listes (LETTERBOXD_STORE_PATH par défaut)")
+    export.add_argument('--user', action='append', help="n'exporter que les listes de ce membre")
+    show = commands.add_parser('show', help="résume un instantané")
+    show.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'export':
+        store = ListStore(args.store)
+        lists = None
+        if args.user:
+            lists = [(row['username'], row['list_key']) for row in store.lists() if row['username'] in args.user]
+        count = write_snapshot(args.output, store, MetadataIndex(store.path), lists)
+        print(f"{count} liste(s) exportée(s) dans {args.output} ({os.path.getsize(args.output)} octets)")
+    else:
+        snapshot = Snapshot(args.path)
+        for username, list_key in snapshot.lists():
+            films, metadata = snapshot.read_list(username, list_key)
+            print(f"{username}/{list_key}: {len(films)} films, {len(metadata)} indexés")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from .observability import RATE_LIMIT_PAUSE, RATE_LIMIT_RPS, UPSTREAM_THROTTLED
+from .transport import ListUnreachableError
+
+# Réponses signalant un hôte surchargé : le débit est réduit
+SLOWDOWN_STATUSES = (429, 500, 502, 503, 504)
+# Attente maximale (en secondes) imposée par un Retry-After avant d'abandonner
+MAX_PAUSE = 5.0
+
+
+class HostPausedError(ListUnreachableError):
+    """L'hôte a demandé une pause plus longue que ce qu'une requête peut attendre."""
+
+    def __init__(self, host, pause):
+        self.host = host
+        self.retry_after = max(1, math.ceil(pause))
+        super().__init__(
+            f"{host or 'Le serveur'} demande une pause de {self.retry_after} s, réessayez plus tard."
+        )
+
+
+def parse_retry_after(value, now=None):
+    """Convertit un en-tête ``Retry-After`` (secondes ou date HTTP) en secondes, ou None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, date.timestamp() - (now if now is not None else time.time()))
+
+
+class AdaptiveRateLimiter:
+    """Seau à jetons dont le débit s'adapte aux réponses de l'hôte.
+
+    Le débit part de la moitié de ``max_rate`` et progresse de ``increase``
+    requête/s à chaque réponse normale, jusqu'à ``max_rate`` ; il est divisé par
+    deux (au plus une fois par seconde, pour qu'une rafale de 429 ne le fasse
+    pas s'effondrer) à chaque réponse 429 ou 5xx, sans descendre sous
+    ``min_rate``. Un ``Retry-After`` suspend toutes les requêtes vers l'hôte
+    pendant la durée indiquée ; une requête n'attend la fin de la pause que
+    si elle survient dans les ``max_pause`` secondes, sinon ``HostPausedError``
+    est levée aussitôt. Partagé entre threads ; ``acquire_async`` attend sans
+    bloquer la boucle d'événements.
+    """
+
+    def __init__(self, max_rate, rate=None, min_rate=0.25, burst=2, increase=None, host=None,
+                 max_pause=MAX_PAUSE):
+        if max_rate <= 0:
+            raise ValueError("Le débit doit être strictement positif")
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = max(self.min_rate, rate or max_rate / 2)
+        self.burst = burst
+        self.increase = increase or max_rate / 50
+        self.host = host
+        self.max_pause = max_pause
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = float('-inf')
+        self._publish()
+
+    def _reserve(self):
+        """Réserve un jeton et retourne le délai à attendre avant de l'utiliser.
+
+        Lève ``HostPausedError`` (sans réserver de jeton) si la pause demandée
+        par l'hôte dure encore plus de ``max_pause`` secondes.
+        """
+        with self._lock:
+            now = time.monotonic()
+            pause = self._paused_until - now
+            if pause > self.max_pause:
+                raise HostPausedError(self.host, pause)
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, pause)
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self):
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_response(self, status, retry_after=None):
+        """Ajuste le débit d'après le statut d'une réponse et son ``Retry-After`` (en secondes)."""
+        with self._lock:
+            now = time.monotonic()
+            if status in SLOWDOWN_STATUSES:
+                if now - self._last_decrease >= 1.0:
+                    self.rate = max(self.min_rate, self.rate / 2)
+                    self._last_decrease = now
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+        if self.host is not None and status in SLOWDOWN_STATUSES:
+            UPSTREAM_THROTTLED.inc(host=self.host, status=str(status))
+            if retry_after:
+                RATE_LIMIT_PAUSE.set(round(time.time() + self.paused_for()), host=self.host)
+        self._publish()
+
+    def paused_for(self):
+        """Durée restante de la suspension demandée par l'hôte (en secondes)."""
+        with self._lock:
+            return max(0.0, self._paused_until - time.monotonic())
+
+    def _publish(self):
+        if self.host is not None:
+            RATE_LIMIT_RPS.set(round(self.rate, 3), host=self.host)
+
+
+class HostRateLimiters:
+    """Un ``AdaptiveRateLimiter`` par hôte, créé à la première requête vers cet hôte."""
+
+    def __init__(self, max_rate, **options):
+        self.max_rate = max_rate
+        self.options = options
+        self._lock = threading.Lock()
+        self._limiters = {}
+
+    def for_host(self, host):
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = AdaptiveRateLimiter(
+                    self.max_rate, host=host, **self.options
+                )
+            return limiter
+
+    def for_url(self, url):
+        return self.for_host(urlparse(url).netloc)
+
+
+_shared_limiters = None
+_shared_limiters_lock = threading.Lock()
+
+
+def get_shared_limiters():
+    """Limiteurs partagés par tout le processus (débit maximal : ``LETTERBOXD_MAX_RPS``, 8 par défaut)."""
+    global _shared_limiters
+    with _shared_limiters_lock:
+        if _shared_limiters is None:
+            _shared_limiters = HostRateLimiters(float(os.environ.get('LETTERBOXD_MAX_RPS', 8)))
+        return _shared_limiters
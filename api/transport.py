@@ -0,0 +1,90 @@
+import threading
+
+
+class ListUnreachableError(Exception):
+    """La liste n'a pas pu être récupérée (erreur réseau ou HTTP)."""
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+    'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Accept-Encoding': 'gzip, deflate',  # Simplified encoding acceptance
+    'Cache-Control': 'no-cache',
+    'Pragma': 'no-cache',
+    'Connection': 'keep-alive'
+}
+
+# Nombre maximal de connexions conservées par hôte
+POOL_SIZES = {
+    'letterboxd.com': 16,
+    'api.themoviedb.org': 8,
+    'a.ltrbxd.com': 8,
+}
+DEFAULT_POOL_SIZE = 4
+
+
+# Réponses relancées par le scraper (``_get``), qui règle aussi le débit de
+# chaque hôte, comme les erreurs de connexion et les délais dépassés : les
+# sessions ne relancent rien elles-mêmes
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 3
+RETRY_BACKOFF = 1  # attentes de 1, 2 puis 4 s sans Retry-After
+
+
+def create_session(pool_sizes=None):
+    """Crée une session HTTP avec un pool de connexions dimensionné par hôte."""
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    default_adapter = HTTPAdapter(pool_maxsize=DEFAULT_POOL_SIZE)
+    session.mount("http://", default_adapter)
+    session.mount("https://", default_adapter)
+    for host, size in (pool_sizes or POOL_SIZES).items():
+        # Un adaptateur par hôte : requests choisit le préfixe le plus long
+        session.mount(
+            f"https://{host}/",
+            HTTPAdapter(pool_connections=1, pool_maxsize=size)
+        )
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def create_async_session(pool_sizes=None):
+    """Crée une session aiohttp (à appeler depuis la boucle d'événements qui l'utilisera).
+
+    aiohttp ne permet pas de dimensionner le pool hôte par hôte : la limite par
+    hôte est celle de l'hôte le plus sollicité.
+    """
+    import aiohttp
+
+    sizes = pool_sizes or POOL_SIZES
+    connector = aiohttp.TCPConnector(
+        limit=sum(sizes.values()) + DEFAULT_POOL_SIZE,
+        limit_per_host=max(sizes.values(), default=DEFAULT_POOL_SIZE),
+    )
+    # aiohttp gère lui-même la décompression et le keep-alive
+    headers = {
+        name: value for name, value in DEFAULT_HEADERS.items()
+        if name not in ('Accept-Encoding', 'Connection')
+    }
+    return aiohttp.ClientSession(
+        connector=connector, headers=headers, timeout=aiohttp.ClientTimeout(total=10)
+    )
+
+
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def get_shared_session():
+    """Retourne la session partagée par tout le processus.
+
+    Les connexions (TLS et keep-alive) sont ainsi réutilisées d'une requête
+    Flask à l'autre au lieu d'être recréées à chaque tirage.
+    """
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_session()
+        return _shared_session
@@ -1,98 +1,153 @@
-from flask import Flask, render_template, request, jsonify, Response, send_file
+from flask import Flask, request, jsonify, Response, send_file
 # Import the scraper from the `api` package. When running the application
 # locally with `python app.py`, the scraper lives inside the `api` package so we
 # need to use the package import. The previous absolute import failed with a
 # `ModuleNotFoundError` because `letterboxd_scraper.py` does not exist at the
 # project root.
+from api.async_scraper import warm_up
+from api.image_cache import DiskImageCache
 from api.letterboxd_scraper import LetterboxdScraper
+from api.transport import get_shared_session
+from api.observability import CACHE_REQUESTS, configure_logging, timed
+from api.routes import routes
 from flask_wtf import CSRFProtect
+import logging
 import os
-import requests
-from io import BytesIO
 from urllib.parse import urlparse
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', os.urandom(24))
 csrf = CSRFProtect(app)
 
-@app.route('/')
-def index():
-    return render_template('index.html')
+# Routes partagées avec api/index.py (voir api/routes.py) ; le proxy des
+# posters n'existe qu'ici
+app.register_blueprint(routes)
+
+# Scraper, boucle et session préparés en arrière-plan pendant que l'instance
+# sert ses premières requêtes (LETTERBOXD_WARM_UP=0 pour s'en passer)
+if os.environ.get('LETTERBOXD_WARM_UP', '1') != '0':
+    warm_up()
+
+# Cache disque des posters servis par le proxy
+image_cache = DiskImageCache(
+    max_bytes=int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+)
+
+# Les posters ne changent jamais : les navigateurs peuvent les conserver un an
+IMAGE_MAX_AGE = 365 * 24 * 3600
+PROXY_CHUNK_SIZE = 64 * 1024
+# Taille maximale d'une image relayée (et donc copiée dans le cache disque)
+MAX_IMAGE_BYTES = int(os.environ.get('IMAGE_MAX_BYTES', 10 * 1024 * 1024))
+# Hôte des posters Letterboxd ; celui des posters TMDB suit TMDB_IMAGE_BASE_URL
+LETTERBOXD_IMAGE_HOST = 'a.ltrbxd.com'
+
+
+def _allowed_image_hosts():
+    """Hôtes (avec port éventuel) dont le proxy accepte de relayer les images."""
+    tmdb_image_base_url = os.environ.get('TMDB_IMAGE_BASE_URL', LetterboxdScraper.TMDB_IMAGE_BASE_URL)
+    return {LETTERBOXD_IMAGE_HOST, urlparse(tmdb_image_base_url).netloc.lower()}
+
+
+def _immutable_headers(response, etag):
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = IMAGE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
 
-@app.route('/api/random-movie', methods=['POST'])
-def get_random_movie():
-    try:
-        # Récupération des données depuis le JSON
-        data = request.get_json()
-        list_type = data.get('type')
-        username = data.get('username')
-        
-        # Fallback pour form-data
-        if not list_type and request.form:
-            list_type = request.form.get('type')
-            username = request.form.get('username')
-            
-        if not list_type or not username:
-            return jsonify({'error': 'Type de liste et pseudo requis'}), 400
-            
-        # Construction de l'URL selon le type
-        try:
-            if list_type == 'watchlist':
-                url = f'https://letterboxd.com/{username}/watchlist/'
-            elif list_type == 'list':
-                # Pour les listes personnalisées, on utilise l'URL complète
-                if not username.startswith('http'):
-                    return jsonify({'error': 'Pour les listes personnalisées, veuillez entrer l\'URL complète de la liste (ex: https://letterboxd.com/username/list/nom-de-la-liste/)'}), 400
-                # Utiliser directement l'URL fournie
-                url = username.rstrip('/')
-            elif list_type == 'films':
-                url = f'https://letterboxd.com/{username}/films/'
-            else:
-                return jsonify({'error': 'Type de liste invalide'}), 400
-        except Exception as e:
-            return jsonify({'error': f'Erreur lors de la construction de l\'URL: {str(e)}'}), 400
-        
-        try:
-            scraper = LetterboxdScraper()
-            film = scraper.get_films(url)
-            
-            if not film:
-                return jsonify({'error': 'Aucun film trouvé dans cette liste.'}), 404
-            
-            return jsonify(film)
-        except requests.exceptions.RequestException as e:
-            return jsonify({'error': 'Impossible d\'accéder à la liste. Vérifiez que le pseudo ou le nom de la liste est correct.'}), 404
-        except Exception as e:
-            return jsonify({'error': f'Erreur lors de la récupération des films: {str(e)}'}), 500
-    
-    except Exception as e:
-        return jsonify({'error': f'Une erreur est survenue: {str(e)}'}), 500
 
 @app.route('/proxy-image')
 def proxy_image():
-    """Proxy pour récupérer les images de Letterboxd."""
+    """Proxy pour récupérer les images de Letterboxd.
+
+    Les images sont transmises au client au fil de l'eau et copiées en même
+    temps dans un cache disque ; les requêtes suivantes (y compris
+    conditionnelles ou partielles) sont servies sans quitter la machine.
+    Seuls les hôtes des posters (Letterboxd et TMDB) sont relayés, sans
+    suivre de redirection ; une réponse qui n'est pas une image ou qui
+    dépasse ``MAX_IMAGE_BYTES`` est refusée (502) ou interrompue.
+    """
     try:
         image_url = request.args.get('url')
         if not image_url:
             return jsonify({'error': 'URL de l\'image manquante'}), 400
+        parsed = urlparse(image_url)
+        if parsed.scheme not in ('http', 'https'):
+            return jsonify({'error': 'URL de l\'image invalide'}), 400
+        if parsed.netloc.lower() not in _allowed_image_hosts():
+            return jsonify({'error': 'Hôte de l\'image non autorisé'}), 400
+
+        # L'URL d'un poster identifie son contenu : un ETag connu suffit pour un 304
+        etag = image_cache.key(image_url)
+        if etag in request.if_none_match:
+            return _immutable_headers(Response(status=304), etag)
+
+        cached = image_cache.lookup(image_url)
+        CACHE_REQUESTS.inc(cache='image', result='hit' if cached else 'miss')
+        if cached:
+            image_path, content_type = cached
+            response = send_file(image_path, mimetype=content_type, conditional=True, etag=False)
+            return _immutable_headers(response, etag)
+
+        # Requête partielle sur une image absente du cache : relayer la plage demandée
+        upstream_headers = {}
+        if request.headers.get('Range'):
+            upstream_headers['Range'] = request.headers['Range']
+        with timed('image_proxy'):
+            upstream = get_shared_session().get(
+                image_url, stream=True, timeout=10, headers=upstream_headers, allow_redirects=False
+            )
+            try:
+                upstream.raise_for_status()
+            except Exception:
+                upstream.close()
+                raise
+        content_type = upstream.headers.get('Content-Type', 'image/jpeg')
+        length = upstream.headers.get('Content-Length', '')
+        if upstream.status_code not in (200, 206) or not content_type.startswith('image/'):
+            upstream.close()
+            return jsonify({'error': 'La réponse amont n\'est pas une image'}), 502
+        if length.isdigit() and int(length) > MAX_IMAGE_BYTES:
+            upstream.close()
+            return jsonify({'error': 'Image trop volumineuse'}), 502
+
+        writer = None
+        if upstream.status_code == 200:
+            writer = image_cache.writer(image_url, content_type)
+
+        def generate():
+            try:
+                received = 0
+                for chunk in upstream.iter_content(chunk_size=PROXY_CHUNK_SIZE):
+                    received += len(chunk)
+                    if received > MAX_IMAGE_BYTES:
+                        # Longueur annoncée absente ou fausse : réponse tronquée, rien en cache
+                        logger.warning("Image trop volumineuse, transfert interrompu: %s", image_url)
+                        return
+                    if writer:
+                        writer.write(chunk)
+                    yield chunk
+                if writer:
+                    writer.commit()
+            finally:
+                # Client déconnecté ou erreur : l'image incomplète n'est pas conservée
+                if writer:
+                    writer.abort()
+                upstream.close()
 
-        # Récupérer l'image
-        response = requests.get(image_url, stream=True)
-        response.raise_for_status()
-
-        # Créer un objet BytesIO pour stocker l'image
-        img_io = BytesIO(response.content)
-        img_io.seek(0)
-
-        # Retourner l'image avec les bons headers
-        return send_file(
-            img_io,
-            mimetype=response.headers['Content-Type'],
-            as_attachment=False,
-            download_name='poster.jpg'
-        )
+        response = Response(generate(), status=upstream.status_code, mimetype=content_type)
+        for header in ('Content-Length', 'Content-Range', 'Accept-Ranges'):
+            if header in upstream.headers:
+                response.headers[header] = upstream.headers[header]
+        if 'Content-Encoding' in upstream.headers:
+            # Le corps est transmis décompressé : la longueur amont ne s'applique plus
+            response.headers.pop('Content-Length', None)
+        return _immutable_headers(response, etag)
     except Exception as e:
-        print(f"Erreur proxy-image: {str(e)}")
+        logger.warning("Erreur proxy-image: %s", e)
         return jsonify({'error': f'Erreur lors de la récupération de l\'image: {str(e)}'}), 500
 
 # Pour les environnements de développement
@@ -0,0 +1 @@
+"""Outils de test de charge : serveur de substitution Letterboxd/TMDB et générateur de charge."""
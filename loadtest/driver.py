@@ -0,0 +1,181 @@
+"""Générateur de charge pour ``/api/random-movie``.
+
+Démarre le serveur de substitution, lance l'application Flask dans le
+processus (sauf si ``--target`` désigne une instance déjà démarrée) puis envoie
+des tirages concurrents et affiche le débit et les latences p50/p95/p99.
+
+    python -m loadtest.driver --spins 500 --concurrency 16 --latency 0.05
+
+Avec ``--target``, l'application visée doit avoir été démarrée avec
+``LETTERBOXD_BASE_URL``, ``TMDB_BASE_URL`` et ``TMDB_IMAGE_BASE_URL`` pointant
+vers le serveur de substitution.
+"""
+import argparse
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+
+from .stand_in import add_config_arguments, config_from_arguments, start_stand_in
+
+CSRF_INPUT = re.compile(r'name="csrf_token" value="([^"]+)"')
+
+
+def percentile(sorted_values, fraction):
+    """Percentile au rang le plus proche d'une liste triée."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(len(sorted_values) * fraction))
+    return sorted_values[rank - 1]
+
+
+class LoadReport:
+    def __init__(self, latencies, statuses, elapsed):
+        self.latencies = sorted(latencies)
+        self.statuses = statuses
+        self.elapsed = elapsed
+
+    @property
+    def throughput(self):
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, fraction):
+        return percentile(self.latencies, fraction)
+
+    def format(self):
+        lines = [
+            f"Tirages : {len(self.latencies)} en {self.elapsed:.2f} s ({self.throughput:.1f} tirages/s)",
+            "Statuts : " + ', '.join(f"{status}={count}" for status, count in sorted(self.statuses.items())),
+        ]
+        if self.latencies:
+            lines.append("Latence : " + ', '.join(
+                f"p{int(fraction * 100)}={self.percentile(fraction) * 1000:.0f} ms"
+                for fraction in (0.5, 0.95, 0.99)
+            ))
+        return '\n'.join(lines)
+
+
+class _Client:
+    """Client HTTP d'un utilisateur : session Flask et jeton CSRF propres."""
+
+    def __init__(self, target):
+        self.target = target.rstrip('/')
+        self.session = requests.Session()
+        page = self.session.get(f"{self.target}/", timeout=30)
+        page.raise_for_status()
+        match = CSRF_INPUT.search(page.text)
+        self.csrf_token = match.group(1) if match else ''
+
+    def spin(self, username, list_type, fast, proxy_posters):
+        response = self.session.post(
+            f"{self.target}/api/random-movie",
+            json={'type': list_type, 'username': username, 'fast': fast},
+            headers={'X-CSRFToken': self.csrf_token},
+            timeout=60,
+        )
+        if response.status_code == 200 and proxy_posters:
+            poster = response.json().get('poster')
+            if poster:
+                self.session.get(f"{self.target}/proxy-image?url={quote(poster, safe='')}", timeout=60).content
+        return response.status_code
+
+
+def run_load(target, spins=100, concurrency=8, users=10, list_type='watchlist', fast=False,
+             proxy_posters=False):
+    """Envoie ``spins`` tirages répartis sur ``users`` listes et retourne un LoadReport."""
+    local = threading.local()
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+
+    def spin(index):
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = _Client(target)
+        start = time.perf_counter()
+        try:
+            status = client.spin(f"user{index % users}", list_type, fast, proxy_posters)
+        except requests.RequestException:
+            status = 'exception'
+        duration = time.perf_counter() - start
+        with lock:
+            latencies.append(duration)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(spin, range(spins)))
+    return LoadReport(latencies, statuses, time.perf_counter() - start)
+
+
+def serve_app(stand_in_url, max_requests_per_second=1000):
+    """Démarre l'application Flask dans un thread, redirigée vers le serveur de substitution.
+
+    Les variables d'environnement sont positionnées avant l'import de
+    l'application : le scraper partagé ne doit pas encore avoir été créé.
+    """
+    os.environ['LETTERBOXD_BASE_URL'] = stand_in_url
+    os.environ['TMDB_BASE_URL'] = stand_in_url
+    os.environ['TMDB_IMAGE_BASE_URL'] = stand_in_url
+    os.environ['LETTERBOXD_MAX_RPS'] = str(max_requests_per_second)
+    # Stockages isolés : un test de charge ne doit pas polluer les caches locaux
+    workdir = tempfile.mkdtemp(prefix='roulette_loadtest_')
+    os.environ.setdefault('LETTERBOXD_STORE_PATH', os.path.join(workdir, 'store.sqlite3'))
+    os.environ.setdefault('IMAGE_CACHE_DIR', os.path.join(workdir, 'images'))
+
+    from werkzeug.serving import make_server
+    from app import app
+
+    # Le journal d'accès de chaque requête fausserait les mesures
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name='loadtest-app', daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--target', help="URL d'une instance déjà démarrée de l'application")
+    parser.add_argument('--spins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--users', type=int, default=10, help="nombre de listes distinctes")
+    parser.add_argument('--list-type', choices=['watchlist', 'films'], default='watchlist')
+    parser.add_argument('--fast', action='store_true', help="tirage rapide (sans parcours complet)")
+    parser.add_argument('--proxy-posters', action='store_true', help="récupère aussi le poster via /proxy-image")
+    parser.add_argument('--max-rps', type=float, default=1000, help="débit maximal du scraper vers le serveur")
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    stand_in = start_stand_in(config_from_arguments(args))
+    app_server = None
+    target = args.target
+    if not target:
+        app_server, target = serve_app(stand_in.url, args.max_rps)
+    try:
+        report = run_load(
+            target, spins=args.spins, concurrency=args.concurrency, users=args.users,
+            list_type=args.list_type, fast=args.fast, proxy_posters=args.proxy_posters
+        )
+        print(report.format())
+        counts = stand_in.counts
+        print(
+            f"Serveur de substitution : {counts['requests']} requêtes, "
+            f"{counts['throttled']} réponses 429, {counts['errors']} réponses 500"
+        )
+    finally:
+        if app_server:
+            app_server.shutdown()
+        stand_in.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+"""Serveur local se substituant à Letterboxd et à TMDB pour les tests de charge.
+
+Il sert des listes paginées synthétiques (watchlists, films vus, listes
+personnalisées), les pages des films, les réponses de recherche TMDB et les
+octets des posters. Latence, taux d'erreurs 5xx et taux de réponses 429 sont
+configurables. Le scraper y est redirigé via ``LETTERBOXD_BASE_URL``,
+``TMDB_BASE_URL`` et ``TMDB_IMAGE_BASE_URL`` (ou les paramètres du même nom).
+
+    python -m loadtest.stand_in --port 8001 --films 1000 --latency 0.05
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+LIST_PATH = re.compile(
+    r'^/(?P<username>[^/]+)/(?:(?P<list_type>watchlist|films)|list/(?P<slug>[^/]+))/'
+    r'(?:by/(?:added|date)/)?(?:page/(?P<page>\d+)/)?$'
+)
+FILM_PATH = re.compile(r'^/film/film-(?P<number>\d+)/$')
+POSTER_PATH = re.compile(r'^/t/p/w\d+/poster-(?P<number>\d+)\.jpg$')
+
+DIRECTORS = ['Agnès Varda', 'Bong Joon Ho', 'Chantal Akerman', 'Wong Kar-wai', 'Abbas Kiarostami']
+
+
+class StandInConfig:
+    """Paramètres du serveur de substitution.
+
+    ``latency`` est la durée moyenne (en secondes) ajoutée à chaque réponse,
+    ``jitter`` sa variation maximale ; ``error_rate`` et ``throttle_rate`` sont
+    les probabilités de répondre 500 ou 429 (avec ``Retry-After``).
+    """
+
+    def __init__(self, films_per_list=500, page_size=28, latency=0.0, jitter=0.0,
+                 error_rate=0.0, throttle_rate=0.0, retry_after=1, poster_bytes=32 * 1024,
+                 seed=None):
+        self.films_per_list = films_per_list
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.poster_bytes = poster_bytes
+        self.random = random.Random(seed)
+
+
+def film_title(number):
+    return f"Film {number}"
+
+
+def film_year(number):
+    return str(1950 + number % 70)
+
+
+def _list_films(username, config):
+    """Films d'une liste, du plus récemment ajouté au plus ancien.
+
+    Chaque utilisateur a sa propre sélection, stable d'un appel à l'autre.
+    """
+    offset = int(hashlib.sha256(username.encode('utf-8')).hexdigest()[:6], 16) % 10000
+    return [offset + index for index in range(config.films_per_list)]
+
+
+def render_list_page(base_path, films, page, page_size):
+    last_page = max(1, -(-len(films) // page_size))
+    posters = ''.join(
+        f'<li class="poster-container"><div class="film-poster" data-film-slug="film-{number}"'
+        f' data-film-release-year="{film_year(number)}" data-target-link="/film/film-{number}/">'
+        f'<img src="https://a.ltrbxd.com/resized/film-poster/{number}.jpg" alt="{film_title(number)}">'
+        f'</div></li>'
+        for number in films[(page - 1) * page_size:page * page_size]
+    )
+    pagination = ''
+    if page < last_page:
+        pagination += f'<a class="next" href="{base_path}page/{page + 1}/">Older</a>'
+    pages = ''.join(
+        f'<li class="paginate-page paginate-current"><span>{number}</span></li>' if number == page
+        else f'<li class="paginate-page"><a href="{base_path}page/{number}/">{number}</a></li>'
+        for number in sorted({1, page, last_page})
+    )
+    return (
+        '<!DOCTYPE html><html><head><meta charset="UTF-8"><title>Liste</title></head><body>'
+        f'<ul class="poster-list -p125 -grid films-grid">{posters}</ul>'
+        f'<div class="pagination">{pagination}<div class="paginate-pages"><ul>{pages}</ul></div></div>'
+        '</body></html>'
+    )
+
+
+def render_film_page(number):
+    return (
+        '<!DOCTYPE html><html><head><meta charset="UTF-8">'
+        f'<title>{film_title(number)} • Letterboxd</title>'
+        f'<meta name="twitter:data2" content="{3 + number % 20 / 10:.2f} out of 5">'
+        '</head><body>'
+        f'<h1 class="headline-1 filmtitle"><span class="name">{film_title(number)}</span></h1>'
+        f'<p><a href="/films/year/{film_year(number)}/">{film_year(number)}</a> Directed by '
+        f'<a class="contributor" href="/director/d-{number % len(DIRECTORS)}/">'
+        f'{DIRECTORS[number % len(DIRECTORS)]}</a></p>'
+        f'<p class="text-link text-footer">{80 + number % 100}&nbsp;mins</p>'
+        '</body></html>'
+    )
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server_version = 'LetterboxdStandIn/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def do_GET(self):
+        self.server.count('requests')
+        config = self.config
+        delay = config.latency + config.random.uniform(-config.jitter, config.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        roll = config.random.random()
+        if roll < config.throttle_rate:
+            self.server.count('throttled')
+            return self._send(429, b'Too Many Requests', 'text/plain',
+                              {'Retry-After': str(config.retry_after)})
+        if roll < config.throttle_rate + config.error_rate:
+            self.server.count('errors')
+            return self._send(500, b'Internal Server Error', 'text/plain')
+
+        parsed = urlparse(self.path)
+        if parsed.path == '/3/search/movie':
+            return self._search(parse_qs(parsed.query))
+        match = POSTER_PATH.match(parsed.path)
+        if match:
+            return self._poster(int(match.group('number')))
+        match = FILM_PATH.match(parsed.path)
+        if match:
+            return self._html(render_film_page(int(match.group('number'))))
+        match = LIST_PATH.match(parsed.path)
+        if match:
+            return self._list(parsed.path, match)
+        self._send(404, b'<html><body>Page not found</body></html>', 'text/html; charset=utf-8')
+
+    def _list(self, path, match):
+        page = int(match.group('page') or 1)
+        base_path = path[:path.index('page/')] if match.group('page') else path
+        films = _list_films(match.group('username'), self.config)
+        self._html(render_list_page(base_path, films, page, self.config.page_size))
+
+    def _search(self, params):
+        title = params.get('query', [''])[0]
+        number = title.rsplit(' ', 1)[-1]
+        results = [{'title': title, 'poster_path': f'/poster-{number}.jpg'}] if number.isdigit() else []
+        self._send(200, json.dumps({'results': results}).encode('utf-8'), 'application/json')
+
+    def _poster(self, number):
+        body = hashlib.sha256(str(number).encode('ascii')).digest()
+        body = (body * (self.config.poster_bytes // len(body) + 1))[:self.config.poster_bytes]
+        self._send(200, body, 'image/jpeg')
+
+    def _html(self, content):
+        self._send(200, content.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, StandInHandler)
+        self.config = config
+        self.counts = {'requests': 0, 'throttled': 0, 'errors': 0}
+        self._counts_lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, name):
+        with self._counts_lock:
+            self.counts[name] += 1
+
+
+def start_stand_in(config=None, host='127.0.0.1', port=0):
+    """Démarre le serveur dans un thread d'arrière-plan et le retourne.
+
+    ``port=0`` choisit un port libre ; l'adresse effective est ``server.url``.
+    Arrêter avec ``server.shutdown()``.
+    """
+    server = StandInServer((host, port), config or StandInConfig())
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={'poll_interval': 0.05},
+        name='letterboxd-stand-in', daemon=True
+    )
+    thread.start()
+    return server
+
+
+def add_config_arguments(parser):
+    parser.add_argument('--films', type=int, default=500, help="films par liste")
+    parser.add_argument('--page-size', type=int, default=28)
+    parser.add_argument('--latency', type=float, default=0.0, help="latence moyenne (s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="variation de la latence (s)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="proportion de réponses 500")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="proportion de réponses 429")
+    parser.add_argument('--retry-after', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=None)
+
+
+def config_from_arguments(args):
+    return StandInConfig(
+        films_per_list=args.films, page_size=args.page_size, latency=args.latency,
+        jitter=args.jitter, error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after, seed=args.seed
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+    server = StandInServer((args.host, args.port), config_from_arguments(args))
+    print(f"Serveur de substitution sur {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
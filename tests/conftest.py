@@ -0,0 +1,68 @@
+import json
+import requests
+
+
+class FakeResponse:
+    """Réponse de ``requests`` au corps préenregistré (texte ou octets).
+
+    ``iter_content`` restitue le corps dans son type d'origine. Un en-tête
+    passé à None est retiré des en-têtes par défaut (``Content-Type`` HTML et
+    ``Content-Length``).
+    """
+
+    def __init__(self, body='', status_code=200, headers=None, url=None):
+        self.body = body
+        self.status_code = status_code
+        self.url = url
+        self.encoding = 'utf-8'
+        self.content = body.encode(self.encoding) if isinstance(body, str) else body
+        self.text = body if isinstance(body, str) else body.decode(self.encoding, errors='replace')
+        headers = dict({'Content-Type': 'text/html; charset=utf-8',
+                        'Content-Length': str(len(self.content))}, **(headers or {}))
+        self.headers = {name: value for name, value in headers.items() if value is not None}
+        self.closed = False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        for start in range(0, len(self.body), chunk_size):
+            yield self.body[start:start + chunk_size]
+
+    def json(self):
+        return json.loads(self.text)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSession:
+    """Session de ``requests`` sans accès réseau.
+
+    ``pages`` associe une URL à un corps ou à une ``FakeResponse`` ; les
+    autres URL répondent 404. ``responses`` est une suite de réponses (ou
+    d'exceptions à lever) servies dans l'ordre, quelle que soit l'URL. Les
+    sous-classes peuvent redéfinir ``respond``. ``requested`` liste les URL
+    demandées.
+    """
+
+    def __init__(self, pages=None, responses=()):
+        self.pages = pages if pages is not None else {}
+        self.responses = list(responses)
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        response = self.respond(url)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def respond(self, url):
+        if self.responses:
+            return self.responses.pop(0)
+        if url not in self.pages:
+            return FakeResponse("<html><body>Page not found</body></html>", 404, url=url)
+        page = self.pages[url]
+        return page if isinstance(page, FakeResponse) else FakeResponse(page, url=url)
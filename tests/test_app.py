@@ -0,0 +1,287 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import pytest
+import app as app_module
+import api.index as index_module
+import api.routes as routes_module
+from api.async_scraper import IndexingInProgressError, NoMatchingFilmError
+from api.image_cache import DiskImageCache
+from api.letterboxd_scraper import ListUnreachableError
+from api.throttle import HostPausedError
+from conftest import FakeResponse, FakeSession
+
+POSTER = bytes(range(256)) * 40
+POSTER_URL = "https://a.ltrbxd.com/resized/film-poster/1/poster.jpg"
+
+
+TMDB_POSTER_URL = "https://image.tmdb.org/t/p/w500/poster.jpg"
+
+
+def poster_response(headers=None):
+    return FakeResponse(POSTER, headers=dict({'Content-Type': 'image/jpeg'}, **(headers or {})))
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    upstream = FakeSession({POSTER_URL: poster_response(), TMDB_POSTER_URL: poster_response()})
+    monkeypatch.setattr(app_module, 'image_cache', DiskImageCache(str(tmp_path / "images")))
+    monkeypatch.setattr(app_module, 'get_shared_session', lambda: upstream)
+    app_module.app.config['TESTING'] = True
+    with app_module.app.test_client() as test_client:
+        test_client.upstream = upstream
+        yield test_client
+
+
+def test_proxy_streams_then_serves_from_disk_cache(client):
+    first = client.get('/proxy-image', query_string={'url': POSTER_URL})
+    assert first.status_code == 200 and first.data == POSTER
+    assert 'immutable' in first.headers['Cache-Control']
+
+    second = client.get('/proxy-image', query_string={'url': POSTER_URL})
+    assert second.data == POSTER
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert len(client.upstream.requested) == 1
+
+
+def test_proxy_answers_if_none_match_with_304(client):
+    etag = DiskImageCache.key(POSTER_URL)
+    response = client.get('/proxy-image', query_string={'url': POSTER_URL},
+                          headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 304
+    assert client.upstream.requested == []
+
+
+def test_proxy_serves_ranges_from_cache(client):
+    assert client.get('/proxy-image', query_string={'url': POSTER_URL}).data == POSTER
+    response = client.get('/proxy-image', query_string={'url': POSTER_URL},
+                          headers={'Range': 'bytes=10-19'})
+    assert response.status_code == 206
+    assert response.data == POSTER[10:20]
+    assert len(client.upstream.requested) == 1
+
+
+def test_proxy_rejects_non_http_urls(client):
+    response = client.get('/proxy-image', query_string={'url': 'file:///etc/passwd'})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("url", [
+    "https://example.com/poster.jpg",
+    "http://169.254.169.254/latest/meta-data/",
+    "https://a.ltrbxd.com.example.com/poster.jpg",
+])
+def test_proxy_only_relays_poster_hosts(client, url):
+    response = client.get('/proxy-image', query_string={'url': url})
+    assert response.status_code == 400
+    assert client.upstream.requested == []
+
+
+def test_proxy_relays_tmdb_posters(client, monkeypatch):
+    monkeypatch.delenv('TMDB_IMAGE_BASE_URL', raising=False)
+    response = client.get('/proxy-image', query_string={'url': TMDB_POSTER_URL})
+    assert response.status_code == 200 and response.data == POSTER
+
+
+@pytest.mark.parametrize("headers", [
+    {'Content-Type': 'text/html'},
+    {'Content-Length': str(100 * 1024 * 1024)},
+])
+def test_proxy_refuses_non_images_and_oversized_responses(client, headers):
+    client.upstream.pages[POSTER_URL] = poster_response(headers)
+    response = client.get('/proxy-image', query_string={'url': POSTER_URL})
+    assert response.status_code == 502
+    assert app_module.image_cache.lookup(POSTER_URL) is None
+
+
+def test_proxy_caps_bodies_of_unknown_length(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'MAX_IMAGE_BYTES', 1000)
+    monkeypatch.setattr(app_module, 'PROXY_CHUNK_SIZE', 256)
+    client.upstream.pages[POSTER_URL] = poster_response({'Content-Length': None})
+    response = client.get('/proxy-image', query_string={'url': POSTER_URL})
+    assert len(response.data) <= 1000 < len(POSTER)
+    assert app_module.image_cache.lookup(POSTER_URL) is None
+
+
+def test_metrics_exposes_proxy_stages(client):
+    client.get('/proxy-image', query_string={'url': POSTER_URL}).data
+    client.get('/proxy-image', query_string={'url': POSTER_URL})
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    body = response.get_data(as_text=True)
+    assert 'letterboxd_stage_duration_seconds_count{stage="image_proxy"}' in body
+    assert 'letterboxd_cache_requests_total{cache="image",result="hit"}' in body
+
+
+@pytest.fixture(params=[app_module, index_module], ids=['app', 'vercel'])
+def spin_client(request, monkeypatch):
+    """Client de chacun des points d'entrée, qui partagent les routes de tirage (api/routes.py)."""
+    application = request.param.app
+    monkeypatch.setitem(application.config, 'TESTING', True)
+    monkeypatch.setitem(application.config, 'WTF_CSRF_ENABLED', False)
+    with application.test_client() as test_client:
+        yield test_client
+
+
+def test_random_movie_route_awaits_async_spin(spin_client, monkeypatch):
+    calls = []
+
+    async def fake_random_film(url, fast=False, filters=None, session=None):
+        calls.append((url, fast))
+        return {'title': 'Parasite', 'url': 'https://letterboxd.com/film/parasite-2019/'}
+
+    monkeypatch.setattr(routes_module, 'get_random_film', fake_random_film)
+    response = spin_client.post('/api/random-movie', json={'type': 'watchlist', 'username': 'johndoe', 'fast': True})
+
+    assert response.status_code == 200
+    assert response.get_json()['title'] == 'Parasite'
+    assert calls == [('https://letterboxd.com/johndoe/watchlist/', True)]
+
+
+def test_random_movie_route_reports_unreachable_list(spin_client, monkeypatch):
+    async def fake_random_film(url, fast=False, filters=None, session=None):
+        raise ListUnreachableError("Erreur de connexion: 404 Client Error")
+
+    monkeypatch.setattr(routes_module, 'get_random_film', fake_random_film)
+    response = spin_client.post('/api/random-movie', json={'type': 'watchlist', 'username': 'inconnu'})
+
+    assert response.status_code == 404
+    assert 'Impossible d\'accéder à la liste' in response.get_json()['error']
+
+
+def test_random_movie_route_asks_to_retry_while_indexing(spin_client, monkeypatch):
+    async def fake_random_film(url, fast=False, filters=None, session=None):
+        raise IndexingInProgressError(120)
+
+    monkeypatch.setattr(routes_module, 'get_random_film', fake_random_film)
+    response = spin_client.post('/api/random-movie', json={'type': 'watchlist', 'username': 'alice', 'rating_min': 4.9})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+    assert response.get_json()['retry_after'] == 5
+    assert 'réessayez' in response.get_json()['error']
+
+
+def test_random_movie_route_fails_fast_while_the_host_is_paused(spin_client, monkeypatch):
+    async def fake_random_film(url, fast=False, filters=None, session=None):
+        raise HostPausedError('letterboxd.com', 3600)
+
+    monkeypatch.setattr(routes_module, 'get_random_film', fake_random_film)
+    response = spin_client.post('/api/random-movie', json={'type': 'watchlist', 'username': 'alice'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '3600'
+
+
+def test_stream_route_sends_progress_as_ndjson(spin_client, monkeypatch):
+    calls = []
+
+    def fake_stream(url, fast=False, filters=None, session=None):
+        calls.append((url, fast))
+        yield {'event': 'page', 'page': 1, 'pages': 2, 'films': 28}
+        yield {'event': 'candidate', 'title': 'Parasite', 'url': 'https://letterboxd.com/film/parasite-2019/'}
+        yield {'event': 'film', 'title': 'Parasite', 'rating': '4.57 sur 5'}
+
+    monkeypatch.setattr(routes_module, 'stream_random_film', fake_stream)
+
+    response = spin_client.post('/api/random-movie/stream', json={'type': 'playlist', 'username': 'johndoe'})
+    assert response.status_code == 400
+    response = spin_client.post('/api/random-movie/stream', json={'type': 'films', 'username': 'johndoe'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [event['event'] for event in events] == ['page', 'candidate', 'film']
+    assert events[-1]['rating'] == '4.57 sur 5'
+    assert calls == [('https://letterboxd.com/johndoe/films/', False)]
+
+
+def test_random_movie_route_parses_filters(spin_client, monkeypatch):
+    received = []
+
+    async def fake_random_film(url, fast=False, filters=None, session=None):
+        received.append(filters)
+        return {'title': 'Parasite', 'url': 'https://letterboxd.com/film/parasite-2019/'}
+
+    monkeypatch.setattr(routes_module, 'get_random_film', fake_random_film)
+
+    response = spin_client.post('/api/random-movie', json={'type': 'watchlist', 'username': 'johndoe', 'rating_min': 'haut'})
+    assert response.status_code == 400
+    assert 'rating_min' in response.get_json()['error']
+    response = spin_client.post('/api/random-movie', json={'type': 'watchlist', 'username': 'johndoe',
+                                                      'year_min': '1990', 'rating_min': 3.5})
+    assert response.status_code == 200
+    filters = received[-1]
+    assert filters.year == (1990, None) and filters.rating == (3.5, None)
+    spin_client.post('/api/random-movie', json={'type': 'watchlist', 'username': 'johndoe'})
+    assert received[-1] is None
+
+
+def test_group_random_movie_route_validates_and_awaits_group_spin(spin_client, monkeypatch):
+    calls = []
+
+    async def fake_group_film(usernames, mode='intersection', min_members=None, list_type='watchlist'):
+        calls.append((usernames, mode, min_members, list_type))
+        return {'title': 'Parasite', 'members': usernames[:2], 'group_size': len(usernames)}
+
+    monkeypatch.setattr(routes_module, 'get_random_group_film', fake_group_film)
+
+    response = spin_client.post('/api/group-random-movie', json={'usernames': 'alice'})
+    assert response.status_code == 400
+    response = spin_client.post('/api/group-random-movie', json={
+        'usernames': ['alice', 'bob'], 'mode': 'at_least', 'min_members': 3
+    })
+    assert response.status_code == 400
+    assert calls == []
+
+    response = spin_client.post('/api/group-random-movie', json={
+        'usernames': ' alice, bob ,alice,carol', 'mode': 'at_least', 'min_members': '2', 'type': 'films'
+    })
+    assert response.status_code == 200
+    assert response.get_json()['members'] == ['alice', 'bob']
+    assert calls == [(['alice', 'bob', 'carol'], 'at_least', 2, 'films')]
+
+
+@pytest.mark.parametrize("payload", [
+    ['alice', 'bob'],
+    {'usernames': ['alice', 42]},
+    {'usernames': [['alice'], 'bob']},
+    {'usernames': {'alice': 1, 'bob': 2}},
+])
+def test_group_random_movie_route_rejects_malformed_usernames(spin_client, monkeypatch, payload):
+    async def fake_group_film(*args):
+        raise AssertionError("tirage inattendu")
+
+    monkeypatch.setattr(routes_module, 'get_random_group_film', fake_group_film)
+    response = spin_client.post('/api/group-random-movie', json=payload)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("error, status", [
+    (ListUnreachableError("Impossible d'accéder à la liste de bob."), 404),
+    (NoMatchingFilmError("Aucun film ne correspond aux listes du groupe."), 404),
+    (ValueError("Mode de tirage de groupe invalide"), 400),
+    (RuntimeError("base verrouillée"), 500),
+])
+def test_group_random_movie_route_maps_errors_to_statuses(spin_client, monkeypatch, error, status):
+    async def fake_group_film(usernames, mode='intersection', min_members=None, list_type='watchlist'):
+        raise error
+
+    monkeypatch.setattr(routes_module, 'get_random_group_film', fake_group_film)
+    response = spin_client.post('/api/group-random-movie', json={'usernames': ['alice', 'bob']})
+    assert response.status_code == status
+    assert str(error) in response.get_json()['error']
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskImageCache(str(tmp_path), max_bytes=250)
+    for index in range(3):
+        writer = cache.writer(f"https://img/{index}", "image/jpeg")
+        writer.write(b"x" * 100)
+        writer.commit()
+        os.utime(cache._paths(cache.key(f"https://img/{index}"))[0], (index, index))
+    # Nouvel ajout : l'image la moins récemment servie est supprimée
+    cache._evict()
+    assert cache.lookup("https://img/0") is None
+    assert cache.lookup("https://img/2") is not None
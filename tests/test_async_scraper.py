@@ -0,0 +1,466 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio
+import threading
+import time
+import pytest
+import api.async_scraper as async_scraper_module
+from api.async_scraper import AsyncLetterboxdScraper, IndexingInProgressError
+from api.cache import TieredCache
+from api.deck import Deck, DeckStore
+from api.film_index import FilmIndex
+from api.list_store import ListStore
+from api.metadata import FilmFilter, MetadataIndex
+from api.snapshot import Snapshot, write_snapshot
+from api.transport import MAX_RETRIES, create_async_session
+from loadtest.stand_in import StandInConfig, start_stand_in
+
+
+@pytest.fixture
+def stand_in_factory():
+    servers = []
+
+    def start(**options):
+        options = dict({'films_per_list': 60, 'seed': 1}, **options)
+        server = start_stand_in(StandInConfig(**options))
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def run_with_scraper(url, spin, **options):
+    async def main():
+        scraper = AsyncLetterboxdScraper(
+            max_requests_per_second=1000,
+            poster_cache=TieredCache('async_posters', persistent=False),
+            details_cache=TieredCache('async_details', persistent=False),
+            base_url=url,
+            tmdb_base_url=url,
+            tmdb_image_base_url=url,
+            **dict({'list_store': None}, **options)
+        )
+        try:
+            return await spin(scraper)
+        finally:
+            await scraper.close()
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("stream_pages", [True, False])
+def test_async_get_films_returns_full_result(stand_in_factory, stream_pages):
+    server = stand_in_factory()
+    film = run_with_scraper(
+        server.url,
+        lambda scraper: scraper.get_films("https://letterboxd.com/alice/watchlist/"),
+        stream_pages=stream_pages,
+    )
+    assert film['title'].startswith("Film ")
+    assert film['url'].startswith(server.url + "/film/")
+    assert film['poster'].startswith(server.url + "/t/p/w500/poster-")
+    assert film['director'] != "Non disponible"
+    # 60 films à 28 par page, puis la page du film et la recherche TMDB
+    assert server.counts['requests'] == 5
+
+
+def test_async_get_films_reports_progress(stand_in_factory):
+    server = stand_in_factory()
+    events = []
+    film = run_with_scraper(
+        server.url,
+        lambda scraper: scraper.get_films("https://letterboxd.com/alice/watchlist/", progress=events.append),
+    )
+    pages = [event for event in events if event['event'] == 'page']
+    assert sorted((event['page'], event['pages']) for event in pages) == [(1, 3), (2, 3), (3, 3)]
+    assert pages[-1]['films'] == 60
+    assert [event['event'] for event in events[len(pages):]] == ['films', 'candidate']
+    assert events[len(pages)]['count'] == 60
+    candidate = events[-1]
+    # Le film annoncé est bien celui dont les détails sont renvoyés ensuite
+    assert candidate['url'] == film['url']
+    assert candidate['title'] == film['title']
+
+
+def test_async_fast_pick_fetches_a_single_extra_page(stand_in_factory):
+    # 10 pages pleines : aucun tirage rejeté
+    server = stand_in_factory(films_per_list=280)
+    film = run_with_scraper(
+        server.url,
+        lambda scraper: scraper.get_films("https://letterboxd.com/alice/watchlist/", fast=True),
+    )
+    assert film['title'].startswith("Film ")
+    assert server.counts['requests'] <= 4
+
+
+def test_async_spins_run_concurrently(stand_in_factory):
+    server = stand_in_factory(latency=0.05)
+
+    async def spins(scraper):
+        start = time.perf_counter()
+        films = await asyncio.gather(*(
+            scraper.get_films(f"https://letterboxd.com/user{number}/watchlist/") for number in range(20)
+        ))
+        return films, time.perf_counter() - start
+
+    films, elapsed = run_with_scraper(server.url, spins)
+    assert len(films) == 20
+    # Séquentiellement : au moins 20 tirages x 3 allers-retours x 50 ms
+    assert elapsed < 1.5
+
+
+def test_async_retries_throttled_responses(stand_in_factory, monkeypatch):
+    # Repli HTML sur l'URL d'origine, injoignable ici : ses relances n'attendent pas
+    monkeypatch.setattr(async_scraper_module, 'RETRY_BACKOFF', 0)
+    server = stand_in_factory(throttle_rate=1, retry_after=0)
+    with pytest.raises(Exception):
+        run_with_scraper(
+            server.url,
+            lambda scraper: scraper.get_films("https://letterboxd.com/alice/watchlist/"),
+        )
+    assert server.counts['throttled'] >= MAX_RETRIES + 1
+
+
+class FlakySession:
+    """Session aiohttp dont les premières requêtes échouent avant d'atteindre le serveur."""
+
+    def __init__(self, failures):
+        self.session = create_async_session()
+        self.failures = failures
+
+    async def get(self, url, **kwargs):
+        import aiohttp
+
+        if self.failures:
+            self.failures -= 1
+            raise aiohttp.ClientConnectionError("connexion réinitialisée")
+        return await self.session.get(url, **kwargs)
+
+    async def close(self):
+        await self.session.close()
+
+
+def test_async_retries_connection_errors(stand_in_factory, monkeypatch):
+    monkeypatch.setattr(async_scraper_module, 'RETRY_BACKOFF', 0)
+    server = stand_in_factory()
+
+    async def spin(scraper):
+        scraper.http_session = FlakySession(failures=MAX_RETRIES)
+        return await scraper.get_films("https://letterboxd.com/alice/watchlist/")
+
+    film = run_with_scraper(server.url, spin)
+    assert film['title'].startswith("Film ")
+
+
+def test_concurrent_identical_spins_are_coalesced(stand_in_factory):
+    # Un seul film : tous les tirages portent sur la même liste et le même film
+    server = stand_in_factory(films_per_list=1, latency=0.02)
+
+    async def spins(scraper):
+        return await asyncio.gather(*(
+            scraper.get_films("https://letterboxd.com/alice/watchlist/") for _ in range(5)
+        ))
+
+    films = run_with_scraper(server.url, spins)
+    assert len({film['url'] for film in films}) == 1
+    # Une page de liste, une page de film et une recherche TMDB pour les 5 tirages
+    assert server.counts['requests'] == 3
+
+
+def test_async_sample_filters_inside_the_stream(stand_in_factory):
+    server = stand_in_factory(films_per_list=100)
+
+    async def sample(scraper):
+        recent = await scraper.sample(
+            "https://letterboxd.com/alice/films/", k=5, predicate=lambda film: film['year'] >= '2000'
+        )
+        everything = [film async for film in scraper.iter_films("https://letterboxd.com/alice/films/")]
+        return recent, everything
+
+    recent, everything = run_with_scraper(server.url, sample)
+    assert len(everything) == 100
+    assert len(recent) == 5
+    assert len({film['path'] for film in recent}) == 5
+    assert all(film['year'] >= '2000' and film in everything for film in recent)
+
+
+# Sélections de 60 films qui se chevauchent : 6160-6219, 6169-6228 et 6181-6240
+GROUP = ['user0', 'user77', 'user163']
+
+
+@pytest.mark.parametrize("mode, min_members, candidates, coverage", [
+    ('intersection', None, 39, {'3': 39}),
+    ('at_least', 2, 60, {'3': 39, '2': 21}),
+    ('union', None, 81, {'3': 39, '2': 21, '1': 21}),
+])
+def test_group_film_combines_member_lists(stand_in_factory, mode, min_members, candidates, coverage):
+    server = stand_in_factory()
+    film = run_with_scraper(
+        server.url, lambda scraper: scraper.get_group_film(GROUP, mode, min_members)
+    )
+    assert film['candidates'] == candidates
+    assert film['coverage'] == coverage
+    assert film['group_size'] == 3
+    assert len(film['members']) >= (min_members or (3 if mode == 'intersection' else 1))
+    assert set(film['members']) <= set(GROUP)
+    assert film['title'].startswith("Film ")
+
+
+def test_group_film_rejects_invalid_mode(stand_in_factory):
+    server = stand_in_factory()
+    with pytest.raises(ValueError):
+        run_with_scraper(server.url, lambda scraper: scraper.get_group_film(GROUP, 'at_least', 4))
+
+
+def test_filtered_spin_picks_a_matching_film_and_indexes_the_rest(stand_in_factory):
+    server = stand_in_factory()
+    events = []
+
+    async def spin(scraper):
+        filters = FilmFilter(rating_min=4)
+        film = await scraper.get_films(
+            "https://letterboxd.com/alice/watchlist/", progress=events.append, filters=filters
+        )
+        await asyncio.gather(*scraper._tasks)
+        films = await scraper._get_list_films('alice', 'watchlist', None)
+        return film, scraper.core.metadata_index.get_many(entry['path'] for entry in films)
+
+    film, indexed = run_with_scraper(server.url, spin)
+    # Note du stand-in : 3 + (numéro % 20) / 10
+    number = int(film['url'].rstrip('/').rsplit('-', 1)[1])
+    assert number % 20 >= 10
+    matches = [event for event in events if event['event'] == 'matches']
+    assert matches and matches[0]['count'] >= 1
+    # Un lot indexé pour le tirage, puis un lot en arrière-plan
+    assert len(indexed) == AsyncLetterboxdScraper.FILTER_BATCH_SIZE + AsyncLetterboxdScraper.INDEX_BATCH_SIZE
+    assert all(metadata['runtime'] and metadata['director'] for metadata in indexed.values())
+
+
+def test_sparse_filtered_spin_keeps_indexing_until_a_match(stand_in_factory):
+    # 300 films dont 15 seulement notés 4,9 (numéro % 20 == 19)
+    server = stand_in_factory(films_per_list=300)
+
+    async def spin(scraper):
+        # Budget suffisant pour épuiser la liste : le résultat ne dépend pas du hasard
+        scraper.FILTER_MAX_PAGES = 300
+        return await scraper.get_films(
+            "https://letterboxd.com/alice/watchlist/", filters=FilmFilter(rating_min=4.9)
+        )
+
+    film = run_with_scraper(server.url, spin)
+    assert int(film['url'].rstrip('/').rsplit('-', 1)[1]) % 20 == 19
+
+
+@pytest.mark.parametrize("max_pages, error, message", [
+    (16, IndexingInProgressError, "24 films restants"),
+    (128, Exception, "Aucun film de cette liste ne correspond aux filtres."),
+])
+def test_filtered_spin_without_match_distinguishes_pending_index(stand_in_factory, max_pages, error, message):
+    # Aucune note n'atteint 5 : sans correspondance, seule la liste épuisée permet de conclure
+    server = stand_in_factory(films_per_list=40)
+
+    async def spin(scraper):
+        scraper.FILTER_MAX_PAGES = max_pages
+        return await scraper.get_films(
+            "https://letterboxd.com/alice/watchlist/", filters=FilmFilter(rating_min=5)
+        )
+
+    with pytest.raises(error) as raised:
+        run_with_scraper(server.url, spin)
+    assert message in str(raised.value)
+    assert isinstance(raised.value, IndexingInProgressError) == (error is IndexingInProgressError)
+
+
+def test_session_deck_deals_each_film_once_without_recrawling(stand_in_factory, tmp_path):
+    server = stand_in_factory(films_per_list=5)
+    store = ListStore(str(tmp_path / "store.sqlite3"))
+
+    async def spins(scraper):
+        films = [await scraper.get_films("https://letterboxd.com/alice/watchlist/", session='s1')
+                 for _ in range(5)]
+        requests_before_reshuffle = server.counts['requests']
+        films.append(await scraper.get_films("https://letterboxd.com/alice/watchlist/", session='s1'))
+        return films, requests_before_reshuffle
+
+    films, requests = run_with_scraper(server.url, spins, list_store=store)
+    assert len({film['url'] for film in films[:5]}) == 5
+    # Une page de liste, puis une page de film et une recherche TMDB par tirage
+    assert requests == 1 + 5 * 2
+    assert films[5]['url'] != films[4]['url']
+
+
+class CountingDeckStore(DeckStore):
+    """Stockage de paquets qui compte les attributions d'identifiants."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.id_lookups = 0
+
+    def ids_for(self, paths, chunk_size=500):
+        self.id_lookups += 1
+        return super().ids_for(paths, chunk_size)
+
+
+def test_session_deck_is_reconciled_only_when_the_list_changes(stand_in_factory, tmp_path):
+    server = stand_in_factory(films_per_list=5)
+    store = ListStore(str(tmp_path / "store.sqlite3"))
+    decks = CountingDeckStore(store.path)
+
+    async def spins(scraper):
+        # Copie toujours à resynchroniser : le paquet stocké ne suffit jamais
+        return [await scraper.get_films("https://letterboxd.com/alice/watchlist/", session='s1')
+                for _ in range(5)]
+
+    films = run_with_scraper(server.url, spins, list_store=store, deck_store=decks, refresh_interval=0)
+    assert len({film['url'] for film in films}) == 5
+    # Synchronisations incrémentales sans nouveau film : seul le premier tirage crée le paquet
+    assert decks.id_lookups == 1
+
+
+
+def test_stale_session_deck_is_dealt_again(stand_in_factory, tmp_path):
+    server = stand_in_factory(films_per_list=5)
+    store = ListStore(str(tmp_path / "store.sqlite3"))
+    decks = DeckStore(store.path)
+
+    async def spins(scraper):
+        url = "https://letterboxd.com/alice/watchlist/"
+        first = await scraper.get_films(url, session='s1')
+        # Paquet à la version courante de la liste, mais fait de films qu'elle ne contient pas
+        ids = decks.ids_for(['/film/gone-a/', '/film/gone-b/'])
+        decks.save('s1', 'alice', 'watchlist', Deck(ids.values(), version=store.get_version('alice', 'watchlist')))
+        return first, await scraper.get_films(url, session='s1')
+
+    first, second = run_with_scraper(server.url, spins, list_store=store, deck_store=decks)
+    paths = {film['path'] for film in store.get_films('alice', 'watchlist')}
+    assert second['url'].replace(server.url, '') in paths
+    deck = decks.load('s1', 'alice', 'watchlist')
+    assert {decks.path_for(card) for card in deck.cards} == paths
+    assert deck.cursor == 1
+
+
+def test_concurrent_draws_share_the_session_deck(stand_in_factory):
+    server = stand_in_factory()
+    films = FilmIndex({'name': f'Film {n}', 'path': f'/film/film-{n}/', 'image': ''} for n in range(24))
+
+    async def draws(scraper):
+        context, _ = scraper.core._request_context("https://letterboxd.com/alice/watchlist/")
+        return await asyncio.gather(*(
+            scraper._offload(scraper._deal_from_deck, 's1', context, films) for _ in range(len(films))
+        ))
+
+    dealt = run_with_scraper(server.url, draws, deck_store=DeckStore(':memory:'))
+    # Chaque tirage enregistre sa carte avant le suivant : aucun film ne sort deux fois
+    assert len({film['path'] for film, _ in dealt}) == len(films)
+
+def test_cold_instance_serves_known_lists_from_a_snapshot(stand_in_factory, tmp_path):
+    server = stand_in_factory()
+    warm_store = ListStore(str(tmp_path / "warm.sqlite3"))
+    run_with_scraper(
+        server.url,
+        lambda scraper: scraper.get_films("https://letterboxd.com/alice/watchlist/"),
+        list_store=warm_store,
+    )
+    write_snapshot(str(tmp_path / "lists.lbxs"), warm_store, MetadataIndex(warm_store.path))
+
+    cold_store = ListStore(str(tmp_path / "cold.sqlite3"))
+    requests_before = server.counts['requests']
+    film = run_with_scraper(
+        server.url,
+        lambda scraper: scraper.get_films("https://letterboxd.com/alice/watchlist/"),
+        list_store=cold_store,
+        snapshot=Snapshot(str(tmp_path / "lists.lbxs")),
+    )
+    assert film['title'].startswith("Film ")
+    assert len(cold_store.get_films('alice', 'watchlist')) == 60
+    # Export récent : ni parcours ni synchronisation, seulement la page du film et TMDB
+    assert server.counts['requests'] - requests_before == 2
+
+
+class ThreadRecordingStore(ListStore):
+    """Stockage qui note le thread de chaque lecture ou écriture."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.threads = set()
+
+    def get_state(self, username, list_key):
+        self.threads.add(threading.get_ident())
+        return super().get_state(username, list_key)
+
+    def replace(self, username, list_key, films, **kwargs):
+        self.threads.add(threading.get_ident())
+        return super().replace(username, list_key, films, **kwargs)
+
+    def get_films(self, username, list_key):
+        self.threads.add(threading.get_ident())
+        return super().get_films(username, list_key)
+
+
+def test_storage_calls_leave_the_event_loop(stand_in_factory, tmp_path):
+    server = stand_in_factory()
+    store = ThreadRecordingStore(str(tmp_path / "store.sqlite3"))
+
+    async def spins(scraper):
+        for session in (None, 's1', 's1'):
+            await scraper.get_films("https://letterboxd.com/alice/watchlist/", session=session)
+        return threading.get_ident()
+
+    loop_thread = run_with_scraper(server.url, spins, list_store=store)
+    assert store.threads and loop_thread not in store.threads
+
+
+
+def test_html_parsing_leaves_the_event_loop(stand_in_factory):
+    server = stand_in_factory()
+    threads = {}
+
+    async def spin(scraper):
+        core = scraper.core
+        for name in ('_parse_list_page', '_film_details_from_page'):
+            parse = getattr(core, name)
+
+            def recording(html_content, parse=parse, name=name):
+                threads.setdefault(name, set()).add(threading.get_ident())
+                return parse(html_content)
+            setattr(core, name, recording)
+        await scraper.get_films("https://letterboxd.com/alice/watchlist/")
+        return threading.get_ident()
+
+    loop_thread = run_with_scraper(server.url, spin, stream_pages=False)
+    assert set(threads) == {'_parse_list_page', '_film_details_from_page'}
+    assert all(loop_thread not in seen for seen in threads.values())
+
+def test_prefetch_resolves_missing_posters_with_bounded_concurrency(stand_in_factory):
+    server = stand_in_factory(latency=0.02)
+    films = [(f"Film {number}", "2000") for number in range(8)]
+
+    in_flight = [0, 0]  # en cours, maximum
+
+    async def prefetch(scraper):
+        await scraper._get_tmdb_poster("Film 0", "2000")
+        lookup = scraper._get_tmdb_poster
+
+        async def counted_lookup(title, year=None):
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+            try:
+                return await lookup(title, year)
+            finally:
+                in_flight[0] -= 1
+
+        scraper._get_tmdb_poster = counted_lookup
+        before = server.counts['requests']
+        searched = await scraper.prefetch_tmdb_posters(films + [("Film 1", "2000")], concurrency=3)
+        cached = [
+            scraper.core.poster_cache.get(scraper.core._tmdb_cache_key(title, year)) for title, year in films
+        ]
+        return searched, server.counts['requests'] - before, cached
+
+    searched, requests, cached = run_with_scraper(server.url, prefetch)
+    # Le film déjà en cache et le doublon ne sont pas recherchés
+    assert searched == requests == 7
+    assert in_flight[1] == 3
+    assert cached == [f"{server.url}/t/p/w500/poster-{number}.jpg" for number in range(8)]
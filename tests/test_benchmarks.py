@@ -0,0 +1,239 @@
+"""Micro-benchmarks de l'analyse des pages Letterboxd.
+
+Chaque mesure porte sur des pages enregistrées dans ``tests/fixtures`` et donne
+un débit (pages/s, films/s) ainsi que le pic mémoire alloué par Python. Les
+durées sont normalisées par celle d'une analyse de référence faite avec
+``html.parser`` de la bibliothèque standard, ce qui rend la comparaison avec
+``benchmark_baseline.json`` indépendante de la machine.
+
+Les mesures ne sont comparées à la référence qu'avec ``LETTERBOXD_BENCH=1``
+(elles dépendent de la charge de la machine) ; le test échoue alors si une
+mesure dépasse la référence de plus de ``LETTERBOXD_BENCH_TOLERANCE`` (2 par
+défaut) pour la durée ou de 1,5 pour la mémoire. Pour afficher les résultats
+ou régénérer la référence :
+
+    python tests/test_benchmarks.py [--update]
+"""
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import time
+import tracemalloc
+from html.parser import HTMLParser
+import pytest
+from api.cache import TieredCache
+from api.letterboxd_scraper import LetterboxdScraper
+from conftest import FakeResponse, FakeSession
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+BASELINE_PATH = os.path.join(FIXTURES, "benchmark_baseline.json")
+TIME_TOLERANCE = float(os.environ.get('LETTERBOXD_BENCH_TOLERANCE', 2.0))
+MEMORY_TOLERANCE = 1.5
+# Marges absolues, pour que les mesures très courtes ne dépendent pas du bruit
+COST_SLACK = 0.25
+MEMORY_SLACK_KIB = 64
+# Durée minimale de mesure de chaque cas (la meilleure itération est retenue)
+MIN_TIME = 0.1
+# Comparaisons à la référence, sur demande seulement
+benchmark = pytest.mark.skipif(
+    os.environ.get('LETTERBOXD_BENCH') != '1', reason="benchmarks activés par LETTERBOXD_BENCH=1"
+)
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+WATCHLIST_28 = fixture("watchlist_page.html")
+FILMS_72 = fixture("films_page_72.html")
+CUSTOM_LIST = fixture("custom_list_page.html")
+FILM_PAGE = fixture("film_page.html")
+PRIVATE_PROFILE = fixture("private_profile.html")
+SIGN_IN_PAGE = fixture("sign_in_page.html")
+
+LIST_BASE = "https://letterboxd.com/johndoe/watchlist/"
+PAGES_PER_CRAWL = 12
+# Dernière page de la liste : plus de lien vers la page suivante
+WATCHLIST_LAST_PAGE = WATCHLIST_28.replace(
+    '<a class="next" href="/johndoe/watchlist/page/2/">Older</a>', ''
+)
+TMDB_RESULTS = {'results': [{'poster_path': '/parasite.jpg'}]}
+
+
+class RecordedSession(FakeSession):
+    """Session servant les pages enregistrées, sans accès réseau.
+
+    Toutes les pages de la liste renvoient la page de 28 posters (la dernière,
+    la 12e, sans lien vers la suivante) ; les fiches de film renvoient la page
+    de Parasite.
+    """
+
+    def __init__(self, list_page=WATCHLIST_28, redirect=None):
+        super().__init__()
+        self.list_page = list_page
+        self.redirect = redirect
+
+    def respond(self, url):
+        if 'themoviedb.org' in url:
+            return FakeResponse(json.dumps(TMDB_RESULTS), url=url)
+        if '/film/' in url:
+            return FakeResponse(FILM_PAGE, url=url)
+        if url.endswith(f'/page/{PAGES_PER_CRAWL}/'):
+            return FakeResponse(WATCHLIST_LAST_PAGE, url=url)
+        return FakeResponse(self.list_page, url=self.redirect or url)
+
+
+def make_scraper(parser='lxml', stream_pages=True, session=None):
+    # Caches désactivés : chaque appel refait tout le travail mesuré
+    return LetterboxdScraper(
+        list_store=None,
+        parser=parser,
+        stream_pages=stream_pages,
+        session=session or RecordedSession(),
+        max_requests_per_second=1e9,
+        poster_cache=TieredCache('bench_posters', max_size=0, persistent=False),
+        details_cache=TieredCache('bench_details', max_size=0, persistent=False),
+    )
+
+
+def measure(func, min_time=MIN_TIME):
+    """Retourne ``(meilleure durée d'un appel, pic mémoire en Kio)``."""
+    func()  # échauffement (imports, compilation des XPath...)
+    best = float('inf')
+    elapsed = 0.0
+    runs = 0
+    while elapsed < min_time or runs < 3:
+        start = time.perf_counter()
+        func()
+        duration = time.perf_counter() - start
+        best = min(best, duration)
+        elapsed += duration
+        runs += 1
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 1024
+
+
+def calibrate():
+    """Durée d'une analyse de référence, indépendante du code du dépôt."""
+    return measure(lambda: HTMLParser().feed(WATCHLIST_28))[0]
+
+
+def expect_rejected(func):
+    def run():
+        try:
+            func()
+        except Exception:
+            return
+        raise AssertionError("La page aurait dû être refusée")
+    return run
+
+
+def crawl(stream_pages):
+    scraper = make_scraper(stream_pages=stream_pages)
+    return lambda: scraper._get_films_from_api('johndoe', 'watchlist')
+
+
+def extract(parser, html):
+    scraper = make_scraper(parser=parser)
+    return lambda: scraper._extract_films_from_html(html)
+
+
+def film_details():
+    scraper = make_scraper()
+    return lambda: scraper._get_film_details(
+        "https://letterboxd.com/film/parasite-2019/", "Parasite", "2019"
+    )
+
+
+def fetch_list_page(list_page, redirect=None):
+    scraper = make_scraper(session=RecordedSession(list_page, redirect))
+    return expect_rejected(lambda: scraper._fetch_list_page(LIST_BASE))
+
+
+# nom -> (fabrique de la fonction mesurée, pages par appel, films par appel)
+BENCHMARKS = {
+    **{
+        f"extract[{parser}-{name}]": (lambda p=parser, h=html: extract(p, h), 1, films)
+        for parser in ('lxml', 'stream', 'html5lib')
+        for name, html, films in (
+            ('watchlist28', WATCHLIST_28, 28),
+            ('films72', FILMS_72, 72),
+            ('custom_list', CUSTOM_LIST, 100),
+        )
+    },
+    "crawl[stream]": (lambda: crawl(True), PAGES_PER_CRAWL, 28 * PAGES_PER_CRAWL),
+    "crawl[full]": (lambda: crawl(False), PAGES_PER_CRAWL, 28 * PAGES_PER_CRAWL),
+    "film_details": (film_details, 1, 1),
+    "reject[private_profile]": (lambda: fetch_list_page(PRIVATE_PROFILE), 1, 0),
+    "reject[sign_in]": (
+        lambda: fetch_list_page(SIGN_IN_PAGE, "https://letterboxd.com/sign-in/"), 1, 0
+    ),
+}
+
+
+def run_benchmark(name, reference):
+    factory, pages, films = BENCHMARKS[name]
+    duration, peak_kib = measure(factory())
+    return {
+        'cost': duration / reference,
+        'peak_kib': peak_kib,
+        'pages_per_s': pages / duration,
+        'films_per_s': films / duration,
+    }
+
+
+def load_baseline():
+    with open(BASELINE_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def reference():
+    return calibrate()
+
+
+@benchmark
+@pytest.mark.parametrize("name", sorted(BENCHMARKS))
+def test_benchmark_does_not_regress(name, reference):
+    expected = load_baseline()[name]
+    result = run_benchmark(name, reference)
+    summary = (
+        f"{name}: {result['pages_per_s']:.0f} pages/s, {result['films_per_s']:.0f} films/s, "
+        f"coût {result['cost']:.2f} (référence {expected['cost']:.2f}), "
+        f"pic {result['peak_kib']:.0f} Kio (référence {expected['peak_kib']:.0f} Kio)"
+    )
+    assert result['cost'] <= expected['cost'] * TIME_TOLERANCE + COST_SLACK, summary
+    assert result['peak_kib'] <= expected['peak_kib'] * MEMORY_TOLERANCE + MEMORY_SLACK_KIB, summary
+
+
+def test_recorded_pages_are_parsed_as_expected():
+    assert len(make_scraper()._extract_films_from_html(FILMS_72)) == 72
+    assert len(make_scraper()._extract_films_from_html(CUSTOM_LIST)) == 100
+    assert len(crawl(True)()['films']) == 28
+    assert film_details()()['poster'] == "https://image.tmdb.org/t/p/w500/parasite.jpg"
+
+
+if __name__ == '__main__':
+    unit = calibrate()
+    results = {name: run_benchmark(name, unit) for name in sorted(BENCHMARKS)}
+    for name, result in results.items():
+        print(
+            f"{name:32} {result['pages_per_s']:10.1f} pages/s {result['films_per_s']:10.1f} films/s"
+            f" {result['cost']:8.2f} {result['peak_kib']:8.0f} Kio"
+        )
+    if '--update' in sys.argv:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(
+                {
+                    name: {'cost': round(r['cost'], 3), 'peak_kib': round(r['peak_kib'])}
+                    for name, r in results.items()
+                },
+                f, indent=2, sort_keys=True
+            )
+            f.write('\n')
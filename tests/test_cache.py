@@ -0,0 +1,126 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import time
+import pytest
+from api.cache import MISSING, LRUCache, PersistentCache, TieredCache
+from api.letterboxd_scraper import LetterboxdScraper
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, 60)
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_lru_cache_expires_entries(monkeypatch):
+    cache = LRUCache()
+    cache.set("a", None, 10)
+    assert cache.get("a") is None
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 11)
+    assert cache.get("a") is MISSING
+
+
+def test_tiered_cache_reads_through_persistent_layer(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    TieredCache("posters", path=path).set("k", {"url": "x"}, 60)
+    # Une nouvelle instance (nouveau processus) retrouve la valeur sur disque
+    cache = TieredCache("posters", path=path)
+    assert cache.get("k") == {"url": "x"}
+    assert PersistentCache("other", path=path).get("k") is MISSING
+
+
+def test_persistent_cache_purges_expired_and_caps_entries(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite3")
+    monkeypatch.setattr(PersistentCache, 'PURGE_INTERVAL', 4)
+    cache = PersistentCache("posters", path=path, max_entries=3)
+    cache.set("expired", "x", -1)
+    for key in "abc":
+        cache.set(key, key, 60)
+    # Quatrième écriture : l'entrée expirée est purgée, sans rien évincer d'autre
+    rows = cache._conn.execute("SELECT key FROM cache ORDER BY rowid").fetchall()
+    assert [row[0] for row in rows] == ["a", "b", "c"]
+    cache.set("a", "a", 60)
+    for key in "def":
+        cache.set(key, key, 60)
+    # Au-delà de max_entries, les entrées les plus anciennement écrites partent
+    assert [key for key in "abcdef" if cache.get(key) is not MISSING] == ["d", "e", "f"]
+    # À l'ouverture, la base est ramenée sous la limite
+    PersistentCache("posters", path=path, max_entries=1)
+    assert [key for key in "def" if cache.get(key) is not MISSING] == ["f"]
+
+
+class CountingScraper(LetterboxdScraper):
+    def __init__(self, results, **kwargs):
+        super().__init__(list_store=None, **kwargs)
+        self.results = results
+        self.searches = []
+
+    def _search_tmdb_poster(self, title, year=None):
+        self.searches.append((title, year))
+        result = self.results[title]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+@pytest.fixture
+def poster_cache(tmp_path):
+    return TieredCache("tmdb_posters", path=str(tmp_path / "cache.sqlite3"))
+
+
+def test_tmdb_poster_is_cached_including_negative_results(poster_cache):
+    scraper = CountingScraper({"Parasite": "https://image/p.jpg", "Inconnu": None},
+                              poster_cache=poster_cache)
+    assert scraper._get_tmdb_poster("Parasite", "2019") == "https://image/p.jpg"
+    assert scraper._get_tmdb_poster("  parasite ", "2019") == "https://image/p.jpg"
+    assert scraper._get_tmdb_poster("Inconnu") is None
+    assert scraper._get_tmdb_poster("Inconnu") is None
+    assert scraper.searches == [("Parasite", "2019"), ("Inconnu", None)]
+
+
+def test_tmdb_errors_are_not_cached(poster_cache):
+    scraper = CountingScraper({"Parasite": IOError("timeout")}, poster_cache=poster_cache)
+    assert scraper._get_tmdb_poster("Parasite") is None
+    assert scraper._get_tmdb_poster("Parasite") is None
+    assert len(scraper.searches) == 2
+
+
+def test_prefetch_skips_cached_posters(poster_cache):
+    scraper = CountingScraper({"A": "https://image/a.jpg", "B": None}, poster_cache=poster_cache)
+    scraper._get_tmdb_poster("A", "2000")
+    futures = scraper.prefetch_tmdb_posters([("A", "2000"), ("B", "2001")])
+    assert [future.result() for future in futures] == [None]
+    assert scraper.searches == [("A", "2000"), ("B", "2001")]
+
+
+class DetailsScraper(LetterboxdScraper):
+    def __init__(self, **kwargs):
+        super().__init__(list_store=None, **kwargs)
+        self.fetches = []
+
+    def _fetch_film_details(self, film_url, poster_lookup=None):
+        self.fetches.append(film_url)
+        return {'title': f"Version {len(self.fetches)}", 'year': '', 'director': '',
+                'rating': '', 'poster': ''}
+
+
+def test_film_details_served_stale_while_revalidating(tmp_path, monkeypatch):
+    details_cache = TieredCache("film_details", path=str(tmp_path / "cache.sqlite3"))
+    scraper = DetailsScraper(details_cache=details_cache, details_ttl=60)
+    url = "https://letterboxd.com/film/parasite-2019/"
+    assert scraper._get_film_details(url)['title'] == "Version 1"
+    assert scraper._get_film_details(url)['title'] == "Version 1"
+    assert len(scraper.fetches) == 1
+
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 120)
+    # L'entrée périmée est servie immédiatement, le rafraîchissement a lieu en fond
+    assert scraper._get_film_details(url)['title'] == "Version 1"
+    scraper._background.shutdown(wait=True)
+    assert len(scraper.fetches) == 2
+    assert scraper._get_film_details(url)['title'] == "Version 2"
@@ -0,0 +1,50 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import random
+from api.deck import Deck, DeckStore
+
+
+def test_deck_deals_every_card_once_then_reshuffles():
+    rng = random.Random(3)
+    deck = Deck.shuffled(range(10), rng)
+    dealt = [deck.draw() for _ in range(10)]
+    assert sorted(dealt) == list(range(10))
+    assert deck.draw() is None
+    last = deck.last
+    for _ in range(20):
+        deck.reshuffle(rng)
+        assert deck.draw() != last
+        last = deck.last
+    assert deck.remaining == 9
+
+
+def test_reconcile_keeps_dealt_cards_and_merges_changes():
+    rng = random.Random(5)
+    deck = Deck.shuffled(range(6), rng)
+    dealt = [deck.draw(), deck.draw()]
+    removed = next(card for card in deck.cards[deck.cursor:])
+    current = [card for card in range(6) if card != removed] + [6, 7]
+
+    assert deck.reconcile(current, rng) == (2, 1)
+    assert deck.reconcile(current, rng) == (0, 0)
+    assert list(deck.cards[:deck.cursor]) == dealt
+    rest = [deck.draw() for _ in range(deck.remaining)]
+    assert sorted(dealt + rest) == sorted(current)
+
+
+def test_store_round_trip():
+    store = DeckStore(':memory:')
+    ids = store.ids_for(['/film/a/', '/film/b/', '/film/c/'], chunk_size=2)
+    assert store.ids_for(['/film/b/', '/film/d/']) == {'/film/b/': ids['/film/b/'], '/film/d/': 4}
+    assert store.path_for(ids['/film/c/']) == '/film/c/'
+
+    deck = Deck.shuffled(ids.values(), version=3)
+    deck.draw()
+    store.save('session', 'alice', 'watchlist', deck)
+    deck.draw()
+    store.save_cursor('session', 'alice', 'watchlist', deck)
+    loaded = store.load('session', 'alice', 'watchlist')
+    assert list(loaded.cards) == list(deck.cards)
+    assert (loaded.cursor, loaded.version) == (2, 3)
+    assert store.load('other', 'alice', 'watchlist') is None
+    store.close()
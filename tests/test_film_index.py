@@ -0,0 +1,77 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import random
+from api.film_index import FilmIndex, combine
+from api.list_store import ListStore
+
+
+def film(slug, year='2000'):
+    return {'name': slug.title(), 'path': f'/film/{slug}/', 'image': f'https://img/{slug}.jpg', 'year': year}
+
+
+def test_deduplicates_by_path_and_keeps_order():
+    index = FilmIndex([film('a'), film('b')])
+    assert index.add_film(dict(film('a'), name='Autre titre')) is False
+    assert index.extend([film('c'), film('b')]) == 1
+
+    assert len(index) == 3
+    assert '/film/b/' in index
+    assert index.position('/film/c/') == 2
+    assert index[1] == film('b')
+    assert [f['path'] for f in index] == ['/film/a/', '/film/b/', '/film/c/']
+    assert index == [film('a'), film('b'), film('c')]
+
+
+def test_missing_year_is_normalized():
+    index = FilmIndex([{'name': 'A', 'path': '/film/a/', 'image': ''}])
+    assert index[0]['year'] == ''
+
+
+def test_choice_is_uniform():
+    index = FilmIndex(film(str(number)) for number in range(4))
+    rng = random.Random(3)
+    counts = {}
+    for _ in range(4000):
+        path = index.choice(rng)['path']
+        counts[path] = counts.get(path, 0) + 1
+    assert len(counts) == 4
+    assert all(850 < count < 1150 for count in counts.values())
+
+
+def test_uses_less_memory_than_a_list_of_dicts():
+    # Films déjà en mémoire (sortie de l'analyseur) : seuls les conteneurs sont mesurés
+    films = [film(f'film-{number}', str(1950 + number % 70)) for number in range(2000)]
+    as_dicts = sys.getsizeof(films) + sum(sys.getsizeof(f) for f in films)
+    index = FilmIndex(films)
+    as_index = sum(
+        sys.getsizeof(column)
+        for column in (index._paths, index._names, index._images, index._years, index._positions)
+    )
+    assert as_index < as_dicts / 2
+
+
+def test_combine_keeps_films_shared_by_enough_members():
+    alice = FilmIndex([film('a'), film('b'), film('c')])
+    bob = FilmIndex([film('c'), film('d'), film('a')])
+    carol = FilmIndex([film('a'), film('e')])
+
+    candidates, members = combine([alice, bob, carol], 3)
+    assert [f['path'] for f in candidates] == ['/film/a/']
+    assert members == [3]
+
+    candidates, members = combine([alice, bob, carol], 2)
+    assert [f['path'] for f in candidates] == ['/film/a/', '/film/c/']
+    assert members == [3, 2]
+
+    candidates, members = combine([alice, bob, carol], 1)
+    assert [f['path'] for f in candidates] == ['/film/a/', '/film/b/', '/film/c/', '/film/d/', '/film/e/']
+    assert members == [3, 1, 2, 1, 1]
+
+
+def test_list_store_returns_film_index(tmp_path):
+    store = ListStore(str(tmp_path / "store.sqlite3"))
+    store.replace("johndoe", "watchlist", FilmIndex([film('a'), film('b')]))
+
+    films = store.get_films("johndoe", "watchlist")
+    assert isinstance(films, FilmIndex)
+    assert [f['path'] for f in films] == ['/film/a/', '/film/b/']
@@ -0,0 +1,86 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio
+import threading
+import pytest
+import requests
+from werkzeug.serving import make_server
+import api.async_scraper as async_module
+import app as app_module
+from api.async_scraper import AsyncLetterboxdScraper, get_shared_loop
+from api.cache import TieredCache
+from api.letterboxd_scraper import LetterboxdScraper
+from api.transport import create_session
+from loadtest.driver import percentile, run_load
+from loadtest.stand_in import StandInConfig, start_stand_in
+
+
+@pytest.fixture
+def stand_in():
+    server = start_stand_in(StandInConfig(films_per_list=60, seed=1))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def stand_in_scraper(url, scraper_class=LetterboxdScraper, **kwargs):
+    return scraper_class(
+        list_store=None,
+        max_requests_per_second=1000,
+        poster_cache=TieredCache('loadtest_posters', persistent=False),
+        details_cache=TieredCache('loadtest_details', persistent=False),
+        base_url=url,
+        tmdb_base_url=url,
+        tmdb_image_base_url=url,
+        **kwargs
+    )
+
+
+def test_scraper_base_urls_are_injectable(stand_in):
+    scraper = stand_in_scraper(stand_in.url, session=create_session())
+    film = scraper.get_films("https://letterboxd.com/alice/watchlist/")
+
+    assert film['title'].startswith("Film ")
+    assert film['url'].startswith(stand_in.url + "/film/")
+    assert film['poster'].startswith(stand_in.url + "/t/p/w500/poster-")
+    assert requests.get(film['poster']).headers['Content-Type'] == 'image/jpeg'
+    # 60 films par liste, 28 par page : trois pages parcourues
+    assert stand_in.counts['requests'] >= 3
+
+
+def test_stand_in_throttles_with_retry_after():
+    server = start_stand_in(StandInConfig(throttle_rate=1, retry_after=7))
+    try:
+        response = requests.get(server.url + "/alice/watchlist/")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '7'
+    assert server.counts['throttled'] == 1
+
+
+def test_load_driver_reports_latency_percentiles(stand_in, monkeypatch):
+    scraper = stand_in_scraper(stand_in.url, AsyncLetterboxdScraper)
+    monkeypatch.setattr(async_module, '_shared_scraper', scraper)
+    app_server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    thread = threading.Thread(target=app_server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        report = run_load(f"http://127.0.0.1:{app_server.server_port}", spins=6, concurrency=3, users=2)
+    finally:
+        app_server.shutdown()
+        asyncio.run_coroutine_threadsafe(scraper.close(), get_shared_loop()).result()
+
+    assert report.statuses == {200: 6}
+    assert report.percentile(0.5) <= report.percentile(0.99)
+    assert report.throughput > 0
+    assert 'p95=' in report.format()
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([3], 0.95) == 3
+    assert percentile([], 0.5) is None
@@ -0,0 +1,52 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pytest
+from api.metadata import FilmFilter, MetadataIndex, parse_rating
+
+
+def test_parse_rating():
+    assert parse_rating("4.56 out of 5") == 4.56
+    assert parse_rating("3,5 sur 5") == 3.5
+    assert parse_rating("Non disponible") is None
+
+
+def test_index_round_trip():
+    index = MetadataIndex(':memory:')
+    index.put('/film/parasite-2019/', {
+        'year': '2019', 'rating': '4.57 out of 5', 'director': 'Bong Joon Ho', 'runtime': '132',
+    })
+    index.put('/film/inconnu/', {'year': '', 'rating': 'Non disponible', 'director': 'Non disponible'})
+    found = index.get_many(['/film/parasite-2019/', '/film/inconnu/', '/film/absent/'], chunk_size=1)
+    assert found['/film/parasite-2019/'] == {'year': 2019, 'rating': 4.57, 'director': 'Bong Joon Ho', 'runtime': 132}
+    assert found['/film/inconnu/'] == {'year': None, 'rating': None, 'director': None, 'runtime': None}
+    assert '/film/absent/' not in found
+    index.close()
+
+
+def test_filter_verdicts():
+    parasite = {'year': 2019, 'rating': 4.57, 'director': 'Bong Joon Ho', 'runtime': 132}
+    film = {'path': '/film/parasite-2019/', 'year': '2019'}
+
+    # L'année suffit quand la liste la donne : pas besoin de l'index
+    assert FilmFilter(year_min=2000).matches(film, None) is True
+    assert FilmFilter(year_max=1999).matches(film, None) is False
+    assert FilmFilter(year_min=2000, rating_min=4).matches(film, None) is None
+    assert FilmFilter(year_max=1999, rating_min=4).matches(film, None) is False
+
+    assert FilmFilter(rating_min=4, runtime_max=140, director='bong').matches(film, parasite) is True
+    assert FilmFilter(runtime_max=120).matches(film, parasite) is False
+    assert FilmFilter(director='Varda').matches(film, parasite) is False
+    # Film indexé sans note : il ne correspond pas à un critère sur la note
+    assert FilmFilter(rating_min=1).matches(film, dict(parasite, rating=None)) is False
+
+
+def test_filter_from_request():
+    assert FilmFilter.from_request({'type': 'watchlist', 'year_min': ''}) is None
+    filters = FilmFilter.from_request({'year_min': '1990', 'rating_min': 3.5, 'director': ' Varda '})
+    assert filters.year == (1990, None)
+    assert filters.rating == (3.5, None)
+    assert filters.director == 'varda'
+    assert not FilmFilter(year_min=1990).needs_index
+    assert filters.needs_index
+    with pytest.raises(ValueError, match='runtime_max'):
+        FilmFilter.from_request({'runtime_max': 'long'})
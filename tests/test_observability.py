@@ -0,0 +1,42 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pytest
+from api.observability import MetricsRegistry, STAGE_DURATION, STAGE_ERRORS, timed
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram('fetch_seconds', 'Durée', ['stage'], buckets=(0.1, 1))
+    histogram.observe(0.05, stage='page')
+    histogram.observe(0.5, stage='page')
+    histogram.observe(5, stage='page')
+
+    lines = registry.render().splitlines()
+    assert '# TYPE fetch_seconds histogram' in lines
+    assert 'fetch_seconds_bucket{stage="page",le="0.1"} 1' in lines
+    assert 'fetch_seconds_bucket{stage="page",le="1"} 2' in lines
+    assert 'fetch_seconds_bucket{stage="page",le="+Inf"} 3' in lines
+    assert 'fetch_seconds_count{stage="page"} 3' in lines
+
+
+def test_counter_escapes_label_values_and_checks_names():
+    registry = MetricsRegistry()
+    counter = registry.counter('spins_total', 'Tirages', ['outcome'])
+    counter.inc(outcome='a"b')
+    counter.inc(2, outcome='a"b')
+
+    assert 'spins_total{outcome="a\\"b"} 3' in registry.render()
+    with pytest.raises(ValueError):
+        counter.inc(result='ok')
+
+
+def test_timed_records_duration_and_errors():
+    before = STAGE_DURATION.count(stage='test_stage')
+    with timed('test_stage'):
+        pass
+    with pytest.raises(RuntimeError):
+        with timed('test_stage'):
+            raise RuntimeError('boom')
+
+    assert STAGE_DURATION.count(stage='test_stage') == before + 2
+    assert STAGE_ERRORS.value(stage='test_stage') >= 1
@@ -0,0 +1,131 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pytest
+from api.letterboxd_scraper import LetterboxdScraper
+from api.parsers import (
+    FallbackEngine, Html5libEngine, LxmlEngine, StreamingEngine, get_engine, parse_list_stream
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+EDGE_CASE_LIST = """
+<html><body>
+<div class="sign-in-message">Sign in</div>
+<ul class="poster-list">
+  <li class="poster-container" data-film-name="Sans image">
+    <div class="film-poster" href="/film/sans-image/"></div>
+  </li>
+  <li class="poster-container" data-film-slug="sans-poster">
+    <a href="/film/sans-poster/">Lien</a><img alt="Alt" data-src="@https://img/lazy.jpg">
+  </li>
+  <li class="poster-container other"><p>Vide</p></li>
+</ul>
+<div class="paginate-pages"><ul><li><a>1</a></li><li><span class="paginate-current">2</span></li></ul></div>
+</body></html>
+"""
+
+LIST_PAGES = [fixture("watchlist_page.html"), fixture("watchlist_page_years.html"), EDGE_CASE_LIST, "<html><body></body></html>"]
+FILM_PAGES = [fixture("film_page.html"), "<html><head></head><body><h1>Autre</h1></body></html>"]
+
+
+FAST_ENGINES = [LxmlEngine, StreamingEngine]
+
+
+@pytest.mark.parametrize("engine", FAST_ENGINES)
+@pytest.mark.parametrize("html_content", LIST_PAGES)
+def test_list_page_parity(engine, html_content):
+    assert engine().parse_list_page(html_content) == Html5libEngine().parse_list_page(html_content)
+
+
+@pytest.mark.parametrize("engine", FAST_ENGINES)
+@pytest.mark.parametrize("html_content", FILM_PAGES)
+def test_film_page_parity(engine, html_content):
+    assert engine().parse_film_page(html_content) == Html5libEngine().parse_film_page(html_content)
+
+
+def test_watchlist_fixture_fields():
+    page = LxmlEngine().parse_list_page(fixture("watchlist_page.html"))
+    assert len(page.posters) == 28
+    assert page.has_next and page.has_grid and not page.sign_in_required
+    assert page.last_page == 12
+    assert page.posters[0]['poster']['target_link'] == "/film/parasite-2019/"
+    assert page.posters[0]['img']['alt'] == "Parasite"
+    assert page.posters[0]['poster']['release_year'] is None
+
+
+def test_watchlist_release_years():
+    page = LxmlEngine().parse_list_page(fixture("watchlist_page_years.html"))
+    assert [poster['poster']['release_year'] for poster in page.posters[:3]] == ["2019", "2000", "2019"]
+    films = LetterboxdScraper(list_store=None)._parse_list_page(fixture("watchlist_page_years.html")).films
+    assert films[0]['year'] == "2019"
+
+
+def test_film_fixture_fields():
+    assert LxmlEngine().parse_film_page(fixture("film_page.html")) == {
+        'title': "Parasite",
+        'year': "2019",
+        'director': "Bong Joon Ho",
+        'rating': "4.56 out of 5",
+        'runtime': "132",
+    }
+
+
+@pytest.mark.parametrize("engine", ["lxml", "stream"])
+@pytest.mark.parametrize("method", ["_parse_list_page", "_extract_films_from_html"])
+def test_scraper_records_identical_across_engines(engine, method):
+    html_content = fixture("watchlist_page.html")
+    fast = getattr(LetterboxdScraper(list_store=None, parser=engine), method)(html_content)
+    slow = getattr(LetterboxdScraper(list_store=None, parser="html5lib"), method)(html_content)
+    assert fast == slow
+
+
+def test_fallback_engine_uses_html5lib_on_failure():
+    class BrokenEngine:
+        name = "broken"
+
+        def parse_film_page(self, html_content):
+            raise ValueError("boom")
+
+    engine = FallbackEngine(BrokenEngine(), Html5libEngine())
+    assert engine.parse_film_page(fixture("film_page.html"))['title'] == "Parasite"
+
+
+def test_get_engine_rejects_unknown_name():
+    with pytest.raises(ValueError):
+        get_engine("regex")
+
+
+# Le pied de page de la variante avec années tient dans un morceau de 512 caractères
+@pytest.mark.parametrize("name, chunk_size", [
+    ("watchlist_page.html", 512), ("watchlist_page.html", 64), ("watchlist_page_years.html", 64),
+])
+def test_stream_stops_after_grid_and_pagination(name, chunk_size):
+    html_content = fixture(name)
+    chunks = [html_content[i:i + chunk_size] for i in range(0, len(html_content), chunk_size)]
+    consumed = []
+
+    def reader():
+        for chunk in chunks:
+            consumed.append(chunk)
+            yield chunk
+
+    prefixes = []
+    page = parse_list_stream(reader(), check_prefix=prefixes.append)
+    assert page == Html5libEngine().parse_list_page(html_content)
+    # Le pied de page n'a pas été lu, et seul l'en-tête a été conservé
+    assert len(consumed) < len(chunks)
+    assert len(prefixes) == 1 and 'poster-container' not in prefixes[0].split('films-grid')[0]
+
+
+def test_stream_checks_whole_document_without_grid():
+    prefixes = []
+    page = parse_list_stream(["<html><body>This profile ", "is private</body></html>"],
+                             check_prefix=prefixes.append)
+    assert not page.has_grid and page.posters == []
+    assert prefixes == ["<html><body>This profile is private</body></html>"]
@@ -0,0 +1,126 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio
+import time
+import pytest
+from api.async_scraper import AsyncLetterboxdScraper
+from api.cache import TieredCache
+from api.list_store import ListStore
+from api.refresh import RefreshScheduler, RequestBudget
+from loadtest.stand_in import StandInConfig, start_stand_in
+
+
+@pytest.fixture
+def stand_in():
+    server = start_stand_in(StandInConfig(films_per_list=60, seed=1))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def run_with_scheduler(tmp_path, url, scenario, scraper_options=None, **options):
+    async def main():
+        scraper = AsyncLetterboxdScraper(
+            list_store=ListStore(str(tmp_path / "store.sqlite3")),
+            max_requests_per_second=1000,
+            poster_cache=TieredCache('refresh_posters', persistent=False),
+            details_cache=TieredCache('refresh_details', persistent=False),
+            base_url=url,
+            tmdb_base_url=url,
+            tmdb_image_base_url=url,
+            **(scraper_options or {})
+        )
+        scraper.refresh_scheduler = RefreshScheduler(scraper, **options)
+        try:
+            return await scenario(scraper, scraper.refresh_scheduler)
+        finally:
+            await scraper.close()
+    return asyncio.run(main())
+
+
+def test_budget_refills_and_allows_overdraft():
+    budget = RequestBudget(2, window=0.2)
+    budget.spend(3)
+    assert budget.remaining() < 0
+    # Découvert résorbé puis budget plein : jamais plus de ``limit`` jetons
+    time.sleep(0.35)
+    assert budget.remaining() == 2
+
+
+def test_hot_lists_are_ranked_by_access_frequency():
+    scheduler = RefreshScheduler(scraper=None, top=2)
+    for username, count in (('alice', 1), ('bob', 3), ('carol', 2)):
+        for _ in range(count):
+            scheduler.record(username, 'watchlist')
+    scheduler.record(None, 'watchlist')
+
+    assert scheduler.hot_lists() == [('bob', 'watchlist', None), ('carol', 'watchlist', None)]
+
+
+def test_refresh_resyncs_hot_lists_within_budget(tmp_path, stand_in):
+    async def scenario(scraper, scheduler):
+        for username in ('alice', 'alice', 'bob'):
+            await scraper.get_films(f"https://letterboxd.com/{username}/watchlist/")
+        before = {
+            username: scraper.core.list_store.get_state(username, 'watchlist')['synced_at']
+            for username in ('alice', 'bob')
+        }
+        requests = stand_in.counts['requests']
+        refreshed = await scheduler.refresh_once()
+        after = {
+            username: scraper.core.list_store.get_state(username, 'watchlist')['synced_at']
+            for username in ('alice', 'bob')
+        }
+        return refreshed, before, after, stand_in.counts['requests'] - requests
+
+    # Passages toutes les 30 s : les synchronisations complètes (valables 30 s)
+    # expirent avant le suivant
+    refreshed, before, after, requests = run_with_scheduler(
+        tmp_path, stand_in.url, scenario, scraper_options={'full_sync_interval': 30}, budget=3, interval=30
+    )
+    # Un seul parcours complet (trois pages) tient dans le budget : la liste la plus demandée
+    assert refreshed == 1
+    assert requests == 3
+    assert after['alice'] > before['alice']
+    assert after['bob'] == before['bob']
+
+
+def test_fresh_lists_are_left_alone(tmp_path, stand_in):
+    async def scenario(scraper, scheduler):
+        await scraper.get_films("https://letterboxd.com/alice/watchlist/")
+        requests = stand_in.counts['requests']
+        refreshed = await scheduler.refresh_once()
+        return refreshed, stand_in.counts['requests'] - requests
+
+    assert run_with_scheduler(tmp_path, stand_in.url, scenario, interval=1) == (0, 0)
+
+
+def test_lists_with_only_a_stale_delta_are_left_to_the_request_path(tmp_path, stand_in):
+    async def scenario(scraper, scheduler):
+        await scraper.get_films("https://letterboxd.com/alice/watchlist/")
+        requests = stand_in.counts['requests']
+        # Copie plus ancienne que refresh_interval, synchronisation complète encore valable
+        refreshed = await scheduler.refresh_once()
+        return refreshed, stand_in.counts['requests'] - requests
+
+    assert run_with_scheduler(
+        tmp_path, stand_in.url, scenario, scraper_options={'refresh_interval': 0}, interval=30
+    ) == (0, 0)
+
+
+def test_lists_left_alone_for_hours_are_no_longer_refreshed(tmp_path, stand_in, monkeypatch):
+    async def scenario(scraper, scheduler):
+        await scraper.get_films("https://letterboxd.com/alice/watchlist/")
+        assert scheduler.hot_lists() == [('alice', 'watchlist', None)]
+        requests = stand_in.counts['requests']
+        # Six heures plus tard, synchronisation complète expirée comprise
+        now = time.time()
+        monkeypatch.setattr(time, 'time', lambda: now + 6 * 3600)
+        refreshed = await scheduler.refresh_once()
+        return refreshed, stand_in.counts['requests'] - requests, scheduler._scores
+
+    refreshed, requests, scores = run_with_scheduler(
+        tmp_path, stand_in.url, scenario, scraper_options={'full_sync_interval': 3600}
+    )
+    assert (refreshed, requests) == (0, 0)
+    assert scores == {}
@@ -0,0 +1,30 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import random
+import pytest
+from api.sampling import Reservoir, reservoir_sample
+
+
+def test_every_item_is_equally_likely():
+    rng = random.Random(5)
+    counts = [0] * 10
+    for _ in range(6000):
+        for item in reservoir_sample(iter(range(10)), 3, rng):
+            counts[item] += 1
+    # 6000 tirages x 3 éléments sur 10 : 1800 attendus par élément
+    assert all(1650 < count < 1950 for count in counts)
+
+
+def test_short_stream_is_returned_whole():
+    assert sorted(reservoir_sample(iter('abc'), 5)) == ['a', 'b', 'c']
+    assert reservoir_sample(iter(()), 2) == []
+
+
+def test_reservoir_only_keeps_k_items():
+    reservoir = Reservoir(2, random.Random(1))
+    for item in range(1000):
+        reservoir.offer(item)
+    assert reservoir.seen == 1000
+    assert len(reservoir.items) == 2
+    with pytest.raises(ValueError):
+        Reservoir(0)
@@ -1,7 +1,14 @@
 import os, sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import random
+import threading
+import time
 import pytest
 from api.letterboxd_scraper import LetterboxdScraper
+from api.cache import TieredCache
+from api.list_store import ListStore
+from api.transport import POOL_SIZES, get_shared_session
+from conftest import FakeResponse, FakeSession
 
 
 def test_valid_watchlist_url():
@@ -30,3 +37,232 @@ def test_invalid_url():
     url = "https://example.com/not-a-list/"
     assert scraper._is_valid_letterboxd_list_url(url) is False
 
+
+
+def list_page(slugs, has_next=False, last_page=None):
+    posters = "".join(
+        f'<li class="poster-container" data-film-name="{slug.title()}">'
+        f'<div class="film-poster" data-target-link="/film/{slug}/">'
+        f'<img alt="{slug.title()}" src="https://a.ltrbxd.com/{slug}.jpg"></div></li>'
+        for slug in slugs
+    )
+    next_link = '<a class="next" href="#">Next</a>' if has_next else ''
+    pagination = ''
+    if last_page:
+        pagination = '<div class="paginate-pages"><ul>' + "".join(
+            f'<li class="paginate-page"><a href="page/{number}/">{number}</a></li>'
+            for number in range(1, last_page + 1)
+        ) + '</ul></div>'
+    return (f'<html><body><ul class="poster-list">{posters}</ul>'
+            f'{next_link}{pagination}</body></html>')
+
+
+def test_list_store_delta_sync(tmp_path, monkeypatch):
+    monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+    store = ListStore(str(tmp_path / "store.sqlite3"))
+    base = "https://letterboxd.com/johndoe/watchlist/by/added/"
+    scraper = LetterboxdScraper(list_store=store, refresh_interval=0)
+    scraper.session = FakeSession({
+        base: list_page(["b", "c"], has_next=True),
+        base + "page/2/": list_page(["d"]),
+    })
+    films = scraper._get_list_films("johndoe", "watchlist")
+    assert [film['path'] for film in films] == ["/film/b/", "/film/c/", "/film/d/"]
+
+    # Un nouveau film en tête de liste : une seule page est récupérée
+    scraper.session = FakeSession({
+        base: list_page(["a", "b", "c"], has_next=True),
+    })
+    films = scraper._get_list_films("johndoe", "watchlist")
+    assert scraper.session.requested == [base]
+    assert [film['path'] for film in films] == ["/film/a/", "/film/b/", "/film/c/", "/film/d/"]
+
+
+def test_interrupted_crawl_does_not_replace_the_stored_list(tmp_path):
+    base = "https://letterboxd.com/johndoe/watchlist/by/added/"
+    pages = {
+        base: list_page(["a", "b"], has_next=True, last_page=3),
+        base + "page/2/": list_page(["c", "d"], has_next=True, last_page=3),
+        base + "page/3/": list_page(["e"], last_page=3),
+    }
+    broken = {url: html for url, html in pages.items() if not url.endswith("page/2/")}
+    everything = ["/film/a/", "/film/b/", "/film/c/", "/film/d/", "/film/e/"]
+
+    # Liste inconnue : les films lus sont servis, mais pas enregistrés
+    store = ListStore(str(tmp_path / "store.sqlite3"))
+    scraper = LetterboxdScraper(list_store=store)
+    scraper.session = FakeSession(broken)
+    assert [film['path'] for film in scraper._get_list_films("johndoe", "watchlist")] == ["/film/a/", "/film/b/"]
+    assert store.get_state("johndoe", "watchlist") is None
+    # Réseau rétabli : le parcours suivant enregistre toute la liste
+    scraper.session = FakeSession(pages)
+    assert [film['path'] for film in scraper._get_list_films("johndoe", "watchlist")] == everything
+    assert [film['path'] for film in store.get_films("johndoe", "watchlist")] == everything
+
+    # Synchronisation complète expirée : la copie stockée reste servie et à resynchroniser
+    full_synced_at = store.get_state("johndoe", "watchlist")['full_synced_at']
+    scraper = LetterboxdScraper(list_store=store, full_sync_interval=0)
+    scraper.session = FakeSession(broken)
+    assert [film['path'] for film in scraper._get_list_films("johndoe", "watchlist")] == everything
+    assert store.get_state("johndoe", "watchlist")['full_synced_at'] == full_synced_at
+
+
+def test_list_store_version_tracks_content_changes(tmp_path):
+    store = ListStore(str(tmp_path / "store.sqlite3"))
+    films = [{'name': name, 'path': f'/film/{name}/', 'image': ''} for name in "bc"]
+    store.replace("johndoe", "watchlist", films)
+    assert store.get_version("johndoe", "watchlist") == 1
+    # Synchronisations sans changement de contenu : même version
+    store.replace("johndoe", "watchlist", films)
+    store.prepend("johndoe", "watchlist", films[:1])
+    store.touch("johndoe", "watchlist")
+    assert store.get_version("johndoe", "watchlist") == 1
+    store.prepend("johndoe", "watchlist", [{'name': 'a', 'path': '/film/a/', 'image': ''}])
+    assert store.get_version("johndoe", "watchlist") == 2
+    store.replace("johndoe", "watchlist", films)
+    assert store.get_version("johndoe", "watchlist") == 3
+    assert store.get_version("johndoe", "films") is None
+
+
+def test_list_store_recent_sync_skips_network(tmp_path):
+    store = ListStore(str(tmp_path / "store.sqlite3"))
+    store.replace("johndoe", "watchlist", [{'name': 'A', 'path': '/film/a/', 'image': ''}])
+    scraper = LetterboxdScraper(list_store=store, refresh_interval=60)
+    scraper.session = FakeSession({})
+    films = scraper._get_list_films("johndoe", "watchlist")
+    assert scraper.session.requested == []
+    assert [film['path'] for film in films] == ["/film/a/"]
+
+
+def test_concurrent_pages_are_ordered_and_deduplicated():
+    base = "https://letterboxd.com/johndoe/films/"
+    scraper = LetterboxdScraper(list_store=None, max_workers=3, max_requests_per_second=1000)
+    scraper.session = FakeSession({
+        base: list_page(["a", "b"], has_next=True, last_page=3),
+        base + "page/2/": list_page(["c", "a"], has_next=True, last_page=3),
+        base + "page/3/": list_page(["d"], last_page=3),
+    })
+    api_data = scraper._get_films_from_api("johndoe", "films")
+    assert [film['path'] for film in api_data['films']] == [
+        "/film/a/", "/film/b/", "/film/c/", "/film/d/"
+    ]
+    assert sorted(scraper.session.requested) == sorted([base, base + "page/2/", base + "page/3/"])
+
+
+def test_fast_pick_is_uniform_with_short_last_page(monkeypatch):
+    base = "https://letterboxd.com/johndoe/watchlist/"
+    scraper = LetterboxdScraper(list_store=None, max_requests_per_second=1000)
+    scraper.session = FakeSession({
+        base: list_page(["a", "b", "c"], has_next=True, last_page=2),
+        base + "page/2/": list_page(["d"], last_page=2),
+    })
+    # Indices 4 et 5 tombent après la fin de la dernière page : ils sont rejetés
+    draws = iter([4, 5, 3])
+    monkeypatch.setattr(random, 'randrange', lambda stop: next(draws))
+    film = scraper._pick_film_fast("johndoe", "watchlist")
+    assert film['path'] == "/film/d/"
+    assert scraper.session.requested == [base, base + "page/2/"]
+
+
+def test_iter_films_streams_pages_lazily():
+    base = "https://letterboxd.com/johndoe/films/"
+    scraper = LetterboxdScraper(list_store=None, max_workers=1, max_requests_per_second=1000)
+    scraper.session = FakeSession({
+        base: list_page(["a", "b"], has_next=True, last_page=4),
+        base + "page/2/": list_page(["c", "a"], has_next=True, last_page=4),
+        base + "page/3/": list_page(["d", "e"], has_next=True, last_page=4),
+        base + "page/4/": list_page(["f"], last_page=4),
+    })
+    films = scraper.iter_films(base)
+    assert [next(films)['path'] for _ in range(3)] == ["/film/a/", "/film/b/", "/film/c/"]
+    # Une seule page demandée en avance (max_workers=1) : la page 4 n'a pas été lue
+    films.close()
+    assert base + "page/4/" not in scraper.session.requested
+
+    paths = [film['path'] for film in scraper.iter_films(base, predicate=lambda film: film['path'] != "/film/e/")]
+    assert paths == ["/film/a/", "/film/b/", "/film/c/", "/film/d/", "/film/f/"]
+
+
+def test_sample_draws_distinct_films_in_one_pass():
+    base = "https://letterboxd.com/johndoe/watchlist/"
+    scraper = LetterboxdScraper(list_store=None, max_requests_per_second=1000)
+    scraper.session = FakeSession({
+        base: list_page(["a", "b", "c"], has_next=True, last_page=2),
+        base + "page/2/": list_page(["d", "e"], last_page=2),
+    })
+    films = scraper.sample(base, k=2, rng=random.Random(0))
+    assert len({film['path'] for film in films}) == 2
+    assert scraper.sample(base, k=10, predicate=lambda film: film['path'] > "/film/c/") == [
+        film for film in scraper.iter_films(base) if film['path'] > "/film/c/"
+    ]
+    with pytest.raises(ValueError):
+        scraper.sample("https://letterboxd.com/johndoe/", k=1)
+
+
+def test_request_context_is_isolated_per_thread():
+    scraper = LetterboxdScraper(list_store=None)
+    scraper._is_valid_letterboxd_list_url("https://letterboxd.com/johndoe/watchlist/")
+    seen = {}
+
+    def other_request():
+        scraper._is_valid_letterboxd_list_url("https://letterboxd.com/janedoe/films/")
+        seen['username'] = scraper.username
+
+    thread = threading.Thread(target=other_request)
+    thread.start()
+    thread.join()
+    assert seen['username'] == "janedoe"
+    assert scraper.username == "johndoe"
+    assert scraper.list_type == "watchlist"
+
+
+def test_shared_session_has_pool_per_host():
+    session = get_shared_session()
+    assert get_shared_session() is session
+    adapter = session.get_adapter("https://letterboxd.com/johndoe/watchlist/")
+    assert adapter is not session.get_adapter("https://api.themoviedb.org/3/search/movie")
+    assert adapter._pool_maxsize == POOL_SIZES['letterboxd.com']
+
+
+class PipelineScraper(LetterboxdScraper):
+    """Scraper dont la page de film n'est servie qu'une fois la recherche TMDB lancée."""
+
+    def __init__(self, film_html, tmp_path):
+        super().__init__(
+            list_store=None,
+            poster_cache=TieredCache("tmdb_posters", path=str(tmp_path / "cache.sqlite3")),
+            details_cache=TieredCache("film_details", path=str(tmp_path / "cache.sqlite3")),
+        )
+        self.searches = []
+        self.tmdb_started = threading.Event()
+        scraper = self
+
+        class Session:
+            def get(self, url, **kwargs):
+                # En séquentiel, la recherche TMDB ne démarrerait qu'après cette requête
+                scraper.overlapped = scraper.tmdb_started.wait(timeout=2)
+                return FakeResponse(film_html, url=url)
+
+        self.session = Session()
+
+    def _search_tmdb_poster(self, title, year=None):
+        self.tmdb_started.set()
+        self.searches.append((title, year))
+        return f"https://image.tmdb.org/{title}-{year}.jpg"
+
+
+def test_tmdb_lookup_runs_alongside_film_page(tmp_path):
+    with open(os.path.join(os.path.dirname(__file__), "fixtures", "film_page.html"), encoding="utf-8") as f:
+        scraper = PipelineScraper(f.read(), tmp_path)
+    details = scraper._get_film_details("https://letterboxd.com/film/parasite-2019/", "Parasite", "2019")
+    assert scraper.overlapped
+    assert details['poster'] == "https://image.tmdb.org/Parasite-2019.jpg"
+    assert scraper.searches == [("Parasite", "2019")]
+
+
+def test_mismatched_list_data_is_reconciled(tmp_path):
+    with open(os.path.join(os.path.dirname(__file__), "fixtures", "film_page.html"), encoding="utf-8") as f:
+        scraper = PipelineScraper(f.read(), tmp_path)
+    details = scraper._get_film_details("https://letterboxd.com/film/parasite-2019/", "Parasite", "2018")
+    assert details['poster'] == "https://image.tmdb.org/Parasite-2019.jpg"
+    assert sorted(scraper.searches) == [("Parasite", "2018"), ("Parasite", "2019")]
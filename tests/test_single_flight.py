@@ -0,0 +1,68 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from api.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def crawl(url):
+        calls.append(url)
+        started.set()
+        time.sleep(0.1)
+        return {'films': [url]}
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        first = executor.submit(flights.do, 'alice', crawl, 'alice')
+        started.wait()
+        others = [executor.submit(flights.do, 'alice', crawl, 'alice') for _ in range(4)]
+        results = [first.result()] + [future.result() for future in others]
+
+    assert calls == ['alice']
+    assert all(result is results[0] for result in results)
+    assert flights.in_flight() == 0
+    # L'appel terminé n'est pas mis en cache
+    flights.do('alice', crawl, 'alice')
+    assert len(calls) == 2
+
+
+def test_errors_are_shared_and_not_remembered():
+    flights = SingleFlight()
+
+    def fail():
+        raise RuntimeError("429")
+
+    with pytest.raises(RuntimeError):
+        flights.do('alice', fail)
+    assert flights.do('alice', lambda: 'ok') == 'ok'
+
+
+def test_async_callers_share_one_task_and_survive_cancellation():
+    flights = AsyncSingleFlight()
+    calls = []
+
+    async def crawl():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 'films'
+
+    async def main():
+        first = asyncio.ensure_future(flights.do('alice', crawl))
+        await asyncio.sleep(0)
+        others = [asyncio.ensure_future(flights.do('alice', crawl)) for _ in range(3)]
+        # Le premier appelant abandonne : les autres reçoivent quand même le résultat
+        first.cancel()
+        results = await asyncio.gather(*others)
+        return results, flights.in_flight()
+
+    results, in_flight = asyncio.run(main())
+    assert results == ['films'] * 3
+    assert calls == [1]
+    assert in_flight == 0
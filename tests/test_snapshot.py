@@ -0,0 +1,68 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pytest
+from api.film_index import FilmIndex
+from api.list_store import ListStore
+from api.metadata import MetadataIndex
+from api.snapshot import Snapshot, main, write_snapshot
+
+
+def film(number):
+    return {'name': f"Film {number}", 'path': f"/film/film-{number}/", 'image': '', 'year': str(1950 + number % 3)}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ListStore(str(tmp_path / "store.sqlite3"))
+    store.replace('alice', 'watchlist', [film(number) for number in range(1200)])
+    store.replace('bob', 'list/classiques', [film(number) for number in (7, 3, 1100)])
+    metadata = MetadataIndex(store.path)
+    metadata.put('/film/film-3/', {'year': '1953', 'rating': '4.20 out of 5', 'director': 'Agnès Varda', 'runtime': '83'})
+    metadata.put('/film/film-7/', {'year': '', 'rating': 'Non disponible', 'director': 'Non disponible'})
+    yield store
+    store.close()
+
+
+def test_snapshot_round_trip(store, tmp_path):
+    path = str(tmp_path / "lists.lbxs")
+    assert write_snapshot(path, store, MetadataIndex(store.path)) == 2
+
+    snapshot = Snapshot(path)
+    assert sorted(snapshot.lists()) == [('alice', 'watchlist'), ('bob', 'list/classiques')]
+    assert ('bob', 'list/classiques') in snapshot and ('bob', 'watchlist') not in snapshot
+    assert snapshot.get_state('alice', 'watchlist') == store.get_state('alice', 'watchlist')
+
+    films, metadata = snapshot.read_list('bob', 'list/classiques')
+    assert isinstance(films, FilmIndex)
+    assert films == store.get_films('bob', 'list/classiques')
+    assert metadata == {
+        '/film/film-3/': {'year': 1953, 'rating': 4.2, 'director': 'Agnès Varda', 'runtime': 83},
+        '/film/film-7/': {'year': None, 'rating': None, 'director': None, 'runtime': None},
+    }
+    # Seules les pages de chaînes de cette petite liste ont été décompressées
+    assert len(snapshot._pages) < len(snapshot._string_pages)
+    assert snapshot.read_list('alice', 'watchlist')[0] == store.get_films('alice', 'watchlist')
+    assert snapshot.read_list('carol', 'watchlist') is None
+    snapshot.close()
+
+
+def test_snapshot_is_smaller_than_the_store(store, tmp_path):
+    path = str(tmp_path / "lists.lbxs")
+    write_snapshot(path, store, lists=[('alice', 'watchlist')])
+    assert Snapshot(path).lists() == [('alice', 'watchlist')]
+    assert os.path.getsize(path) < os.path.getsize(store.path) / 4
+
+
+def test_export_command(store, tmp_path, capsys):
+    path = str(tmp_path / "lists.lbxs")
+    main(['export', path, '--store', store.path, '--user', 'bob'])
+    assert "1 liste(s) exportée(s)" in capsys.readouterr().out
+    main(['show', path])
+    assert capsys.readouterr().out == "bob/list/classiques: 3 films, 2 indexés\n"
+
+
+def test_rejects_unknown_files(tmp_path):
+    path = tmp_path / "lists.lbxs"
+    path.write_bytes(b"SQLite format 3\0" + b"\0" * 64)
+    with pytest.raises(ValueError):
+        Snapshot(str(path))
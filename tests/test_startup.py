@@ -0,0 +1,140 @@
+"""Benchmark du démarrage à froid de l'application Vercel (``api/index.py``).
+
+Chaque mesure est faite dans un interpréteur neuf, face au serveur de
+substitution : import de l'application, préparation du scraper (``warm_up``),
+première requête (page d'accueil) et premier tirage. Les durées sont
+normalisées par celle de l'import de Flask et flask_wtf dans le même
+interpréteur, ce qui rend la comparaison avec ``startup_baseline.json``
+indépendante de la machine. Le test échoue si l'import de l'application charge
+une dépendance lourde réservée au tirage ou, avec ``LETTERBOXD_BENCH=1``
+seulement, si une mesure dépasse la référence de plus de
+``LETTERBOXD_BENCH_TOLERANCE`` (2 par défaut). Pour afficher les résultats ou
+régénérer la référence :
+
+    python tests/test_startup.py [--update]
+"""
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import json
+import subprocess
+import tempfile
+import pytest
+from loadtest.stand_in import StandInConfig, start_stand_in
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "startup_baseline.json")
+TIME_TOLERANCE = float(os.environ.get('LETTERBOXD_BENCH_TOLERANCE', 2.0))
+COST_SLACK = 0.25
+RUNS = 3
+# Dépendances que l'import de l'application ne doit pas charger
+DEFERRED_MODULES = ('aiohttp', 'bs4', 'html5lib', 'lxml', 'requests')
+# Comparaisons à la référence, sur demande seulement
+benchmark = pytest.mark.skipif(
+    os.environ.get('LETTERBOXD_BENCH') != '1', reason="benchmarks activés par LETTERBOXD_BENCH=1"
+)
+
+# Exécuté dans un interpréteur neuf ; affiche les mesures en JSON
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import flask, flask_wtf
+reference = time.perf_counter() - start
+
+start = time.perf_counter()
+import api.index
+timings = {'import': time.perf_counter() - start}
+loaded = sorted(name for name in %(deferred)r if name in sys.modules)
+
+start = time.perf_counter()
+api.index.warm_up().join()
+timings['warm_up'] = time.perf_counter() - start
+
+app = api.index.app
+app.config['WTF_CSRF_ENABLED'] = False
+client = app.test_client()
+start = time.perf_counter()
+assert client.get('/').status_code == 200
+timings['first_request'] = time.perf_counter() - start
+
+start = time.perf_counter()
+response = client.post('/api/random-movie', json={'type': 'watchlist', 'username': 'alice'})
+timings['first_spin'] = time.perf_counter() - start
+assert response.status_code == 200, response.get_data(as_text=True)
+
+print(json.dumps({'reference': reference, 'timings': timings, 'loaded': loaded}))
+"""
+
+
+def probe(server_url, store_path):
+    """Lance une mesure dans un interpréteur neuf et retourne son résultat."""
+    env = dict(
+        os.environ,
+        LETTERBOXD_WARM_UP='0',  # préparation mesurée à part, après l'import
+        LETTERBOXD_REFRESH_TOP='0',
+        LETTERBOXD_MAX_RPS='1000',
+        LETTERBOXD_STORE_PATH=store_path,
+        LETTERBOXD_SNAPSHOT=os.path.join(os.path.dirname(store_path), 'absent.lbxs'),
+        LETTERBOXD_BASE_URL=server_url,
+        TMDB_BASE_URL=server_url,
+        TMDB_IMAGE_BASE_URL=server_url,
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE % {'deferred': DEFERRED_MODULES}],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True, timeout=60,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_startup():
+    """Meilleur de ``RUNS`` démarrages : ``(coûts, modules chargés à l'import)``."""
+    server = start_stand_in(StandInConfig(films_per_list=60, seed=1))
+    costs = {}
+    loaded = set()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for run in range(RUNS):
+                # Base neuve à chaque démarrage : le premier tirage parcourt la liste
+                result = probe(server.url, os.path.join(directory, f"store-{run}.sqlite3"))
+                loaded.update(result['loaded'])
+                for name, duration in result['timings'].items():
+                    cost = duration / result['reference']
+                    costs[name] = min(costs.get(name, cost), cost)
+    finally:
+        server.shutdown()
+        server.server_close()
+    return costs, sorted(loaded)
+
+
+def load_baseline():
+    with open(BASELINE_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def startup():
+    return measure_startup()
+
+
+def test_import_defers_heavy_dependencies(startup):
+    _, loaded = startup
+    assert loaded == []
+
+
+@benchmark
+@pytest.mark.parametrize("name", ['import', 'warm_up', 'first_request', 'first_spin'])
+def test_startup_does_not_regress(startup, name):
+    costs, _ = startup
+    expected = load_baseline()[name]
+    summary = f"{name}: coût {costs[name]:.2f} (référence {expected['cost']:.2f})"
+    assert costs[name] <= expected['cost'] * TIME_TOLERANCE + COST_SLACK, summary
+
+
+if __name__ == '__main__':
+    costs, loaded = measure_startup()
+    for name, cost in costs.items():
+        print(f"{name:16} {cost:8.2f}")
+    print(f"Modules lourds chargés à l'import : {', '.join(loaded) or 'aucun'}")
+    if '--update' in sys.argv:
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump({name: {'cost': round(cost, 3)} for name, cost in costs.items()}, f, indent=2, sort_keys=True)
+            f.write('\n')
@@ -0,0 +1,110 @@
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import time
+import pytest
+import requests
+import api.letterboxd_scraper as scraper_module
+from api.letterboxd_scraper import LetterboxdScraper
+from api.observability import render_metrics
+from api.throttle import AdaptiveRateLimiter, HostPausedError, parse_retry_after
+from api.transport import MAX_RETRIES
+from conftest import FakeResponse, FakeSession
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('7') == 7
+    assert parse_retry_after('Wed, 21 Oct 2015 07:28:30 GMT', now=1445412500) == 10
+    assert parse_retry_after('bientôt') is None
+    assert parse_retry_after(None) is None
+
+
+def test_rate_backs_off_on_throttling_and_recovers():
+    limiter = AdaptiveRateLimiter(10, increase=1)
+    assert limiter.rate == 5
+    limiter.on_response(429)
+    assert limiter.rate == 2.5
+    # Une rafale de 429 (requêtes parties en même temps) ne compte qu'une fois
+    limiter.on_response(503)
+    assert limiter.rate == 2.5
+    for _ in range(20):
+        limiter.on_response(200)
+    assert limiter.rate == 10
+
+
+def test_retry_after_pauses_the_host():
+    limiter = AdaptiveRateLimiter(1000)
+    limiter.on_response(429, retry_after=0.2)
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.19
+
+
+def test_scraper_retries_after_the_delay_requested_by_the_host():
+    scraper = LetterboxdScraper(list_store=None, max_requests_per_second=1000)
+    throttled = FakeResponse(status_code=429, headers={'Retry-After': '1'})
+    scraper.session = FakeSession(responses=[throttled, FakeResponse(status_code=200)])
+
+    start = time.monotonic()
+    response = scraper._get("https://letterboxd.com/johndoe/watchlist/")
+    assert response.status_code == 200
+    assert throttled.closed
+    assert time.monotonic() - start >= 0.95
+    limiter = scraper.rate_limiters.for_host('letterboxd.com')
+    assert limiter.rate < 500
+    assert 'letterboxd_rate_limit_requests_per_second{host="letterboxd.com"}' in render_metrics()
+    assert 'letterboxd_upstream_slowdowns_total{host="letterboxd.com",status="429"}' in render_metrics()
+
+
+def test_scraper_retries_connection_errors(monkeypatch):
+    monkeypatch.setattr(scraper_module, 'RETRY_BACKOFF', 0)
+    scraper = LetterboxdScraper(list_store=None, max_requests_per_second=1000)
+    scraper.session = FakeSession(responses=[
+        requests.ConnectionError("connexion réinitialisée"), requests.Timeout("délai dépassé"),
+        FakeResponse(status_code=200),
+    ])
+    assert scraper._get("https://letterboxd.com/johndoe/watchlist/").status_code == 200
+    assert len(scraper.session.requested) == 3
+
+    scraper.session = FakeSession(responses=[requests.ConnectionError("hôte injoignable")] * (MAX_RETRIES + 1))
+    with pytest.raises(requests.ConnectionError):
+        scraper._get("https://letterboxd.com/johndoe/watchlist/")
+    assert len(scraper.session.requested) == MAX_RETRIES + 1
+
+
+def test_long_retry_after_fails_fast_instead_of_blocking():
+    scraper = LetterboxdScraper(list_store=None, max_requests_per_second=1000)
+    scraper.session = FakeSession(responses=[FakeResponse(status_code=429, headers={'Retry-After': '3600'})])
+
+    start = time.monotonic()
+    with pytest.raises(HostPausedError) as raised:
+        scraper._get("https://letterboxd.com/johndoe/watchlist/")
+    assert time.monotonic() - start < 1
+    assert 3590 <= raised.value.retry_after <= 3600
+    # La pause reste en vigueur : les requêtes suivantes échouent sans solliciter l'hôte
+    with pytest.raises(HostPausedError):
+        scraper._get("https://letterboxd.com/johndoe/films/")
+    assert len(scraper.session.requested) == 1
+
+
+def test_short_pause_is_waited_up_to_the_cap():
+    limiter = AdaptiveRateLimiter(1000, max_pause=0.5)
+    limiter.on_response(429, retry_after=0.3)
+    limiter.acquire()
+    limiter.on_response(429, retry_after=0.8)
+    with pytest.raises(HostPausedError):
+        limiter.acquire()
+
+
+def test_scrapers_share_process_wide_limiters():
+    first = LetterboxdScraper(list_store=None)
+    second = LetterboxdScraper(list_store=None)
+    assert first.rate_limiters.for_url("https://letterboxd.com/a/") is \
+        second.rate_limiters.for_url("https://letterboxd.com/b/watchlist/")
+    assert first.rate_limiters.for_url("https://api.themoviedb.org/3/") is not \
+        first.rate_limiters.for_url("https://letterboxd.com/a/")
+
+
+@pytest.mark.parametrize("max_rate", [0, -1])
+def test_rate_must_be_positive(max_rate):
+    with pytest.raises(ValueError):
+        AdaptiveRateLimiter(max_rate)